@@ -1,61 +1,140 @@
 import requests
 from bs4 import BeautifulSoup
+import argparse
 import csv
+import json
+import math
+import re
+import sqlite3
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
-import time
-import random
+from urllib.parse import urlsplit
+import os
+import sys
+
+# Share the lead scraper's per-host rate limiter
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'webscrapper'))
+from columnar_export import FORMATS as COLUMNAR_FORMATS, PartitionedWriter, read_state, write_state  # noqa: E402
+from company_store import shared_host  # noqa: E402
+from rate_limiter import get_rate_limiter  # noqa: E402
+from replay import install  # noqa: E402
+
+RATE_LIMITER = get_rate_limiter()
+# Goes through the record/replay archive when HTTP_REPLAY_MODE is set
+SESSION = install(requests.Session())
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+LEAD_FIELDS = ['company_name', 'description', 'website', 'source', 'date_found']
+# Lead columns in Parquet/csv.gz exports, partitioned by date_found
+LEAD_COLUMNS = [(field, 'string') for field in LEAD_FIELDS] + [('domain', 'string'), ('search_terms', 'string')]
+
+# Pages in flight at once in crawl mode; the rate limiter still decides how
+# fast they actually go out, this just overlaps their latency
+CRAWL_WORKERS = 4
+# Attempts per page before it's left for the next run
+PAGE_ATTEMPTS = 3
+# Search terms crawled at once in batch mode
+BATCH_WORKERS = 4
+
+# An empty page only means a term has run out of results when it is a real
+# results page; a CAPTCHA, consent or "unusual traffic" page has no listings
+# either, and is retried instead
+RESULTS_PAGE_MARKERS = ('id="search"', 'id="rso"', 'id="res"', 'did not match any documents')
+BLOCKED_PAGE_MARKERS = ('captcha', 'unusual traffic', '/sorry/')
+
+class BlockedPage(Exception):
+    pass
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+def output_format(path, fmt='auto'):
+    # Picked from the extension unless given: .parquet and .csv.gz outputs are
+    # date-partitioned dataset directories, .jsonl is JSON lines, the rest CSV
+    if fmt != 'auto':
+        return fmt
+    for extension, name in (('.parquet', 'parquet'), ('.csv.gz', 'csv.gz'), ('.jsonl', 'jsonl')):
+        if path.endswith(extension):
+            return name
+    return 'csv'
+
+def rotate_output(path):
+    # --restart starts a new output; the previous one is moved aside under a
+    # timestamped name instead of being appended to or deleted
+    if not os.path.exists(path):
+        return None
+    stem, extension = path, ''
+    for known in ('.csv.gz', '.parquet', '.jsonl', '.csv'):
+        if path.endswith(known):
+            stem, extension = path[:-len(known)], known
+            break
+    rotated = f"{stem}.{datetime.now().strftime('%Y%m%d-%H%M%S')}{extension}"
+    os.replace(path, rotated)
+    print(f"Moved the previous {path} to {rotated}")
+    return rotated
+
+def remove_store(path):
+    for name in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+
+def page_url(search_term, page):
+    # We'll use Google Jobs as an example (you can modify this for other business directories)
+    return f"https://www.google.com/search?q={search_term}+companies&start={page * 10}"
+
+def fetch_page(url):
+    # Wait for Google's bucket; it slows down on 429s and speeds back up on success.
+    # A crawl has no latency budget, and its workers bound how far ahead it reserves,
+    # so it waits however long the bucket says instead of failing fast.
+    RATE_LIMITER.wait(url, max_wait=math.inf)
+    response = SESSION.get(url, headers=HEADERS)
+    RATE_LIMITER.record(url, response.status_code, response.headers.get('Retry-After'))
+    response.raise_for_status()
+    return response.text
+
+def parse_leads(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    leads = []
+    
+    # Find business listings
+    for item in soup.find_all('div', class_='g'):
+        try:
+            title_elem = item.find('h3')
+            if not title_elem:
+                continue
+                
+            title = title_elem.text.strip()
+            description = item.find('div', class_='VwiC3b')
+            description = description.text.strip() if description else "N/A"
+            
+            website = item.find('cite')
+            website = website.text.strip() if website else "N/A"
+            
+            leads.append({
+                'company_name': title,
+                'description': description,
+                'website': website,
+                'source': 'Google Search',
+                'date_found': datetime.now().strftime("%Y-%m-%d")
+            })
+            
+        except Exception as e:
+            print(f"Error processing item: {e}")
+            continue
+    return leads
 
 def scrape_leads(search_term, num_pages=2):
     try:
         leads = []
         
-        # We'll use Google Jobs as an example (you can modify this for other business directories)
-        base_url = f"https://www.google.com/search?q={search_term}+companies"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-
         for page in range(num_pages):
             try:
-                # Add delay between requests to be respectful
-                time.sleep(random.uniform(2, 4))
-                
-                url = f"{base_url}&start={page * 10}"
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Find business listings
-                for item in soup.find_all('div', class_='g'):
-                    try:
-                        title_elem = item.find('h3')
-                        if not title_elem:
-                            continue
-                            
-                        title = title_elem.text.strip()
-                        description = item.find('div', class_='VwiC3b')
-                        description = description.text.strip() if description else "N/A"
-                        
-                        website = item.find('cite')
-                        website = website.text.strip() if website else "N/A"
-                        
-                        lead = {
-                            'company_name': title,
-                            'description': description,
-                            'website': website,
-                            'source': 'Google Search',
-                            'date_found': datetime.now().strftime("%Y-%m-%d")
-                        }
-                        
-                        leads.append(lead)
-                        
-                    except Exception as e:
-                        print(f"Error processing item: {e}")
-                        continue
-                
+                leads.extend(parse_leads(fetch_page(page_url(search_term, page))))
                 print(f"Processed page {page + 1}")
                 
             except Exception as e:
@@ -66,7 +145,7 @@ def scrape_leads(search_term, num_pages=2):
         if leads:
             filename = f'leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
             with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=['company_name', 'description', 'website', 'source', 'date_found'])
+                writer = csv.DictWriter(file, fieldnames=LEAD_FIELDS)
                 writer.writeheader()
                 writer.writerows(leads)
             
@@ -85,6 +164,387 @@ def scrape_leads(search_term, num_pages=2):
         print(f"Error during scraping: {e}")
         return False
 
+class CsvSink:
+    """Appends leads to a CSV file, flushing after every page so a crash loses at most the pages in flight."""
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=LEAD_FIELDS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, leads):
+        self._writer.writerows(leads)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class JsonLinesSink:
+    """Appends one JSON object per lead."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, leads):
+        for lead in leads:
+            self._file.write(json.dumps(lead) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class Checkpoint:
+    """The pages of a crawl already written to its sink.
+
+    Pages finish out of order, so this keeps the first page not yet done plus
+    any finished pages past it; a rerun skips all of those.
+    """
+
+    def __init__(self, path, search_term, resume=True):
+        self.path = path
+        self.search_term = search_term
+        self.next_page = 0
+        self.done = set()
+        self.exhausted_at = None
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('search_term') == search_term:
+                self.next_page = state['next_page']
+                self.done = set(state['done'])
+                self.exhausted_at = state.get('exhausted_at')
+
+    def is_done(self, page):
+        return page < self.next_page or page in self.done
+
+    def complete(self, page, exhausted=False):
+        self.done.add(page)
+        while self.next_page in self.done:
+            self.done.discard(self.next_page)
+            self.next_page += 1
+        if exhausted and (self.exhausted_at is None or page < self.exhausted_at):
+            self.exhausted_at = page
+        self.save()
+
+    def save(self):
+        # Write then rename, so a crash mid-write leaves the previous checkpoint intact
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'search_term': self.search_term,
+                'next_page': self.next_page,
+                'done': sorted(self.done),
+                'exhausted_at': self.exhausted_at,
+            }, f)
+        os.replace(tmp, self.path)
+
+def page_kind(html):
+    # 'blocked', 'results' or None when the page is neither recognisably
+    lowered = html.lower()
+    if any(marker in lowered for marker in BLOCKED_PAGE_MARKERS):
+        return 'blocked'
+    if any(marker in html for marker in RESULTS_PAGE_MARKERS):
+        return 'results'
+    return None
+
+def _crawl_page(search_term, page):
+    # (leads, whether the term has run out of results at this page)
+    url = page_url(search_term, page)
+    for attempt in range(1, PAGE_ATTEMPTS + 1):
+        try:
+            html = fetch_page(url)
+            leads = parse_leads(html)
+            if leads:
+                return leads, False
+            kind = page_kind(html)
+            if kind == 'results':
+                return [], True
+            if kind == 'blocked':
+                # Back off Google's bucket as for a 429
+                RATE_LIMITER.record(url, 429)
+            raise BlockedPage(f"page {page + 1} has no results and isn't a results page ({kind or 'unrecognised'})")
+        except Exception as e:
+            if attempt == PAGE_ATTEMPTS:
+                raise
+            print(f"Retrying page {page + 1} after: {e}")
+
+def crawl_leads(search_term, num_pages, sink, workers=CRAWL_WORKERS, checkpoint_path=None, resume=True):
+    """Fetch up to num_pages result pages concurrently, streaming each page's leads to sink as it's parsed.
+
+    Progress is checkpointed after every page, so running the same crawl
+    again continues with the pages that haven't been written yet.
+    """
+    checkpoint = Checkpoint(checkpoint_path or f"leads_{_slug(search_term)}.checkpoint.json", search_term, resume)
+    last_page = num_pages if checkpoint.exhausted_at is None else min(num_pages, checkpoint.exhausted_at + 1)
+    pages = iter([page for page in range(last_page) if not checkpoint.is_done(page)])
+    written = 0
+    failed = []
+    
+    def submit_next(executor, futures):
+        # Pages past an empty one have nothing on them; stop handing those out
+        for page in pages:
+            if checkpoint.exhausted_at is None or page <= checkpoint.exhausted_at:
+                futures[executor.submit(_crawl_page, search_term, page)] = page
+                return
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for _ in range(workers):
+                submit_next(executor, futures)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = futures.pop(future)
+                    try:
+                        leads, exhausted = future.result()
+                    except Exception as e:
+                        print(f"Error on page {page + 1}: {e}")
+                        failed.append(page)
+                    else:
+                        # Only this thread writes, so the sink and checkpoint need no lock
+                        if leads:
+                            sink.write(leads)
+                            written += len(leads)
+                        checkpoint.complete(page, exhausted=exhausted)
+                        print(f"Processed page {page + 1}: {len(leads)} leads")
+                    submit_next(executor, futures)
+    finally:
+        sink.close()
+    
+    print(f"\nWrote {written} leads to {getattr(sink, 'path', sink)}; "
+          f"{checkpoint.next_page + len(checkpoint.done)} of {last_page} pages done")
+    if failed:
+        print(f"{len(failed)} pages failed and will be retried on the next run: {sorted(p + 1 for p in failed)}")
+    return written
+
+def lead_domain(lead):
+    # Google's cite text looks like "https://www.example.com › about"; leads
+    # without a usable website, or listed on a shared site like Wikipedia, are
+    # keyed by their name instead
+    website = lead['website'].split(' ', 1)[0].strip().lower()
+    if website and website != 'n/a':
+        host = urlsplit(website if '://' in website else f"//{website}").hostname or ''
+        host = host[4:] if host.startswith('www.') else host
+        if '.' in host and not shared_host(host):
+            return host
+    return f"name:{' '.join(lead['company_name'].lower().split())}"
+
+class LeadStore:
+    """Leads deduplicated by domain across search terms, with the terms that found each one.
+
+    Kept in SQLite so the set of seen domains stays on disk however many leads
+    a batch collects.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS leads (domain TEXT PRIMARY KEY, company_name TEXT, description TEXT, '
+            'website TEXT, source TEXT, date_found TEXT)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS lead_terms (domain TEXT NOT NULL, term TEXT NOT NULL, PRIMARY KEY (domain, term)) '
+            'WITHOUT ROWID'
+        )
+
+    def add(self, term, leads):
+        """Store leads found under term; returns how many were new domains."""
+        rows = [(lead_domain(lead), lead) for lead in leads]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO leads (domain, company_name, description, website, source, date_found) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(domain, *(lead[field] for field in LEAD_FIELDS)) for domain, lead in rows],
+                )
+                added = self._conn.total_changes - before
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO lead_terms (domain, term) VALUES (?, ?)', [(domain, term) for domain, _ in rows]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return added
+
+    def sink(self, term):
+        return LeadStoreSink(self, term)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM leads').fetchone()[0]
+
+    def rows(self, after=0):
+        # (rowid, lead) in the order leads were found, streamed from SQLite
+        # rather than loading the merged set
+        cursor = self._conn.cursor()
+        cursor.execute(
+            'SELECT l.rowid, l.domain, l.company_name, l.description, l.website, l.source, l.date_found, '
+            "(SELECT group_concat(term, '; ') FROM lead_terms t WHERE t.domain = l.domain) "
+            'FROM leads l WHERE l.rowid > ? ORDER BY l.rowid',
+            (after,),
+        )
+        for rowid, domain, *values, terms in cursor:
+            yield rowid, dict(zip(LEAD_FIELDS, values), domain=domain, search_terms=terms.split('; '))
+
+    def export(self, path, fmt='auto'):
+        fmt = output_format(path, fmt)
+        if fmt in COLUMNAR_FORMATS:
+            return self.export_partitioned(path, fmt)
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            if path.endswith('.jsonl'):
+                for _, lead in self.rows():
+                    file.write(json.dumps(lead) + '\n')
+                    count += 1
+            else:
+                writer = csv.DictWriter(file, fieldnames=LEAD_FIELDS + ['domain', 'search_terms'])
+                writer.writeheader()
+                for _, lead in self.rows():
+                    lead['search_terms'] = '; '.join(lead['search_terms'])
+                    writer.writerow(lead)
+                    count += 1
+        return count
+
+    def export_partitioned(self, root, fmt):
+        """Append the leads found since the last export to root, partitioned by date_found.
+
+        Leads already exported aren't written again, so a term that later finds
+        a known domain doesn't show up in that lead's search_terms.
+        """
+        state = read_state(root)
+        last = state.get('leads_rowid', 0)
+        with PartitionedWriter(root, LEAD_COLUMNS, 'date_found', fmt) as writer:
+            for rowid, lead in self.rows(last):
+                lead['search_terms'] = '; '.join(lead['search_terms'])
+                writer.write(lead)
+                last = rowid
+        write_state(root, dict(state, leads_rowid=last))
+        return writer.rows_written
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class LeadStoreSink:
+    """crawl_leads sink that files one term's leads into a shared LeadStore."""
+
+    def __init__(self, store, term):
+        self.store = store
+        self.term = term
+        self.path = f"{store.path} ({term})"
+        self.new = 0
+
+    def write(self, leads):
+        self.new += self.store.add(self.term, leads)
+
+    def close(self):
+        pass
+
+def read_terms(path):
+    # One term per line; blank lines, comments and repeats are skipped
+    terms = []
+    seen = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            term = ' '.join(line.split())
+            if term and not term.startswith('#') and term.lower() not in seen:
+                seen.add(term.lower())
+                terms.append(term)
+    return terms
+
+def batch_leads(terms_path, num_pages, out, workers=BATCH_WORKERS, page_workers=1, restart=False, fmt='auto'):
+    """Crawl every term in terms_path and write one merged, deduplicated lead file to out.
+
+    Each term keeps its own checkpoint next to out, and the lead store
+    persists between runs, so an interrupted batch picks up where it stopped.
+    """
+    terms = read_terms(terms_path)
+    store_path = f"{out}.leads.sqlite3"
+    if restart:
+        # The export state of a columnar output moves aside with it, so the
+        # new store's leads are all exported again
+        rotate_output(out)
+        remove_store(store_path)
+    store = LeadStore(store_path)
+    
+    def run(term):
+        sink = store.sink(term)
+        crawl_leads(term, num_pages, sink, workers=page_workers,
+                    checkpoint_path=f"{out}.{_slug(term)}.checkpoint.json", resume=not restart)
+        return sink.new
+    
+    try:
+        # Terms share Google's rate limit, so more workers overlap latency rather than raise the request rate
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, term): term for term in terms}
+            for future in as_completed(futures):
+                term = futures[future]
+                try:
+                    print(f"Finished '{term}': {future.result()} new leads")
+                except Exception as e:
+                    print(f"Error crawling '{term}': {e}")
+        
+        count = store.export(out, fmt)
+        print(f"\nWrote {count} unique leads from {len(terms)} search terms to {out}")
+        return count
+    finally:
+        store.close()
+
 if __name__ == "__main__":
-    search_term = input("Enter industry or company type to search (e.g., 'software companies in karachi'): ")
-    scrape_leads(search_term)
+    if len(sys.argv) > 1:
+        parser = argparse.ArgumentParser(description="Crawl Google result pages for leads, resuming where the last run stopped")
+        parser.add_argument('search_term', nargs='?')
+        parser.add_argument('--batch', metavar='TERMS_FILE', help="crawl every search term in this file (one per line)")
+        parser.add_argument('--pages', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=CRAWL_WORKERS,
+                            help="pages in flight per term (in batch mode: terms crawled at once)")
+        parser.add_argument('--out', help="output file; .jsonl writes JSON lines, .parquet and .csv.gz a "
+                                           "date-partitioned dataset directory, anything else CSV")
+        parser.add_argument('--format', choices=['auto', 'csv', 'jsonl', *COLUMNAR_FORMATS], default='auto',
+                            help="output format (default: from the --out extension)")
+        parser.add_argument('--restart', action='store_true',
+                            help="ignore the checkpoint and start from page 1 with a new output "
+                                 "(the previous one is renamed with a timestamp)")
+        args = parser.parse_args()
+        if args.batch:
+            batch_leads(args.batch, args.pages, args.out or f"leads_{_slug(os.path.basename(args.batch))}.csv",
+                        workers=args.workers, restart=args.restart, fmt=args.format)
+        elif args.search_term:
+            out = args.out or f"leads_{_slug(args.search_term)}.csv"
+            fmt = output_format(out, args.format)
+            if args.restart:
+                rotate_output(out)
+            if fmt in COLUMNAR_FORMATS:
+                # Columnar files are written in large chunks, so pages land in
+                # a lead store first (as in batch mode) and are exported at the end
+                if args.restart:
+                    remove_store(f"{out}.leads.sqlite3")
+                store = LeadStore(f"{out}.leads.sqlite3")
+                try:
+                    crawl_leads(args.search_term, args.pages, store.sink(args.search_term),
+                                workers=args.workers, checkpoint_path=f"{out}.checkpoint.json",
+                                resume=not args.restart)
+                    print(f"Wrote {store.export(out, fmt)} new leads to {out}")
+                finally:
+                    store.close()
+            else:
+                sink = JsonLinesSink(out) if fmt == 'jsonl' else CsvSink(out)
+                crawl_leads(args.search_term, args.pages, sink, workers=args.workers,
+                            checkpoint_path=f"{out}.checkpoint.json", resume=not args.restart)
+        else:
+            parser.error("give a search term or --batch TERMS_FILE")
+    else:
+        search_term = input("Enter industry or company type to search (e.g., 'software companies in karachi'): ")
+        scrape_leads(search_term)
@@ -0,0 +1,109 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extractors import GOOGLE_DETAILS, extract_contacts  # noqa: E402
+
+FIXTURES = ['crunchbase_search.html', 'linkedin_search.html', 'yc_search.html']
+
+# The patterns exactly as _search_google and _extract_contacts used to run them
+SIZE_PATTERNS = [
+    r'(\d{1,3}(?:,\d{3})*(?:\+)?\s*employees)',
+    r'((?:about|approximately|over|more than)\s+\d{1,3}(?:,\d{3})*\s+employees)',
+    r'(team of \d{1,3}(?:,\d{3})*(?:\+)?)',
+]
+INDUSTRY_PATTERNS = [
+    r'industry:\s*([^\.]+)',
+    r'(?:is\s+)?(?:a|an)\s+([^,\.]+(?:company|corporation|manufacturer|producer|provider|retailer|supplier))',
+    r'operates\s+in\s+the\s+([^,\.]+)\s+(?:industry|sector|market)',
+    r'leading\s+([^,\.]+(?:company|manufacturer|producer|provider|retailer|supplier))',
+]
+REVENUE_PATTERNS = [
+    r'revenue[:\s]+(?:US)?\$?\s*([\d\.]+\s*(?:billion|million|trillion))',
+    r'(?:US)?\$?\s*([\d\.]+\s*(?:billion|million|trillion))\s+in\s+revenue',
+]
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+PHONE_PATTERN = r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+NAME_PATTERNS = [
+    r'([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)\s*[-–]\s*((?:CEO|CTO|CFO|Founder|Director|Manager|Head\s+of\s+[A-Za-z]+|VP\s+of\s+[A-Za-z]+))',
+    r'((?:CEO|CTO|CFO|Founder|Director|Manager|Head\s+of\s+[A-Za-z]+|VP\s+of\s+[A-Za-z]+))\s*[-:]\s*([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)',
+]
+
+
+def legacy_details(text):
+    # The per-pattern loops _search_google used before the extraction layer
+    text = text.lower()
+    details = {}
+    for pattern in SIZE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            details['company_size'] = match.group(1)
+            break
+    for pattern in INDUSTRY_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            industry = match.group(1).strip()
+            if len(industry) > 5:
+                details['industry'] = industry
+                break
+    for pattern in REVENUE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            details['revenue'] = match.group(1)
+            break
+    return details
+
+
+def legacy_contacts(text):
+    emails = re.findall(EMAIL_PATTERN, text)
+    phones = re.findall(PHONE_PATTERN, text)
+    people = []
+    for pattern in NAME_PATTERNS:
+        for match in re.finditer(pattern, text):
+            people.append(match.groups() if pattern.startswith('([A-Z]') else match.groups()[::-1])
+    return emails, phones, people
+
+
+def combined_details(text):
+    return GOOGLE_DETAILS.extract(text)
+
+
+def timed(func, text, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(text)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the SERP field and contact extractors")
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<24} {'chars':>8} {'details (ms)':>20} {'contacts (ms)':>20}")
+    print(f"{'':<24} {'':>8} {'legacy':>10}{'new':>10} {'legacy':>10}{'new':>10}")
+    for name in FIXTURES:
+        with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+            text = BeautifulSoup(f.read(), 'lxml').get_text()
+
+        if legacy_details(text) != combined_details(text) or legacy_contacts(text) != extract_contacts(text):
+            print(f"warning: results differ on {name}")
+
+        row = [
+            timed(legacy_details, text, args.iterations),
+            timed(combined_details, text, args.iterations),
+            timed(legacy_contacts, text, args.iterations),
+            timed(extract_contacts, text, args.iterations),
+        ]
+        print(f"{name:<24} {len(text):>8} {row[0]:>10.3f}{row[1]:>10.3f} {row[2]:>10.3f}{row[3]:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
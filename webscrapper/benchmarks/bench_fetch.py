@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetch_engine import FetchEngine  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crunchbase_search.html')
+
+# Requests issued per source, mirroring CompanyDataScraper:
+# google (3 SERPs), crunchbase (3 slugs), bloomberg (3 slugs), social (3 SERPs), linkedin (1 SERP)
+SOURCE_REQUESTS = [3, 3, 3, 3, 1]
+
+
+def start_stand_in(latency, port=0):
+    # Local HTTP server standing in for Google/Crunchbase/etc. with a fixed per-request latency
+    with open(FIXTURE, 'rb') as f:
+        body = f.read()
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return web.Response(body=body, content_type='text/html')
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', port, backlog=1024)
+        await site.start()
+        state['port'] = site._server.sockets[0].getsockname()[1]
+        ready.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{state['port']}"
+
+
+def urls_for(base_url, company, source, count):
+    return [f"{base_url}/{company}/{source}/{i}" for i in range(count)]
+
+
+def enrich_threaded(base_url, session, company):
+    # Old behaviour: a fresh 5-thread pool per company, serial GETs inside each source
+    def run_source(source, count):
+        for url in urls_for(base_url, company, source, count):
+            session.get(url).content
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        for future in [executor.submit(run_source, i, n) for i, n in enumerate(SOURCE_REQUESTS)]:
+            future.result()
+
+
+def enrich_engine(base_url, engine, company):
+    futures = []
+    for source, count in enumerate(SOURCE_REQUESTS):
+        futures.extend(engine.submit(url) for url in urls_for(base_url, company, source, count))
+    for future in futures:
+        future.result()
+
+
+def run(label, companies, workers, enrich):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(enrich, range(companies)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {companies} companies in {elapsed:6.2f}s ({companies / elapsed:7.1f} companies/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the threaded fetch path with the async fetch engine")
+    parser.add_argument('--companies', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=16, help="companies enriched at the same time")
+    parser.add_argument('--latency', type=float, default=0.05, help="stand-in response latency in seconds")
+    parser.add_argument('--per-host', type=int, default=64, help="engine per-host cap (the stand-in is a single host)")
+    args = parser.parse_args()
+
+    base_url = start_stand_in(args.latency)
+    total = args.companies * sum(SOURCE_REQUESTS)
+    print(f"{total} requests against {base_url}, {args.latency * 1000:.0f}ms latency")
+
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.workers * 5))
+    run('threaded', args.companies, args.workers, lambda c: enrich_threaded(base_url, session, c))
+
+    engine = FetchEngine(per_host_limit=args.per_host, max_in_flight=args.per_host)
+    try:
+        run('engine', args.companies, args.workers, lambda c: enrich_engine(base_url, engine, c))
+    finally:
+        engine.close()
+
+
+if __name__ == '__main__':
+    main()
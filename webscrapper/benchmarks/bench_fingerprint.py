@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tech_fingerprint import FINGERPRINTER, TechFingerprinter  # noqa: E402
+
+FIXTURES = ['crunchbase_search.html', 'linkedin_search.html', 'yc_search.html']
+
+
+def synthetic_signatures(count, seed=0):
+    # Random markers padded onto the real signature set to show how scan time scales
+    rng = random.Random(seed)
+    signatures = list(FINGERPRINTER.signatures)
+    for i in range(count):
+        marker = ''.join(rng.choice(string.ascii_lowercase + '-_./') for _ in range(rng.randint(6, 18)))
+        signatures.append({'name': f"synthetic-{i}", 'category': 'Synthetic', 'html': [marker]})
+    return signatures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time technology fingerprinting as the signature set grows")
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    bodies = []
+    for name in FIXTURES:
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            bodies.append(f.read())
+    total_kb = sum(len(b) for b in bodies) / 1024
+
+    print(f"{'signatures':>10} {'build (ms)':>12} {'scan (ms)':>12}   ({total_kb:.0f} KB across {len(bodies)} fixtures)")
+    for extra in (0, 1000, 5000, 20000):
+        signatures = synthetic_signatures(extra)
+        start = time.perf_counter()
+        fingerprinter = TechFingerprinter(signatures)
+        build = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for body in bodies:
+                fingerprinter.fingerprint(body)
+        scan = (time.perf_counter() - start) / args.iterations * 1000
+        print(f"{len(signatures):>10} {build:>12.1f} {scan:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
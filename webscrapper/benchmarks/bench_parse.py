@@ -0,0 +1,110 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parsers import labelled_values, serp_results  # noqa: E402
+
+FIXTURES = ['crunchbase_search.html', 'linkedin_search.html', 'yc_search.html']
+
+SERP_RESULT = (
+    '<div class="g"><a href="https://example{0}.com/"><h3>Example {0} Inc</h3></a>'
+    '<div class="VwiC3b">Example {0} is a software company with 120 employees.</div></div>'
+)
+
+
+def load(name):
+    if name.startswith('serp:'):
+        # A results page shaped like Google's: a few results near the top, then
+        # the rest of the page (scripts, footer) that the old code parsed anyway
+        with open(os.path.join(ROOT, name[5:]), 'rb') as f:
+            body = f.read()
+        results = ''.join(SERP_RESULT.format(i) for i in range(10)).encode()
+        marker = body.find(b'<body')
+        marker = body.find(b'>', marker) + 1 if marker != -1 else 0
+        return body[:marker] + results + body[marker:]
+    with open(os.path.join(ROOT, name), 'rb') as f:
+        return f.read()
+
+
+def soup_serp(content):
+    soup = BeautifulSoup(content.decode('utf-8', errors='replace'), 'lxml')
+    return [(r.select_one('a'), r.select_one('.VwiC3b')) for r in soup.select('.g')[:3]]
+
+
+def soup_labels(content):
+    soup = BeautifulSoup(content.decode('utf-8', errors='replace'), 'lxml')
+    return soup.find('span', string='Industries'), soup.find('span', string='Employee Count')
+
+
+VARIANTS = {
+    'soup-serp': soup_serp,
+    'pull-serp': lambda content: serp_results(content, 3),
+    'soup-labels': soup_labels,
+    'pull-labels': lambda content: labelled_values(content, 'span', ['Industries', 'Employee Count']),
+}
+
+
+def cpu_ms(func, content, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        func(content)
+    return (time.process_time() - start) / iterations * 1000
+
+
+def peak_rss_kb(variant, page):
+    # In a fresh interpreter, so one variant's high-water mark doesn't hide another's
+    output = subprocess.check_output([sys.executable, __file__, '--child', variant, page])
+    return int(output)
+
+
+def _status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def child(variant, page):
+    content = load(page)
+    VARIANTS[variant](load(FIXTURES[0]))  # warm up imports and allocator pools
+    # Reset the high-water mark (Linux) so only this parse's peak counts
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    before = _status_kb('VmRSS')
+    VARIANTS[variant](content)
+    print(_status_kb('VmHWM') - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full BeautifulSoup parsing with the targeted pull parsers")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    pages = FIXTURES + [f'serp:{name}' for name in FIXTURES]
+    print(f"{'page':<30} {'KB':>6} {'task':<8} {'soup ms':>9} {'pull ms':>9} {'soup RSS KB':>12} {'pull RSS KB':>12}")
+    for page in pages:
+        content = load(page)
+        for task in ('serp', 'labels'):
+            soup, pull = f'soup-{task}', f'pull-{task}'
+            print(
+                f"{page:<30} {len(content) / 1024:>6.0f} {task:<8}"
+                f" {cpu_ms(VARIANTS[soup], content, args.iterations):>9.2f}"
+                f" {cpu_ms(VARIANTS[pull], content, args.iterations):>9.2f}"
+                f" {peak_rss_kb(soup, page):>12} {peak_rss_kb(pull, page):>12}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parse_pool import ParsePool, google_details, homepage, page_contacts  # noqa: E402
+
+FIXTURES = ['crunchbase_search.html', 'linkedin_search.html', 'yc_search.html']
+HEADERS = {'server': 'cloudflare', 'content-type': 'text/html; charset=utf-8'}
+
+# What the scraper does with each kind of page it fetches
+TASKS = [(google_details, ()), (homepage, (HEADERS,)), (page_contacts, ())]
+
+
+def load_fixtures():
+    pages = []
+    for name in FIXTURES:
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def throughput(pool, pages, count):
+    # Submit every page at once, the way the source threads do, and time
+    # until the last result is back
+    start = time.perf_counter()
+    futures = []
+    for i in range(count):
+        task, args = TASKS[i % len(TASKS)]
+        futures.append(pool.submit(task, pages[i % len(pages)], *args))
+    for future in futures:
+        future.result()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Parse throughput of the saved search pages per worker process count")
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({0, 1, 2, cores // 2 or 1, cores}),
+                        help="worker counts to try; 0 parses inline in the calling thread")
+    args = parser.parse_args()
+
+    pages = load_fixtures()
+    print(f"{len(pages)} fixtures, {sum(map(len, pages)) // 1024}KB, {cores} cores\n")
+    print(f"{'processes':>9} {'pages/s':>9} {'speedup':>8}")
+    baseline = None
+    for processes in args.processes:
+        pool = ParsePool(processes)
+        try:
+            # Warm up: start the workers and let them import the parsers
+            throughput(pool, pages, max(processes, 1) * len(TASKS))
+            rate = throughput(pool, pages, args.pages)
+        finally:
+            pool.close()
+        baseline = baseline or rate
+        print(f"{processes:>9} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(os.path.dirname(ROOT), 'python'))
+
+from fetch_engine import FetchEngine  # noqa: E402
+from parsers import knowledge_panel, labelled_values, page_text, serp_results  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from replay import Archive, ReplayInterceptor, install  # noqa: E402
+from scraper import CompanyDataScraper  # noqa: E402
+from seed_archive import PageSynthesizer, SeedingInterceptor, seed_companies  # noqa: E402
+import scrap  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def enrich_all(engine, companies, concurrency):
+    # _search_company bypasses the result memo so every run does the full pipeline
+    scraper = CompanyDataScraper()
+    scraper.engine = engine
+
+    def timed(name):
+        start = time.perf_counter()
+        scraper._search_company(name)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, [c['name'] for c in companies]))
+    return latencies, time.perf_counter() - start
+
+
+def run_leads(interceptor, pages, runs):
+    # scrape_leads writes a CSV into the working directory and prints a preview
+    scrap.SESSION = install(requests.Session(), interceptor)
+    scrap.RATE_LIMITER = RateLimiter(host_rates={}, default_rate=1e6)
+    latencies = []
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for _ in range(runs):
+                start = time.perf_counter()
+                scrap.scrape_leads('software', num_pages=pages)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+    return latencies
+
+
+def parse_cost(archive_path):
+    # CPU per archived page, with the parser the pipeline uses for that kind of page
+    archive = Archive(archive_path)
+    rows = archive._conn.execute('SELECT url, body FROM exchanges WHERE status = 200').fetchall()
+    archive.close()
+    kinds = {}
+    for url, body in rows:
+        body = bytes(body)
+        host = urlsplit(url).hostname or ''
+        if 'google.com' in host:
+            kind, parse = 'serp', lambda b: (serp_results(b, 3), knowledge_panel(b))
+        elif 'crunchbase.com' in host:
+            kind, parse = 'crunchbase', lambda b: labelled_values(b, 'span', ['Industries', 'Employee Count'])
+        elif 'bloomberg.com' in host:
+            kind, parse = 'bloomberg', lambda b: labelled_values(b, 'div', ['Revenue', 'Industry'])
+        else:
+            kind, parse = 'website', page_text
+        start = time.process_time()
+        parse(body)
+        elapsed = time.process_time() - start
+        total, count, size = kinds.get(kind, (0.0, 0, 0))
+        kinds[kind] = (total + elapsed, count + 1, size + len(body))
+    return kinds
+
+
+def report(label, latencies, elapsed=None):
+    line = (f"{label:<22} p50 {percentile(latencies, 50) * 1000:8.1f}ms  p95 {percentile(latencies, 95) * 1000:8.1f}ms"
+            f"  p99 {percentile(latencies, 99) * 1000:8.1f}ms")
+    if elapsed is not None:
+        line += f"  {len(latencies) / elapsed:7.1f} companies/s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the enrichment pipeline offline against a replay archive")
+    parser.add_argument('--companies', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--latency', type=float, default=0.05, help="mean replayed response latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02, help="uniform +/- jitter around the latency")
+    parser.add_argument('--archive', help="replay archive to use (seeded from the fixtures when missing)")
+    parser.add_argument('--lead-pages', type=int, default=5, help="pages per scrape_leads run")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    workdir = tempfile.TemporaryDirectory()
+    archive_path = args.archive or os.path.join(workdir.name, 'replay.sqlite3')
+    companies = seed_companies(args.companies)
+
+    # Seed: one pass that synthesizes every page the pipeline asks for
+    archive = Archive(archive_path)
+    seeder = SeedingInterceptor(archive, PageSynthesizer(companies))
+    engine = FetchEngine(replay=seeder)
+    enrich_all(engine, companies, 8)
+    run_leads(seeder, args.lead_pages, 1)
+    engine.close()
+    print(f"archive {archive_path}: {len(archive)} exchanges ({seeder.stats['recorded']} synthesized)")
+    print(f"replaying with {args.latency * 1000:.0f}ms +/- {args.jitter * 1000:.0f}ms latency\n")
+
+    interceptor = ReplayInterceptor(archive, 'replay', latency=args.latency, jitter=args.jitter, seed=0)
+    for concurrency in args.concurrency:
+        engine = FetchEngine(replay=interceptor)
+        cpu_start = time.process_time()
+        latencies, elapsed = enrich_all(engine, companies, concurrency)
+        cpu = time.process_time() - cpu_start
+        engine.close()
+        report(f"enrich x{concurrency}", latencies, elapsed)
+        print(f"{'':<22} cpu {cpu / len(companies) * 1000:8.1f}ms per company")
+
+    report(f"scrape_leads {args.lead_pages}p", run_leads(interceptor, args.lead_pages, 5))
+    if interceptor.stats['missing']:
+        print(f"warning: {interceptor.stats['missing']} requests had no recorded response")
+
+    print(f"\n{'page kind':<12} {'pages':>6} {'avg KB':>8} {'cpu ms/page':>12}")
+    for kind, (total, count, size) in sorted(parse_cost(archive_path).items()):
+        print(f"{kind:<12} {count:>6} {size / count / 1024:>8.0f} {total / count * 1000:>12.2f}")
+
+    # ru_maxrss is in KB on Linux
+    print(f"\npeak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    archive.close()
+    workdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import Company, dumps  # noqa: E402
+
+
+def enriched(i):
+    # A typical finished lookup: most scalar fields, a few contacts, two
+    # social listings and a handful of technologies
+    company = Company(f"Company {i}", website=f"https://company{i}.com")
+    partial = Company(company.name)
+    partial.description = f"Company {i} builds software for logistics teams"
+    partial.industry = 'Software Development'
+    partial.company_size = '51-200 employees'
+    partial.headquarters = 'Austin, Texas'
+    partial.founded = '2015'
+    partial.add_profile('linkedin', f"https://www.linkedin.com/company/company{i}",
+                        employees='120', location='Austin, Texas', specialties=['saas', 'logistics'])
+    partial.add_profile('twitter', f"https://twitter.com/company{i}", followers='4.2k', description='official account')
+    company.merge(partial, 'google')
+    site = Company(company.name)
+    site.technologies = {'Frontend': ['React'], 'Analytics': ['Google Analytics']}
+    site.contacts.add(name='Jane Smith', title='CEO')
+    site.contacts.add(email=f"jane.smith@company{i}.com")
+    site.contacts.add(phone='(512) 555-0100')
+    company.merge(site, 'website')
+    company.finish({'google': 'done', 'website': 'done'})
+    company.completeness = 0.9
+    return company
+
+
+def measure(build, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = [build(i) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, size / count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per held company record: slotted Company vs plain dicts")
+    parser.add_argument('--companies', type=int, default=50000)
+    args = parser.parse_args()
+
+    templates = [enriched(i) for i in range(args.companies)]
+    records, record_bytes, _ = measure(lambda i: templates[i].to_dict(), args.companies)
+    del records
+    companies, company_bytes, _ = measure(lambda i: Company.from_dict(templates[i].to_dict()), args.companies)
+    print(f"{args.companies} enriched companies held in memory")
+    print(f"  nested dicts   {record_bytes:>8.0f} bytes per record")
+    print(f"  Company slots  {company_bytes:>8.0f} bytes per record  ({record_bytes / company_bytes:.1f}x smaller)")
+
+    start = time.perf_counter()
+    lines = [dumps(company) for company in companies]
+    elapsed = time.perf_counter() - start
+    print(f"\nNDJSON: {args.companies / elapsed:,.0f} records/s, {sum(map(len, lines)) / len(lines):.0f} bytes per line")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search_index import CompanyIndex  # noqa: E402
+
+INDUSTRIES = ['Technology', 'Software Development', 'Automotive', 'Retail', 'Finance', 'Healthcare', 'Biotechnology',
+              'Logistics', 'Energy', 'Media', 'Education', 'Real Estate', 'Insurance', 'Manufacturing']
+CITIES = ['New York City, New York', 'San Francisco, California', 'Austin, Texas', 'Seattle, Washington',
+          'Boston, Massachusetts', 'Chicago, Illinois', 'Denver, Colorado', 'Miami, Florida', 'Karachi, Pakistan',
+          'London, England', 'Berlin, Germany', 'Toronto, Ontario']
+WORDS = ('cloud platform data analytics security payments marketplace consumer enterprise mobile hardware '
+         'logistics supply chain clinical diagnostics insurance lending banking investment energy solar battery '
+         'vehicle retail grocery fashion media streaming gaming education learning robotics automation '
+         'manufacturing construction property rental travel hospitality food delivery fitness wellness').split()
+SYLLABLES = ['ac', 'me', 'zen', 'tri', 'vo', 'lux', 'nor', 'pix', 'qua', 'ra', 'sol', 'tek', 'ul', 'vex', 'wa', 'xo',
+             'yl', 'zo', 'bri', 'cor', 'dyn', 'el', 'fin', 'gra', 'hel', 'io', 'jet', 'kin', 'lum', 'mo']
+
+QUERIES = ['technology', 'software', 'new york', 'cloud security', 'soft', 'tek', 'data analytics platform',
+           'california energy', 'fin', 'healthcare diagnostics', 'karachi software companies', 'ai', 'ret',
+           'solar battery vehicle', 'streaming media', 'zenpix', 'insur', 'ufacturing']
+
+
+def _vocabulary(rng, size=4000):
+    # Real descriptions draw on a large vocabulary with a few very common
+    # words; pronounceable filler words make up the long tail
+    words = list(WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words, [1 / (rank + 1) for rank in range(size)]
+
+
+def synthetic_companies(count, seed=0):
+    rng = random.Random(seed)
+    words, weights = _vocabulary(rng)
+    companies = []
+    for i in range(count):
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if rng.random() < 0.3:
+            name += ' ' + rng.choice(['Labs', 'Systems', 'Group', 'Technologies', 'Holdings', 'Health', 'Capital'])
+        industry = rng.choice(INDUSTRIES)
+        companies.append({
+            'name': f"{name} {i}" if rng.random() < 0.1 else name,
+            'description': ' '.join(rng.choices(words, weights, k=rng.randint(6, 18))).capitalize(),
+            'industry': industry,
+            'website': f"{name.lower().replace(' ', '')}.com",
+            'location': rng.choice(CITIES),
+        })
+    return companies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /search index on synthetic companies")
+    parser.add_argument('--companies', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    companies = synthetic_companies(args.companies)
+    start = time.perf_counter()
+    index = CompanyIndex(companies)
+    print(f"built index over {len(index)} companies in {time.perf_counter() - start:.2f}s\n")
+
+    # Cold: the first time a query is seen; cached: repeats of it (typeahead
+    # re-sends, page turns) served from the index's result cache
+    print(f"{'query':<28} {'cold ms':>8} {'cached ms':>10}  top result")
+    cold = []
+    for query in QUERIES:
+        start = time.perf_counter()
+        results = index.search(query)
+        cold.append(time.perf_counter() - start)
+        cached = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            index.search(query)
+            cached.append(time.perf_counter() - start)
+        top = results[0]['name'] if results else '-'
+        print(f"{query:<28} {cold[-1] * 1000:>8.3f} {percentile(cached, 50) * 1000:>10.4f}  {top}")
+
+    for page in (2, 10):
+        start = time.perf_counter()
+        index.search('software companies', page=page)
+        print(f"{'software companies, page ' + str(page):<28} {(time.perf_counter() - start) * 1000:>8.3f}")
+    print(f"\ncold queries: p50 {percentile(cold, 50) * 1000:.3f}ms  max {max(cold) * 1000:.3f}ms")
+
+if __name__ == '__main__':
+    main()
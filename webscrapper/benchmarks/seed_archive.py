@@ -0,0 +1,173 @@
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fetch_engine import FetchResponse  # noqa: E402
+from replay import ReplayInterceptor  # noqa: E402
+
+# Saved pages used as the bulk of every synthesized page, so parse work is realistic
+FILLERS = {
+    'serp': 'crunchbase_search.html',
+    'crunchbase': 'crunchbase_search.html',
+    'bloomberg': 'linkedin_search.html',
+    'website': 'yc_search.html',
+}
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def seed_companies(count):
+    """`count` distinct companies modelled on the records in companies.json."""
+    with open(os.path.join(ROOT, 'companies.json'), encoding='utf-8') as f:
+        templates = json.load(f)
+    companies = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        name = template['name'] if i < len(templates) else f"{template['name']} {i}"
+        slug = _slug(name)
+        companies.append({
+            **template,
+            'name': name,
+            'slug': slug,
+            'website': template['website'] if i < len(templates) else f"https://www.{slug.replace('-', '')}.com",
+            'emails': [f"info@{slug.replace('-', '')}.com", f"jane.doe@{slug.replace('-', '')}.com"],
+        })
+    return companies
+
+
+class PageSynthesizer:
+    """Builds a plausible response for any URL the pipeline requests, from seed companies."""
+
+    def __init__(self, companies):
+        self.companies = companies
+        self._by_slug = {}
+        self._by_host = {}
+        for company in companies:
+            for variant in (company['name'].lower().replace(' ', '-'), company['name'].lower().replace(' ', ''),
+                            company['name'].lower().replace(' ', '_')):
+                self._by_slug[variant] = company
+            self._by_host[urlsplit(company['website']).hostname] = company
+        self._fillers = {}
+        for kind, name in FILLERS.items():
+            with open(os.path.join(ROOT, name), 'rb') as f:
+                body = f.read()
+            start = body.find(b'>', body.find(b'<body')) + 1
+            self._fillers[kind] = (body[:start], body[start:])
+
+    def _page(self, kind, inner):
+        head, rest = self._fillers[kind]
+        return head + inner.encode() + rest
+
+    def _mentioned(self, query):
+        query = query.lower()
+        found = [c for c in self.companies if c['name'].lower() in query]
+        # Longest name first, so "DataDog 12" wins over "DataDog 1"
+        return sorted(found, key=lambda c: -len(c['name']))
+
+    def respond(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if host.endswith('google.com') and parts.path == '/search':
+            params = parse_qs(parts.query)
+            query, start = params.get('q', [''])[0], int(params.get('start', ['0'])[0])
+            return self._ok(url, self._page('serp', self._serp(query, start)))
+        if host.endswith('crunchbase.com') and parts.path.startswith('/organization/'):
+            company = self._by_slug.get(parts.path.rsplit('/', 1)[-1])
+            if company:
+                inner = (f"<span>Industries</span><span>{html.escape(company['industry'])}</span>"
+                         f"<span>Employee Count</span><span>{html.escape(company['employees'])}</span>")
+                return self._ok(url, self._page('crunchbase', inner))
+        if host.endswith('bloomberg.com') and parts.path.startswith('/profile/'):
+            company = self._by_slug.get(parts.path.rsplit('/', 1)[-1])
+            if company:
+                inner = (f"<div>Revenue</div><div>$2.1 billion</div>"
+                         f"<div>Industry</div><div>{html.escape(company['industry'])}</div>")
+                return self._ok(url, self._page('bloomberg', inner))
+        company = self._by_host.get(host)
+        if company:
+            return self._ok(url, self._page('website', self._website(company, parts.path)))
+        return FetchResponse(url, 404, {}, b'')
+
+    @staticmethod
+    def _ok(url, body):
+        return FetchResponse(url, 200, {'content-type': 'text/html; charset=utf-8'}, body, 'utf-8')
+
+    def _serp(self, query, start):
+        companies = self._mentioned(query)
+        if not companies:
+            # Category searches (filter search, scrape_leads) list a page of companies
+            companies = self.companies[start % len(self.companies):][:10] or self.companies[:10]
+        company = companies[0]
+        results = []
+        if 'wikipedia' in query:
+            results.append(
+                f'<div class="kp-header"><div class="kno-rdesc"><span>{html.escape(company["description"])}</span></div>'
+                f'<div class="rVusze">Founded: 2010</div><div class="rVusze">Headquarters: {html.escape(company["location"])}</div>'
+                f'<div class="rVusze">Industry: {html.escape(company["industry"])}</div></div>'
+            )
+        for site in ('linkedin.com', 'facebook.com', 'twitter.com', 'instagram.com'):
+            if f'site:{site}' in query:
+                handle = company['slug']
+                path = f'company/{handle}' if site == 'linkedin.com' else handle
+                snippet = (f"{company['name']} | {company['industry']} · {company['location']} · "
+                           f"{company['employees']} employees · 12,400 followers")
+                results.append(self._result(f"https://www.{site}/{path}", company['name'], snippet))
+        for c in companies:
+            results.append(self._result(
+                c['website'], f"{c['name']} - Official Site",
+                f"{c['description']} {c['name']} has {c['employees']} employees and $2.1 billion in revenue. "
+                f"Industry: {c['industry']}.",
+            ))
+        return ''.join(results)
+
+    @staticmethod
+    def _result(url, title, snippet):
+        return (f'<div class="g"><a href="{html.escape(url)}"><h3>{html.escape(title)}</h3></a>'
+                f'<cite>{html.escape(url)}</cite><div class="VwiC3b">{html.escape(snippet)}</div></div>')
+
+    @staticmethod
+    def _website(company, path):
+        people = '<p>Jane Doe - CEO</p>\n<p>John Smith - CTO</p>' if path.strip('/') in ('team', 'leadership', 'about') else ''
+        emails = '\n'.join(f'<p><a href="mailto:{e}">{e}</a></p>' for e in company['emails'])
+        scripts = '<script src="https://cdn.segment.com/analytics.js"></script><div id="__next"></div>'
+        return f'{scripts}\n<h1>{html.escape(company["name"])}</h1>\n{people}\n<p>Call +1 (415) 555-0100</p>\n{emails}\n'
+
+
+class SeedingInterceptor(ReplayInterceptor):
+    """Replays the archive and synthesizes (and stores) whatever it doesn't have yet."""
+
+    def __init__(self, archive, synthesizer):
+        super().__init__(archive, 'replay')
+        self.synthesizer = synthesizer
+
+    def lookup(self, url):
+        response = self.archive.get(url)
+        if response is None:
+            response = self.synthesizer.respond(url)
+            self.archive.put(url, response)
+            self.stats['recorded'] += 1
+        else:
+            self.stats['replayed'] += 1
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the synthesized response for a URL")
+    parser.add_argument('url')
+    parser.add_argument('--companies', type=int, default=10)
+    args = parser.parse_args()
+    response = PageSynthesizer(seed_companies(args.companies)).respond(args.url)
+    print(response.status_code, len(response.content))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from domain_lookup import QTYPES, DnsResolver, encode_name, parse_query, website_domain  # noqa: E402
+from seed_archive import seed_companies  # noqa: E402
+
+# QR, AA, RD and RA set; the rcode goes in the low bits
+RESPONSE_FLAGS = 0x8580
+NXDOMAIN = 3
+SOA_MINIMUM = 60
+
+
+def zone_from_companies(count, ttl=300):
+    """A, MX and NS records for the websites of `count` seed companies (see seed_archive.py)."""
+    zone = {}
+    for i, company in enumerate(seed_companies(count)):
+        domain = website_domain(company.get('website'))
+        if domain:
+            zone[domain] = {
+                'A': [f"127.0.{i // 250}.{i % 250 + 1}"],
+                'MX': [[10, f"mx1.{domain}"], [20, f"mx2.{domain}"]],
+                'NS': [f"ns1.{domain}", f"ns2.{domain}"],
+                'ttl': ttl,
+            }
+    return zone
+
+
+class StubDnsServer(asyncio.DatagramProtocol):
+    """Answers A, MX and NS queries from a {domain: {'A': [...], 'MX': [[pref, host]], 'NS': [...], 'ttl': n}} zone.
+
+    Names outside the zone get NXDOMAIN with an SOA, so negative caching can be seen too.
+    """
+
+    def __init__(self, zone):
+        self.zone = {name.lower(): records for name, records in zone.items()}
+        self.queries = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        try:
+            qid, name, qtype, question = parse_query(data)
+        except (ValueError, IndexError, struct.error):
+            return
+        self.transport.sendto(self.answer(qid, name, qtype, question), addr)
+
+    def answer(self, qid, name, qtype, question):
+        records = self.zone.get(name)
+        if records is None:
+            soa = (encode_name(f"ns1.{name}") + encode_name(f"hostmaster.{name}")
+                   + struct.pack('!IIIII', 1, 3600, 600, 86400, SOA_MINIMUM))
+            authority = self._record(name, 'SOA', SOA_MINIMUM, soa)
+            return struct.pack('!HHHHHH', qid, RESPONSE_FLAGS | NXDOMAIN, 1, 0, 1, 0) + question + authority
+        ttl = records.get('ttl', 300)
+        answers = []
+        for value in records.get(qtype, ()):
+            if qtype == 'A':
+                rdata = bytes(int(part) for part in value.split('.'))
+            elif qtype == 'MX':
+                rdata = struct.pack('!H', value[0]) + encode_name(value[1])
+            else:
+                rdata = encode_name(value)
+            answers.append(self._record(name, qtype, ttl, rdata))
+        return struct.pack('!HHHHHH', qid, RESPONSE_FLAGS, 1, len(answers), 0, 0) + question + b''.join(answers)
+
+    @staticmethod
+    def _record(name, qtype, ttl, rdata):
+        return encode_name(name) + struct.pack('!HHIH', QTYPES[qtype], 1, ttl, len(rdata)) + rdata
+
+
+async def start(zone, host='127.0.0.1', port=0):
+    """Starts a stub server on the running loop; returns (transport, server, (host, port))."""
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(lambda: StubDnsServer(zone), local_addr=(host, port))
+    return transport, server, transport.get_extra_info('sockname')[:2]
+
+
+async def bench(zone, rounds):
+    transport, server, address = await start(zone)
+    resolver = DnsResolver(servers=[address])
+    questions = [(domain, qtype) for domain in zone for qtype in ('A', 'MX', 'NS')]
+    questions += [(f"missing-{i}.example", 'A') for i in range(len(zone))]
+    try:
+        for label in ['cold'] + ['cached'] * rounds:
+            start_time = time.perf_counter()
+            answers = await resolver.resolve_many(questions)
+            elapsed = time.perf_counter() - start_time
+            answered = sum(1 for values in answers.values() if values is not None)
+            print(f"  {label:<7} {len(questions)} questions in {elapsed * 1000:7.1f} ms, {answered} answered")
+    finally:
+        transport.close()
+    print(f"queries that reached the server: {server.queries}, resolver stats: {resolver.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub DNS server for offline domain lookups")
+    parser.add_argument('--zone', help="JSON zone file; defaults to the websites of the seed companies")
+    parser.add_argument('--companies', type=int, default=1000, help="seed companies in the default zone")
+    parser.add_argument('--serve', action='store_true',
+                        help="keep serving (point the scraper at it with DNS_SERVERS=host:port)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5353)
+    parser.add_argument('--rounds', type=int, default=1, help="cached rounds after the cold one")
+    args = parser.parse_args()
+
+    if args.zone:
+        with open(args.zone, encoding='utf-8') as f:
+            zone = json.load(f)
+    else:
+        zone = zone_from_companies(args.companies)
+
+    if not args.serve:
+        print(f"{len(zone)} domains, batched A/MX/NS lookups plus one missing name each")
+        asyncio.run(bench(zone, args.rounds))
+        return
+
+    async def serve():
+        transport, _, address = await start(zone, args.host, args.port)
+        print(f"Serving {len(zone)} domains on {address[0]}:{address[1]}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            transport.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
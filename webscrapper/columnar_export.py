@@ -0,0 +1,261 @@
+"""Chunked, compressed, date-partitioned exports for analytics.
+
+Rows are buffered up to a fixed count and then written out as new files under
+<root>/dt=<YYYY-MM-DD>/, the day being taken from one of the row's columns,
+so a run only ever adds files and never rewrites what an earlier one wrote.
+The directory key is a separate name from the column: a hive reader adds it
+as its own column, and a name shared with a column in the files would make
+the reader's string partition values clash with the column's type. A Parquet flush writes one new part file.
+A gzip CSV flush appends one gzip member to the run's part file in each
+partition (gzip readers read concatenated members as one stream). pandas,
+pyarrow.dataset, DuckDB and Spark all read the directory as one table
+partitioned by date.
+
+Parquet parts are written under a dot-prefixed name and renamed into place.
+Readers skip names starting with '.' or '_', which is also where the export
+state lives (`_export_state.json`). It records how far the source has been
+exported, so the next run appends only what's new.
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import json
+import logging
+import os
+import time
+import uuid
+
+from company_store import DEFAULT_COMPANY_STORE_PATH, CompanyStore, company_key
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('parquet', 'csv.gz')
+
+# Rows held in memory across all partitions before they're written out
+DEFAULT_BUFFER_ROWS = 50000
+PARQUET_COMPRESSION = 'zstd'
+GZIP_LEVEL = 6
+
+STATE_FILE = '_export_state.json'
+
+# Name of the hive partition key in directory names (<root>/dt=YYYY-MM-DD/)
+PARTITION_KEY = 'dt'
+
+# Flat columns for enriched companies: (name, type), type being one of
+# string, int, float or timestamp
+COMPANY_COLUMNS = (
+    ('name', 'string'),
+    ('domain', 'string'),
+    ('website', 'string'),
+    ('description', 'string'),
+    ('industry', 'string'),
+    ('company_size', 'string'),
+    ('revenue', 'string'),
+    ('headquarters', 'string'),
+    ('founded', 'string'),
+    ('emails', 'string'),
+    ('phones', 'string'),
+    ('contact_count', 'int'),
+    ('linkedin', 'string'),
+    ('twitter', 'string'),
+    ('facebook', 'string'),
+    ('instagram', 'string'),
+    ('technologies', 'string'),
+    ('completeness', 'float'),
+    ('updated_at', 'timestamp'),
+)
+
+
+def _arrow():
+    # pyarrow is only needed for Parquet output
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow), or use the csv.gz format") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _partition(value):
+    # Dates, datetimes and 'YYYY-MM-DD...' strings all partition by their day
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    return 'unknown'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def read_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_state(root, state):
+    path = os.path.join(root, STATE_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+
+class PartitionedWriter:
+    """Buffers rows and appends them to a dataset directory partitioned (as dt=) by the day in one column."""
+
+    def __init__(self, root, columns, partition_by, fmt='parquet', buffer_rows=DEFAULT_BUFFER_ROWS):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        if fmt == 'parquet':
+            _arrow()
+        self.root = root
+        self.columns = tuple(columns)
+        self.partition_by = partition_by
+        self.fmt = fmt
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self.files = set()
+
+        self._run = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._buffers = {}
+        self._buffered = 0
+        self._parts = 0
+        os.makedirs(root, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, row):
+        self._buffers.setdefault(_partition(row.get(self.partition_by)), []).append(row)
+        self._buffered += 1
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        for partition, rows in self._buffers.items():
+            directory = os.path.join(self.root, f"{PARTITION_KEY}={partition}")
+            os.makedirs(directory, exist_ok=True)
+            if self.fmt == 'parquet':
+                self._write_parquet(directory, rows)
+            else:
+                self._write_csv_gz(directory, rows)
+            self.rows_written += len(rows)
+        self._buffers = {}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def _write_parquet(self, directory, rows):
+        pa, pq = _arrow()
+        types = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(),
+                 'timestamp': pa.timestamp('us', tz='UTC')}
+        table = pa.table({
+            name: pa.array([row.get(name) for row in rows], type=types[kind]) for name, kind in self.columns
+        })
+        self._parts += 1
+        name = f"part-{self._run}-{self._parts:05d}.parquet"
+        temp = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temp, compression=PARQUET_COMPRESSION)
+        os.replace(temp, os.path.join(directory, name))
+        self.files.add(os.path.join(directory, name))
+
+    def _write_csv_gz(self, directory, rows):
+        # One complete gzip member per flush, written with a single call so a
+        # crash can't leave half a member behind
+        path = os.path.join(directory, f"part-{self._run}.csv.gz")
+        text = io.StringIO()
+        writer = csv.writer(text)
+        if path not in self.files:
+            writer.writerow([name for name, _ in self.columns])
+        writer.writerows([_csv_value(row.get(name)) for name, _ in self.columns] for row in rows)
+        with open(path, 'ab') as f:
+            f.write(gzip.compress(text.getvalue().encode('utf-8'), GZIP_LEVEL))
+        self.files.add(path)
+
+
+def company_row(record, updated_at=None):
+    """A company record (as stored or as returned by the scraper) flattened to COMPANY_COLUMNS."""
+    key = company_key(record)
+    contacts = record.get('contacts') or []
+    profiles = record.get('social_profiles') or {}
+    technologies = record.get('technologies') or {}
+    if isinstance(technologies, dict):
+        technologies = [name for names in technologies.values() for name in names]
+    return {
+        'name': record.get('name') or record.get('company_name'),
+        'domain': None if key.startswith('name:') else key,
+        'website': record.get('website'),
+        'description': record.get('description'),
+        'industry': record.get('industry'),
+        'company_size': record.get('company_size'),
+        'revenue': record.get('revenue'),
+        'headquarters': record.get('headquarters') or record.get('location'),
+        'founded': record.get('founded'),
+        'emails': '; '.join(c['email'] for c in contacts if c.get('email')) or None,
+        'phones': '; '.join(c['phone'] for c in contacts if c.get('phone')) or None,
+        'contact_count': len(contacts),
+        'linkedin': profiles.get('linkedin'),
+        'twitter': profiles.get('twitter'),
+        'facebook': profiles.get('facebook'),
+        'instagram': profiles.get('instagram'),
+        'technologies': '; '.join(technologies) or None,
+        'completeness': record.get('completeness'),
+        'updated_at': datetime.datetime.fromtimestamp(updated_at, datetime.timezone.utc) if updated_at else None,
+    }
+
+
+def export_companies(store, root, fmt='parquet', buffer_rows=DEFAULT_BUFFER_ROWS):
+    """Append the companies stored or updated since the last export to root; returns how many were written.
+
+    A company enriched again since then is written again, into the partition
+    of its new update date; take the latest row per domain to deduplicate.
+    """
+    state = read_state(root)
+    since = state.get('companies_updated_at', 0.0)
+    latest = since
+    with PartitionedWriter(root, COMPANY_COLUMNS, 'updated_at', fmt, buffer_rows) as writer:
+        for updated_at, record in store.changed_since(since):
+            writer.write(company_row(record, updated_at))
+            latest = max(latest, updated_at)
+    if latest > since:
+        write_state(root, dict(state, companies_updated_at=latest))
+    logger.info(f"Exported {writer.rows_written} companies to {root}")
+    return writer.rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append newly enriched companies to a date-partitioned dataset")
+    parser.add_argument('root', help="dataset directory; partitions are created under it")
+    parser.add_argument('--format', choices=FORMATS, default='parquet')
+    parser.add_argument('--store', default=DEFAULT_COMPANY_STORE_PATH)
+    parser.add_argument('--buffer-rows', type=int, default=DEFAULT_BUFFER_ROWS,
+                        help="rows held in memory before they're written out")
+    args = parser.parse_args()
+    store = CompanyStore(args.store)
+    try:
+        count = export_companies(store, args.root, args.format, args.buffer_rows)
+    finally:
+        store.close()
+    print(f"Wrote {count} companies to {args.root}")
+
+
+if __name__ == '__main__':
+    main()
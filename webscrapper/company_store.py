@@ -0,0 +1,289 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPANY_STORE_PATH = os.environ.get(
+    'COMPANY_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'companies.sqlite3'),
+)
+
+# Relative weight of a match in each full-text column, in column order
+SEARCH_COLUMNS = ('name', 'description', 'industry', 'location')
+SEARCH_WEIGHTS = (3.0, 1.0, 2.0, 1.5)
+
+_TOKEN = re.compile(r'\w+')
+
+
+# Sites that host pages about many companies. A scraped "website" on one of
+# these (a Wikipedia article, a LinkedIn page) doesn't identify the company.
+# google.com and apple.com are companies' own sites; only the subdomains that
+# host other companies' pages are listed for them.
+SHARED_HOSTS = (
+    'wikipedia.org', 'wikimedia.org', 'linkedin.com', 'facebook.com', 'twitter.com', 'x.com', 'instagram.com',
+    'youtube.com', 'tiktok.com', 'pinterest.com', 'crunchbase.com', 'bloomberg.com', 'glassdoor.com', 'indeed.com',
+    'zoominfo.com', 'yelp.com', 'ycombinator.com', 'wellfound.com', 'angel.co', 'github.com', 'medium.com',
+    'sites.google.com', 'play.google.com', 'maps.google.com', 'business.google.com', 'apps.apple.com',
+    'podcasts.apple.com', 'blogspot.com', 'wordpress.com', 'wixsite.com',
+)
+
+
+def shared_host(host):
+    return any(host == domain or host.endswith('.' + domain) for domain in SHARED_HOSTS)
+
+
+def company_key(record):
+    # Companies are identified by their website's domain; ones without a
+    # usable website, or whose website is a page on a shared site, fall back
+    # to their name
+    website = (record.get('website') or '').strip().lower()
+    if website and website != 'n/a':
+        host = urlsplit(website if '://' in website else f"//{website}").hostname or ''
+        host = host[4:] if host.startswith('www.') else host
+        if '.' in host and not shared_host(host):
+            return host
+    return f"name:{' '.join((record.get('name') or record.get('company_name') or '').lower().split())}"
+
+
+def _normalize(record):
+    # Accept the scraper's records, lead rows and the sample records alike
+    record = dict(record)
+    if not record.get('name') and record.get('company_name'):
+        record['name'] = record.pop('company_name')
+    if not record.get('location') and record.get('headquarters'):
+        record['location'] = record['headquarters']
+    return record
+
+
+def _merge(old, new):
+    # Newly found values win; empty ones never erase what we already had
+    merged = dict(old)
+    for field, value in new.items():
+        if value in (None, '', [], {}):
+            merged.setdefault(field, value)
+        elif isinstance(value, dict) and isinstance(merged.get(field), dict):
+            merged[field] = _merge(merged[field], value)
+        else:
+            merged[field] = value
+    return merged
+
+
+def match_query(text, typing=False):
+    # FTS5 query requiring every word; the word being typed matches as a prefix
+    tokens = _TOKEN.findall(text.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if typing:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class CompanyStore:
+    """Company records in SQLite, searchable through an FTS5 index.
+
+    Records are keyed by website domain and upserted, so enriching the same
+    company again fills in its record instead of adding a second one.
+    """
+
+    def __init__(self, path=DEFAULT_COMPANY_STORE_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS companies (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                description TEXT,
+                industry TEXT,
+                location TEXT,
+                website TEXT,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS companies_industry ON companies (industry COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS companies_updated ON companies (updated_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
+                name, description, industry, location,
+                content='companies', content_rowid='id', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS companies_ai AFTER INSERT ON companies BEGIN
+                INSERT INTO companies_fts (rowid, name, description, industry, location)
+                VALUES (new.id, new.name, new.description, new.industry, new.location);
+            END;
+            CREATE TRIGGER IF NOT EXISTS companies_ad AFTER DELETE ON companies BEGIN
+                INSERT INTO companies_fts (companies_fts, rowid, name, description, industry, location)
+                VALUES ('delete', old.id, old.name, old.description, old.industry, old.location);
+            END;
+            CREATE TRIGGER IF NOT EXISTS companies_au AFTER UPDATE ON companies BEGIN
+                INSERT INTO companies_fts (companies_fts, rowid, name, description, industry, location)
+                VALUES ('delete', old.id, old.name, old.description, old.industry, old.location);
+                INSERT INTO companies_fts (rowid, name, description, industry, location)
+                VALUES (new.id, new.name, new.description, new.industry, new.location);
+            END;
+        ''')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM companies').fetchone()[0]
+
+    def _upsert(self, record, now):
+        record = _normalize(record)
+        if not record.get('name'):
+            return False
+        key = company_key(record)
+        row = self._conn.execute('SELECT record FROM companies WHERE key = ?', (key,)).fetchone()
+        if row:
+            record = _merge(json.loads(row[0]), record)
+        self._conn.execute(
+            'INSERT INTO companies (key, name, description, industry, location, website, record, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET name = excluded.name, description = excluded.description, '
+            'industry = excluded.industry, location = excluded.location, website = excluded.website, '
+            'record = excluded.record, updated_at = excluded.updated_at',
+            (key, record['name'], record.get('description'), record.get('industry'), record.get('location'),
+             record.get('website'), json.dumps(record), now),
+        )
+        return True
+
+    def upsert(self, record):
+        """Insert record, or merge it into the stored record for the same company."""
+        return self.upsert_many([record]) == 1
+
+    def upsert_many(self, records):
+        # One transaction for the lot; returns how many records were stored
+        now = time.time()
+        stored = 0
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for record in records:
+                    stored += self._upsert(record, now)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return stored
+
+    def bulk_import(self, path, batch_size=5000):
+        """Upsert every record in a JSON file holding a list of company records."""
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+        stored = 0
+        for start in range(0, len(records), batch_size):
+            stored += self.upsert_many(records[start:start + batch_size])
+        logger.info(f"Imported {stored} companies from {path}")
+        return stored
+
+    def _records(self, sql, params):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, website):
+        records = self._records('SELECT record FROM companies WHERE key = ?', (company_key({'website': website}),))
+        return records[0] if records else None
+
+    def by_industry(self, industry, limit=100, offset=0):
+        return self._records(
+            'SELECT record FROM companies WHERE industry = ? COLLATE NOCASE ORDER BY name LIMIT ? OFFSET ?',
+            (industry, limit, offset),
+        )
+
+    def by_location(self, location, limit=100, offset=0):
+        # Every word of location, in the location column ("new york" matches "New York City, New York")
+        query = match_query(location)
+        if query is None:
+            return []
+        return self._records(
+            'SELECT c.record FROM companies_fts JOIN companies c ON c.id = companies_fts.rowid '
+            'WHERE companies_fts MATCH ? ORDER BY c.name LIMIT ? OFFSET ?',
+            (f'location : ({query})', limit, offset),
+        )
+
+    def search(self, query, page=1, per_page=10):
+        """Companies matching every word of query, best match first."""
+        match = match_query(query, typing=not query[-1:].isspace())
+        if match is None:
+            return []
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        return self._records(
+            f'SELECT c.record FROM companies_fts JOIN companies c ON c.id = companies_fts.rowid '
+            f'WHERE companies_fts MATCH ? ORDER BY bm25(companies_fts, {weights}) LIMIT ? OFFSET ?',
+            (match, per_page, (page - 1) * per_page),
+        )
+
+    def iter_records(self, batch_size=1000):
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id, record FROM companies WHERE id > ? ORDER BY id LIMIT ?', (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row_id, record in rows:
+                last = row_id
+                yield json.loads(record)
+
+    def changed_since(self, since=0.0, batch_size=1000):
+        # (updated_at, record) for companies stored or updated after since,
+        # oldest first; paged by (updated_at, id) since batches share timestamps
+        last = (since, 2 ** 63 - 1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT updated_at, id, record FROM companies '
+                    'WHERE updated_at > ? OR (updated_at = ? AND id > ?) ORDER BY updated_at, id LIMIT ?',
+                    (last[0], last[0], last[1], batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for updated_at, row_id, record in rows:
+                last = (updated_at, row_id)
+                yield updated_at, json.loads(record)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_company_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CompanyStore()
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import company records from JSON files into the company store")
+    parser.add_argument('files', nargs='+', help="JSON files each holding a list of company records")
+    parser.add_argument('--store', default=DEFAULT_COMPANY_STORE_PATH)
+    args = parser.parse_args()
+    store = CompanyStore(args.store)
+    for path in args.files:
+        print(f"{path}: {store.bulk_import(path)} records")
+    print(f"{len(store)} companies in {args.store}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
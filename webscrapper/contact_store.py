@@ -0,0 +1,175 @@
+import re
+import threading
+
+DEFAULT_COUNTRY_CODE = '1'
+
+_NON_DIGIT = re.compile(r'\D')
+_LOCAL_SEPARATORS = re.compile(r'[._\-+]')
+
+
+def normalize_email(email):
+    return email.strip().lower() if email else None
+
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    # E.164: "+" followed by country code and subscriber number
+    if not phone:
+        return None
+    digits = _NON_DIGIT.sub('', phone)
+    if phone.strip().startswith('+'):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f"+{country_code}{digits}"
+    if len(digits) == 11 and digits.startswith(country_code):
+        return f"+{digits}"
+    return None
+
+
+def phone_key(phone):
+    # Numbers that couldn't be put in E.164 are kept as found, and still match on their digits
+    return _NON_DIGIT.sub('', phone)
+
+
+def normalize_name(name):
+    return ' '.join(name.casefold().split()) if name else None
+
+
+def email_keys_for_name(name):
+    # Mailbox names a person is commonly given: john.smith, jsmith, john, ...
+    parts = [p for p in re.split(r'\W+', name.casefold()) if p]
+    if len(parts) < 2:
+        return set(parts)
+    first, last = parts[0], parts[-1]
+    return {first, f"{first}{last}", f"{first[0]}{last}", f"{first}{last[0]}", f"{last}{first[0]}", f"{last}{first}"}
+
+
+def email_key(email):
+    local = email.split('@', 1)[0]
+    return _LOCAL_SEPARATORS.sub('', local)
+
+
+class Contact:
+    """One person or mailbox at a company, with the source that found it."""
+
+    __slots__ = ('name', 'title', 'email', 'phone', 'source', 'confidence', 'email_verified', 'phone_normalized')
+
+    def __init__(self, name=None, title=None, email=None, phone=None, source=None, confidence=None,
+                 email_verified=None, phone_normalized=None):
+        self.name = name
+        self.title = title
+        self.email = email
+        self.phone = phone
+        self.source = source
+        self.confidence = confidence
+        # Whether the email's domain accepts mail; None until it's been looked up
+        self.email_verified = email_verified
+        # False when phone is kept as found because it couldn't be put in E.164
+        self.phone_normalized = phone_normalized
+
+    def __repr__(self):
+        return f"Contact(name={self.name!r}, email={self.email!r}, phone={self.phone!r})"
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'title': self.title, 'email': self.email, 'phone': self.phone,
+            'source': self.source, 'confidence': self.confidence, 'email_verified': self.email_verified,
+            'phone_normalized': self.phone_normalized,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('name'), data.get('title'), data.get('email'), data.get('phone'),
+                   data.get('source'), data.get('confidence'), data.get('email_verified'),
+                   data.get('phone_normalized'))
+
+
+class ContactStore:
+    """Contacts for one company, deduplicated and merged through hash indexes."""
+
+    def __init__(self):
+        self._contacts = []
+        self._by_email = {}
+        self._by_phone = {}
+        self._by_name = {}
+        # Partial records waiting to be paired: name-only contacts by the
+        # mailbox keys their name suggests, email-only contacts by mailbox key
+        self._names_without_email = {}
+        self._emails_without_name = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._contacts)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._contacts))
+
+    def add(self, name=None, title=None, email=None, phone=None, source=None, confidence=None):
+        name = ' '.join(name.split()) if name else None
+        email = normalize_email(email)
+        raw_phone = ' '.join(phone.split()) if phone else None
+        phone = normalize_phone(raw_phone)
+        phone_normalized = phone is not None if raw_phone else None
+        phone = phone or raw_phone
+        name_key = normalize_name(name)
+        if not (name or email or phone):
+            return None
+
+        with self._lock:
+            index = self._find(name_key, email, phone)
+            if index is None:
+                index = len(self._contacts)
+                self._contacts.append(Contact(source=source, confidence=confidence))
+            self._merge(index, name, name_key, title, email, phone, phone_normalized)
+            return self._contacts[index]
+
+    def _find(self, name_key, email, phone):
+        if email and email in self._by_email:
+            return self._by_email[email]
+        if phone and phone_key(phone) in self._by_phone:
+            return self._by_phone[phone_key(phone)]
+        if name_key and name_key in self._by_name:
+            return self._by_name[name_key]
+        # A name and an email that look like the same person belong together
+        if email and not name_key:
+            return self._names_without_email.get(email_key(email))
+        if name_key and not email:
+            for key in email_keys_for_name(name_key):
+                if key in self._emails_without_name:
+                    return self._emails_without_name[key]
+        return None
+
+    def _merge(self, index, name, name_key, title, email, phone, phone_normalized=None):
+        contact = self._contacts[index]
+
+        if name and not contact.name:
+            contact.name = name
+            self._by_name[name_key] = index
+            if contact.email:
+                self._emails_without_name.pop(email_key(contact.email), None)
+            else:
+                for key in email_keys_for_name(name_key):
+                    self._names_without_email.setdefault(key, index)
+
+        if title and not contact.title:
+            contact.title = title
+
+        if email and not contact.email:
+            contact.email = email
+            self._by_email[email] = index
+            if contact.name:
+                for key in email_keys_for_name(normalize_name(contact.name)):
+                    if self._names_without_email.get(key) == index:
+                        del self._names_without_email[key]
+            else:
+                self._emails_without_name.setdefault(email_key(email), index)
+
+        if phone and not contact.phone:
+            contact.phone = phone
+            contact.phone_normalized = phone_normalized
+            if phone_key(phone):
+                self._by_phone[phone_key(phone)] = index
+
+    def to_list(self):
+        with self._lock:
+            return [contact.to_dict() for contact in self._contacts]
@@ -0,0 +1,448 @@
+"""DNS and WHOIS facts about a company's domain.
+
+A domain's A, MX and NS records say whether it's live, who handles its mail
+and where it's hosted, and its WHOIS creation date bounds when the company
+was founded. Each costs a single packet or a single short TCP exchange, where
+another search results page costs a full page fetch.
+
+Lookups go through a small asyncio DNS client. All the queries in one batch
+are sent together from a single UDP socket. Answers are cached for their TTL,
+and a name that doesn't exist is cached for its zone's negative TTL. The
+nameservers come from DNS_SERVERS (comma-separated host[:port]) or
+/etc/resolv.conf, so the client can be pointed at a local stub server
+(benchmarks/stub_dns.py).
+"""
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import random
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+QTYPES = {'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'MX': 15}
+_QTYPE_NAMES = {number: name for name, number in QTYPES.items()}
+_OPT = 41
+_CLASS_IN = 1
+_RD = 0x0100
+_TC = 0x0200
+NOERROR, SERVFAIL, NXDOMAIN = 0, 2, 3
+# Advertised with EDNS0 so MX and NS sets aren't truncated
+EDNS_PAYLOAD = 1232
+
+DNS_PORT = 53
+DNS_TIMEOUT = 1.5
+DNS_ATTEMPTS = 2
+MAX_OUTSTANDING = 64
+
+# Answers are kept for their TTL, within these bounds. Names that don't exist
+# (or have no records of a type) are kept for the zone's SOA minimum, or
+# NEGATIVE_TTL without one.
+MIN_TTL = 30
+MAX_TTL = 86400
+NEGATIVE_TTL = 300
+CACHE_ENTRIES = 50000
+
+# Creation dates don't change, so WHOIS answers are kept for a week
+WHOIS_TTL = 7 * 86400
+WHOIS_WORKERS = 4
+
+# Domains tried when no source has found a company's website; every variant
+# of the name is tried under each
+GUESS_TLDS = ('com', 'io', 'co')
+
+
+def nameservers():
+    """(host, port) pairs from DNS_SERVERS, else the system's resolv.conf."""
+    configured = os.environ.get('DNS_SERVERS', '')
+    entries = [entry.strip() for entry in configured.split(',') if entry.strip()]
+    if not entries:
+        try:
+            with open('/etc/resolv.conf', encoding='utf-8') as f:
+                entries = [line.split()[1] for line in f if line.startswith('nameserver') and len(line.split()) > 1]
+        except OSError:
+            entries = []
+    servers = [_server(entry) for entry in entries]
+    return servers or [('127.0.0.1', DNS_PORT)]
+
+
+def _server(entry):
+    # host, host:port, [v6]:port or a bare v6 address
+    if entry.startswith('['):
+        host, _, port = entry[1:].partition(']')
+        return host, int(port.lstrip(':') or DNS_PORT)
+    if entry.count(':') == 1:
+        host, port = entry.split(':')
+        return host, int(port)
+    return entry, DNS_PORT
+
+
+def website_domain(website):
+    """The host of a website URL without a leading www., or None."""
+    if not website:
+        return None
+    host = urlparse(website if '//' in website else f"//{website}").hostname
+    if not host:
+        return None
+    return host[4:] if host.startswith('www.') else host
+
+
+def encode_name(name):
+    labels = [label for label in name.rstrip('.').split('.') if label]
+    return b''.join(bytes((len(label),)) + label.encode('idna') for label in labels) + b'\x00'
+
+
+def encode_query(qid, name, qtype):
+    header = struct.pack('!HHHHHH', qid, _RD, 1, 0, 0, 1)
+    question = encode_name(name) + struct.pack('!HH', QTYPES[qtype], _CLASS_IN)
+    # EDNS0 OPT record: root name, type, payload size in the class field
+    opt = b'\x00' + struct.pack('!HHIH', _OPT, EDNS_PAYLOAD, 0, 0)
+    return header + question + opt
+
+
+def _read_name(data, offset):
+    # Returns the name and the offset just past it, following compression pointers
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return '.'.join(labels).lower(), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    raise ValueError("DNS name compression loop")
+
+
+def parse_query(data):
+    """(id, name, qtype, question bytes) of a query; for servers answering it."""
+    qid = struct.unpack_from('!H', data)[0]
+    name, offset = _read_name(data, 12)
+    qtype = struct.unpack_from('!H', data, offset)[0]
+    return qid, name, _QTYPE_NAMES.get(qtype), data[12:offset + 4]
+
+
+def parse_response(data):
+    """(id, rcode, truncated, question name, [(type, ttl, value)] from the answer and authority sections).
+
+    A values are dotted addresses, NS and CNAME values names, MX values
+    (preference, exchange) and SOA values the zone's negative-caching TTL.
+    """
+    qid, flags, qdcount, ancount, nscount, _ = struct.unpack_from('!HHHHHH', data)
+    offset = 12
+    qname = None
+    for _ in range(qdcount):
+        qname, offset = _read_name(data, offset)
+        offset += 4
+    records = []
+    for _ in range(ancount + nscount):
+        _, offset = _read_name(data, offset)
+        rtype, _, ttl, length = struct.unpack_from('!HHIH', data, offset)
+        offset += 10
+        rdata = offset
+        offset += length
+        if rtype == QTYPES['A'] and length == 4:
+            value = socket.inet_ntoa(data[rdata:offset])
+        elif rtype in (QTYPES['NS'], QTYPES['CNAME']):
+            value = _read_name(data, rdata)[0]
+        elif rtype == QTYPES['MX']:
+            value = (struct.unpack_from('!H', data, rdata)[0], _read_name(data, rdata + 2)[0])
+        elif rtype == QTYPES['SOA']:
+            _, after = _read_name(data, rdata)
+            _, after = _read_name(data, after)
+            value = struct.unpack_from('!IIIII', data, after)[4]
+        else:
+            continue
+        records.append((_QTYPE_NAMES[rtype], ttl, value))
+    return qid, flags & 0x000F, bool(flags & _TC), qname, records
+
+
+class _BatchProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_response):
+        self.on_response = on_response
+
+    def datagram_received(self, data, addr):
+        self.on_response(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable and the like; the queries just time out
+        logger.debug(f"DNS socket error: {exc}")
+
+
+class DnsResolver:
+    """Async A/MX/NS lookups with a TTL-respecting in-process cache."""
+
+    def __init__(self, servers=None, timeout=DNS_TIMEOUT, attempts=DNS_ATTEMPTS, max_entries=CACHE_ENTRIES):
+        self.servers = servers or nameservers()
+        self.timeout = timeout
+        self.attempts = attempts
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'queries': 0, 'timeouts': 0, 'failures': 0}
+
+        self._lock = threading.Lock()
+        # (name, qtype) -> (expires_at, values), least recently used first
+        self._cache = collections.OrderedDict()
+
+    def cached(self, name, qtype):
+        key = (name.lower().rstrip('.'), qtype)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.stats['misses'] += 1
+                return None
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def _store(self, key, values, ttl):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + min(max(ttl, MIN_TTL), MAX_TTL), values)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def resolve_many(self, questions):
+        """{(name, qtype): values} for each (name, qtype) question.
+
+        Cached answers don't touch the network; the rest are sent together.
+        A question that failed (timeout, SERVFAIL) maps to None and isn't
+        cached, one with no records maps to an empty tuple.
+        """
+        results = {}
+        pending = []
+        for name, qtype in dict.fromkeys(questions):
+            values = self.cached(name, qtype)
+            if values is None:
+                pending.append((name.lower().rstrip('.'), qtype))
+            else:
+                results[(name, qtype)] = values
+        if pending:
+            answers = await self._query(pending)
+            for name, qtype in questions:
+                key = (name.lower().rstrip('.'), qtype)
+                if key in answers:
+                    results[(name, qtype)] = answers[key]
+        return results
+
+    async def resolve(self, name, qtype):
+        return (await self.resolve_many([(name, qtype)])).get((name, qtype))
+
+    async def _query(self, questions):
+        loop = asyncio.get_running_loop()
+        answers = {question: None for question in questions}
+        unanswered = list(questions)
+        for attempt in range(self.attempts):
+            if not unanswered:
+                break
+            host, port = self.servers[attempt % len(self.servers)]
+            queue = collections.deque(unanswered)
+            waiting = {}
+            done = loop.create_future()
+
+            def send_more():
+                # A window of queries in flight; a burst of thousands would
+                # just be dropped from socket buffers along the way
+                while queue and len(waiting) < MAX_OUTSTANDING:
+                    qid = random.getrandbits(16)
+                    if qid in waiting:
+                        continue
+                    waiting[qid] = question = queue.popleft()
+                    transport.sendto(encode_query(qid, *question))
+                    self.stats['queries'] += 1
+
+            def on_response(data):
+                try:
+                    qid, rcode, truncated, qname, records = parse_response(data)
+                except (ValueError, IndexError, struct.error, UnicodeError):
+                    return
+                question = waiting.get(qid)
+                # Only answers to a question in flight, from the server it was sent to
+                if question is None or qname != question[0]:
+                    return
+                del waiting[qid]
+                answers[question] = self._answer(question, rcode, truncated, records)
+                send_more()
+                if not waiting and not done.done():
+                    done.set_result(None)
+
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _BatchProtocol(on_response), remote_addr=(host, port), family=family)
+            except OSError as e:
+                logger.warning(f"Can't reach DNS server {host}:{port}: {e}")
+                continue
+            try:
+                send_more()
+                # The timeout counts from the last answer, so a long batch
+                # isn't cut off while answers are still coming in
+                while True:
+                    outstanding = len(queue) + len(waiting)
+                    try:
+                        await asyncio.wait_for(asyncio.shield(done), self.timeout)
+                        break
+                    except asyncio.TimeoutError:
+                        if len(queue) + len(waiting) == outstanding:
+                            self.stats['timeouts'] += len(waiting)
+                            break
+            finally:
+                transport.close()
+            unanswered = [question for question in unanswered if answers[question] is None]
+        return answers
+
+    def _answer(self, question, rcode, truncated, records):
+        name, qtype = question
+        if rcode not in (NOERROR, NXDOMAIN):
+            self.stats['failures'] += 1
+            return None
+        values = [value for rtype, _, value in records if rtype == qtype]
+        if values:
+            if qtype == 'MX':
+                values = [exchange for _, exchange in sorted(values)]
+            ttl = min(ttl for rtype, ttl, _ in records if rtype == qtype)
+        elif truncated:
+            # A truncated empty answer says nothing; TCP fallback isn't worth it here
+            return None
+        else:
+            # Negative answer: cached as long as the zone's SOA allows
+            soa = [min(ttl, minimum) for rtype, ttl, minimum in records if rtype == 'SOA']
+            ttl = min(soa) if soa else NEGATIVE_TTL
+        values = tuple(dict.fromkeys(values))
+        self._store(question, values, ttl)
+        return values
+
+
+_whois_missing = False
+
+
+def _whois_created(domain):
+    # python-whois is imported on first use; without it lookups just skip
+    # the registration date
+    global _whois_missing
+    try:
+        import whois
+    except ImportError:
+        if not _whois_missing:
+            _whois_missing = True
+            logger.warning("python-whois isn't installed; skipping WHOIS lookups")
+        return None
+    try:
+        created = whois.whois(domain).creation_date
+    except Exception as e:
+        logger.info(f"WHOIS lookup for {domain} failed: {str(e)}")
+        return None
+    # Registrars that report several dates report every update; the earliest is the creation
+    if isinstance(created, (list, tuple)):
+        created = min((value for value in created if isinstance(value, datetime.datetime)), default=None)
+    return created.date().isoformat() if isinstance(created, datetime.datetime) else None
+
+
+class DomainLookup:
+    """Domain facts for the scraper, run on an event loop it doesn't own.
+
+    `submit` schedules a coroutine and returns a concurrent.futures.Future
+    (FetchEngine.run_coroutine does), so the blocking methods here can be
+    called from the scraper's source threads.
+    """
+
+    def __init__(self, submit, resolver=None, whois=True, whois_ttl=WHOIS_TTL):
+        self.submit = submit
+        self.resolver = resolver or DnsResolver()
+        self.whois = whois
+        self.whois_ttl = whois_ttl
+        self._whois_lock = threading.Lock()
+        # domain -> (expires_at, creation date or None), least recently stored first
+        self._whois_cache = collections.OrderedDict()
+        self._whois_executor = ThreadPoolExecutor(max_workers=WHOIS_WORKERS, thread_name_prefix='whois')
+
+    def _resolve_many(self, questions, timeout):
+        try:
+            return self.submit(self.resolver.resolve_many(questions)).result(timeout=timeout)
+        except FuturesTimeoutError:
+            return {}
+
+    def facts(self, domain, timeout, whois=True):
+        """{'domain', 'a', 'mx', 'ns', 'registered'} for a domain; lists are empty when unknown."""
+        deadline = time.monotonic() + timeout
+        registered = self._submit_whois(domain) if self.whois and whois else None
+        answers = self._resolve_many([(domain, 'A'), (domain, 'MX'), (domain, 'NS')], timeout)
+        facts = {'domain': domain}
+        for qtype in ('A', 'MX', 'NS'):
+            facts[qtype.lower()] = list(answers.get((domain, qtype)) or ())
+        facts['registered'] = None
+        if registered is not None:
+            try:
+                facts['registered'] = registered.result(timeout=max(deadline - time.monotonic(), 0))
+            except FuturesTimeoutError:
+                logger.info(f"WHOIS lookup for {domain} didn't finish in time")
+        return facts
+
+    def first_live(self, domains, timeout):
+        """The first of domains (in order) that has both an address and a mail exchanger, or None."""
+        domains = list(dict.fromkeys(domains))
+        answers = self._resolve_many([(d, qtype) for d in domains for qtype in ('A', 'MX')], timeout)
+        return next((d for d in domains if answers.get((d, 'A')) and answers.get((d, 'MX'))), None)
+
+    def accepts_mail(self, domains, timeout):
+        """{domain: True/False/None} for email domains.
+
+        A domain accepts mail with an MX record or, failing that, an address
+        (RFC 5321 5.1); None means the lookup didn't finish.
+        """
+        domains = list(dict.fromkeys(domains))
+        answers = self._resolve_many([(d, qtype) for d in domains for qtype in ('MX', 'A')], timeout)
+        verdicts = {}
+        for domain in domains:
+            mx, a = answers.get((domain, 'MX')), answers.get((domain, 'A'))
+            if mx or a:
+                verdicts[domain] = True
+            elif mx is None or a is None:
+                verdicts[domain] = None
+            else:
+                verdicts[domain] = False
+        return verdicts
+
+    def _submit_whois(self, domain):
+        with self._whois_lock:
+            entry = self._whois_cache.get(domain)
+            if entry is not None and entry[0] > time.monotonic():
+                future = Future()
+                future.set_result(entry[1])
+                return future
+        return self._whois_executor.submit(self._whois, domain)
+
+    def _whois(self, domain):
+        created = _whois_created(domain)
+        with self._whois_lock:
+            self._whois_cache[domain] = (time.monotonic() + self.whois_ttl, created)
+            self._whois_cache.move_to_end(domain)
+            while len(self._whois_cache) > CACHE_ENTRIES:
+                self._whois_cache.popitem(last=False)
+        return created
+
+
+_domain_lookup = None
+_domain_lookup_lock = threading.Lock()
+
+
+def get_domain_lookup():
+    global _domain_lookup
+    if _domain_lookup is None:
+        with _domain_lookup_lock:
+            if _domain_lookup is None:
+                from fetch_engine import get_engine
+                whois = os.environ.get('WHOIS_LOOKUP', '1').lower() not in ('0', 'false', 'no')
+                _domain_lookup = DomainLookup(get_engine().run_coroutine, whois=whois)
+    return _domain_lookup
@@ -0,0 +1,142 @@
+import re
+
+# Value patterns for the SERP parsers. Each entry is (pattern, keywords): the
+# pattern has exactly one capturing group (the value) and runs against
+# lowercased text; it can only match when one of its keywords is present.
+# Earlier patterns in a list take priority over later ones.
+SIZE_PATTERNS = [
+    (r'(\d{1,3}(?:,\d{3})*(?:\+)?\s*employees)', ['employees']),
+    (r'((?:about|approximately|over|more than)\s+\d{1,3}(?:,\d{3})*\s+employees)', ['employees']),
+    (r'(team of \d{1,3}(?:,\d{3})*(?:\+)?)', ['team of']),
+]
+
+_INDUSTRY_NOUNS = ['company', 'corporation', 'manufacturer', 'producer', 'provider', 'retailer', 'supplier']
+
+INDUSTRY_PATTERNS = [
+    (r'industry:\s*([^\.]+)', ['industry:']),
+    # A leading "is " never changes the captured value, and leaving it out
+    # keeps the scan from stalling on every whitespace run
+    (r'(?:a|an)\s+([^,\.]+(?:company|corporation|manufacturer|producer|provider|retailer|supplier))', _INDUSTRY_NOUNS),
+    (r'operates\s+in\s+the\s+([^,\.]+)\s+(?:industry|sector|market)', ['operates']),
+    (r'leading\s+([^,\.]+(?:company|manufacturer|producer|provider|retailer|supplier))', ['leading']),
+]
+
+REVENUE_PATTERNS = [
+    (r'revenue[:\s]+(?:us)?\$?\s*([\d\.]+\s*(?:billion|million|trillion))', ['revenue']),
+    # Same as "(?:US)?\$?\s*" + value: the optional prefix can't move the value
+    (r'([\d\.]+\s*(?:billion|million|trillion))\s+in\s+revenue', ['revenue']),
+]
+
+FOLLOWER_PATTERNS = [
+    (r'([\d,.]+\s*(?:k|m|b)?)\s*(?:followers|fans|likes)', ['followers', 'fans', 'likes']),
+    (r'(?:followed by|following)\s*([\d,.]+\s*(?:k|m|b)?)', ['followed by', 'following']),
+]
+
+EMPLOYEE_PATTERNS = [
+    (r'([\d,]+(?:\+)?)\s*employees', ['employees']),
+    (r'([\d,.]+k?\+?)\s*employees', ['employees']),
+]
+
+LOCATION_PATTERNS = [
+    (r'(?:headquarters|located in|based in)\s*([^\.]+)', ['headquarters', 'located in', 'based in']),
+]
+
+SPECIALTY_PATTERNS = [
+    (r'specialties?:?\s*([^\.]+)', ['specialt']),
+    (r'specializing in\s*([^\.]+)', ['specializing in']),
+]
+
+COMPANY_TYPE_PATTERNS = [
+    (r'(?:a|an)\s+([^,\.]+(?:company|corporation|manufacturer|producer|provider))', _INDUSTRY_NOUNS[:5]),
+    (r'type:?\s*([^\.]+)', ['type']),
+]
+
+
+class FieldExtractor:
+    """Pulls several fields out of a text with one keyword scan and precompiled patterns."""
+
+    def __init__(self, fields, min_length=None):
+        self.min_length = min_length or {}
+        self._fields = [
+            (field, [(re.compile(pattern), frozenset(keywords)) for pattern, keywords in patterns])
+            for field, patterns in fields
+        ]
+
+        keywords = {kw for _, patterns in fields for _, kws in patterns for kw in kws}
+        # Longest first so a keyword is reported rather than a shorter one inside it
+        self._keyword_pattern = re.compile('|'.join(
+            re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)
+        ))
+        # Finding a keyword also proves every keyword it contains is present
+        self._implied = {kw: {other for other in keywords if other in kw} for kw in keywords}
+        self._keyword_count = len(keywords)
+
+    def _present_keywords(self, text):
+        present = set()
+        search = self._keyword_pattern.search
+        match = search(text)
+        while match:
+            present |= self._implied[match.group()]
+            if len(present) == self._keyword_count:
+                break
+            # Restart one character on so overlapping keywords are still seen
+            match = search(text, match.start() + 1)
+        return present
+
+    def extract(self, text):
+        # Lowercasing once lets every pattern run case-sensitively, which is
+        # much faster in the re engine than re.IGNORECASE
+        text = text.lower()
+        present = self._present_keywords(text)
+
+        values = {}
+        for field, patterns in self._fields:
+            for pattern, keywords in patterns:
+                if present.isdisjoint(keywords):
+                    continue
+                match = pattern.search(text)
+                if not match:
+                    continue
+                value = match.group(1).strip()
+                if len(value) > self.min_length.get(field, -1):
+                    values[field] = value
+                    break
+        return values
+
+
+GOOGLE_DETAILS = FieldExtractor(
+    [('company_size', SIZE_PATTERNS), ('industry', INDUSTRY_PATTERNS), ('revenue', REVENUE_PATTERNS)],
+    # Avoid very short industry matches
+    min_length={'industry': 5},
+)
+
+SOCIAL_DETAILS = FieldExtractor([('followers', FOLLOWER_PATTERNS)])
+
+LINKEDIN_DETAILS = FieldExtractor([
+    ('employees', EMPLOYEE_PATTERNS),
+    ('location', LOCATION_PATTERNS),
+    ('specialties', SPECIALTY_PATTERNS),
+    ('company_type', COMPANY_TYPE_PATTERNS),
+])
+
+
+_TITLES = r'(?:CEO|CTO|CFO|Founder|Director|Manager|Head\s+of\s+[A-Za-z]+|VP\s+of\s+[A-Za-z]+)'
+_PERSON = r'[A-Z][a-z]+(?:\s[A-Z][a-z]+)+'
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+NAME_TITLE_PATTERN = re.compile(rf'({_PERSON})\s*[-–]\s*({_TITLES})')
+TITLE_NAME_PATTERN = re.compile(rf'({_TITLES})\s*[-:]\s*({_PERSON})')
+TITLE_KEYWORD = re.compile(r'CEO|CTO|CFO|Founder|Director|Manager|Head|VP')
+
+
+def extract_contacts(text):
+    # Cheap presence checks skip whole patterns on pages that can't match them
+    emails = EMAIL_PATTERN.findall(text) if '@' in text else []
+    phones = PHONE_PATTERN.findall(text)
+
+    people = []
+    if TITLE_KEYWORD.search(text):
+        people.extend(NAME_TITLE_PATTERN.findall(text))
+        people.extend((name, title) for title, name in TITLE_NAME_PATTERN.findall(text))
+    return emails, phones, people
@@ -0,0 +1,356 @@
+import asyncio
+import atexit
+import codecs
+import logging
+import re
+import threading
+from urllib.parse import urlparse
+
+import aiohttp
+
+from rate_limiter import get_rate_limiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Process-wide limits. The connector caps open sockets, the semaphores cap
+# requests that are actually in flight (globally and per host).
+GLOBAL_CONNECTION_LIMIT = 100
+PER_HOST_LIMIT = 6
+MAX_IN_FLIGHT = 64
+DEFAULT_TIMEOUT = 20
+# Throttled requests are retried after the rate limiter's backoff, unless the
+# host asks us to stay away longer than this
+THROTTLE_RETRIES = 2
+MAX_RETRY_WAIT = 30
+
+# Bodies are read at most this far; parsers treat the cut like any other
+# unclosed page. Company homepages get the least room since what we read from
+# them (technology markers, contact details) doesn't need the whole page.
+SOURCE_MAX_BYTES = {
+    'google': 2 * 1024 * 1024,
+    'crunchbase': 4 * 1024 * 1024,
+    'bloomberg': 4 * 1024 * 1024,
+    'linkedin': 4 * 1024 * 1024,
+    'website': 1024 * 1024,
+}
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+# Only bodies of these types are downloaded at all; a response without a
+# Content-Type is read in case it's HTML
+PARSEABLE_TYPES = frozenset(('text/html', 'application/xhtml+xml', 'text/plain'))
+
+# A <meta> charset has to appear this early to count, as in browsers
+SNIFF_BYTES = 1024
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+
+def parseable(content_type):
+    mime = (content_type or '').split(';', 1)[0].strip().lower()
+    return not mime or mime in PARSEABLE_TYPES
+
+
+def _known_charset(name):
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name.lower()
+
+
+def sniff_encoding(body, content_type=None):
+    """The body's charset: a byte order mark, the Content-Type header, then a <meta> tag.
+
+    None when nothing says; parsers then read the body as UTF-8.
+    """
+    for bom, name in _BOMS:
+        if body.startswith(bom):
+            return name
+    match = _HEADER_CHARSET.search(content_type or '')
+    if match and _known_charset(match.group(1)):
+        return match.group(1).lower()
+    # Searched in place, without slicing or decoding the body
+    match = _META_CHARSET.search(body, 0, SNIFF_BYTES)
+    if match:
+        return _known_charset(match.group(1).decode('ascii'))
+    return None
+
+
+class FetchResponse:
+    """Minimal response object shared by the async engine and the cloudscraper fallback."""
+
+    __slots__ = ('url', 'status_code', 'headers', 'content', 'encoding', 'elapsed', 'limited')
+
+    def __init__(self, url, status_code, headers, content, encoding=None, elapsed=None, limited=None):
+        self.url = url
+        self.status_code = status_code
+        # Header names are lowercased so lookups don't depend on the client
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        # Seconds the fetch took, including cache and replay lookups
+        self.elapsed = elapsed
+        # 'truncated' when the body was cut at the size cap, 'not_html' when
+        # it wasn't downloaded because of its Content-Type
+        self.limited = limited
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @classmethod
+    def from_requests(cls, response, max_bytes=DEFAULT_MAX_BYTES):
+        # Reads at most max_bytes of a streamed (stream=True) response. A body
+        # read in full is kept on the response, which stays readable; one cut
+        # short or skipped can't be finished later, so the response is closed.
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        content_type = headers.get('content-type')
+        limited = None
+        if response._content_consumed:
+            # Already read by the caller
+            body = response.content or b''
+            if len(body) > max_bytes:
+                body, limited = body[:max_bytes], 'truncated'
+        elif not parseable(content_type):
+            body, limited = b'', 'not_html'
+        else:
+            chunks, size = [], 0
+            for chunk in response.iter_content(READ_CHUNK):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    chunks[-1] = chunk[:len(chunk) - (size - max_bytes)]
+                    limited = 'truncated'
+                    break
+            body = b''.join(chunks)
+            if limited is None:
+                response._content = body
+                response._content_consumed = True
+        if limited is not None and not response._content_consumed:
+            response.close()
+        # requests assumes ISO-8859-1 for any text/* without a charset; sniff instead
+        return cls(response.url, response.status_code, headers, body, sniff_encoding(body, content_type),
+                   response.elapsed.total_seconds(), limited)
+
+
+def _collapse_headers(raw_headers):
+    headers = {}
+    for key, value in raw_headers.items():
+        key = key.lower()
+        # Keep repeated headers (e.g. Set-Cookie) instead of silently dropping them
+        headers[key] = f"{headers[key]}, {value}" if key in headers else value
+    return headers
+
+
+class FetchEngine:
+    def __init__(self, global_limit=GLOBAL_CONNECTION_LIMIT, per_host_limit=PER_HOST_LIMIT,
+                 max_in_flight=MAX_IN_FLIGHT, timeout=DEFAULT_TIMEOUT, cache=None, rate_limiter=None, replay=None,
+                 source_for=None, max_bytes=None):
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.replay = replay
+        self.global_limit = global_limit
+        self.per_host_limit = per_host_limit
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        # Body size caps per source; source_for maps a URL to its source
+        self.source_for = source_for
+        self.max_bytes = dict(SOURCE_MAX_BYTES, **(max_bytes or {}))
+
+        self._host_slots = {}
+        self._session = None
+        self._in_flight = None
+        self._closed = False
+
+        # The event loop lives in its own daemon thread so that synchronous
+        # callers (Flask handlers, worker threads) can share one connection pool
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='fetch-engine', daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _setup(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.global_limit,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+    def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slot
+
+    def max_bytes_for(self, url):
+        if self.source_for is None:
+            return DEFAULT_MAX_BYTES
+        return self.max_bytes.get(self.source_for(url), DEFAULT_MAX_BYTES)
+
+    async def fetch(self, url, headers=None, timeout=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # Replayed responses skip the cache and the rate limiter: nothing goes out
+        if self.replay is not None and self.replay.replaying:
+            response = await self.replay.replay_async(url)
+        else:
+            response = await self._fetch_cached(url, headers, timeout)
+            if self.replay is not None:
+                await loop.run_in_executor(None, self.replay.record, url, response)
+        response.elapsed = loop.time() - start
+        return response
+
+    async def _fetch_cached(self, url, headers=None, timeout=None):
+        if self.cache is None:
+            return await self._fetch(url, headers, timeout)
+
+        # Cache reads and writes hit the disk, so keep them off the event loop
+        loop = asyncio.get_running_loop()
+        key = self.cache.key_for(url, headers)
+        entry = await loop.run_in_executor(None, self.cache.lookup, key)
+        if entry is not None and entry.fresh:
+            return entry.response
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+
+        response = await self._fetch(url, request_headers, timeout)
+        if entry is not None and response.status_code == 304:
+            await loop.run_in_executor(None, self.cache.refresh, key, url)
+            return entry.response
+
+        await loop.run_in_executor(None, self.cache.store, key, response)
+        return response
+
+    async def _fetch(self, url, headers=None, timeout=None):
+        if self.rate_limiter is None:
+            return await self._request(url, headers, timeout)
+
+        for attempt in range(THROTTLE_RETRIES + 1):
+            # Wait for the host's bucket before taking a connection slot
+            delay = self.rate_limiter.reserve(url)
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    # The caller gave up before the request went out; its slot
+                    # goes to the requests queued behind it
+                    self.rate_limiter.release(url)
+                    raise
+            response = await self._request(url, headers, timeout)
+            retry_after = response.headers.get('retry-after')
+            self.rate_limiter.record(url, response.status_code, retry_after)
+
+            if not self._should_retry(response, retry_after) or attempt == THROTTLE_RETRIES:
+                return response
+            logger.info(f"Throttled by {url} ({response.status_code}), retrying")
+
+    @staticmethod
+    def _should_retry(response, retry_after):
+        if response.status_code == 429:
+            wait = parse_retry_after(retry_after)
+            return wait is None or wait <= MAX_RETRY_WAIT
+        # A bare 503 is usually an outage or a Cloudflare challenge, not throttling
+        if response.status_code == 503 and retry_after:
+            wait = parse_retry_after(retry_after)
+            return wait is not None and wait <= MAX_RETRY_WAIT
+        return False
+
+    async def _request(self, url, headers=None, timeout=None):
+        host = urlparse(url).hostname or ''
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+
+        async with self._in_flight, self._host_slot(host):
+            async with self._session.get(url, headers=headers, timeout=request_timeout) as resp:
+                response_headers = _collapse_headers(resp.headers)
+                content_type = response_headers.get('content-type')
+                if not parseable(content_type):
+                    # Decided on the headers alone; closing drops the connection
+                    # rather than draining a PDF or a video through it
+                    resp.close()
+                    return FetchResponse(str(resp.url), resp.status, response_headers, b'', limited='not_html')
+
+                body, truncated = await self._read_capped(resp, self.max_bytes_for(url))
+                return FetchResponse(
+                    str(resp.url),
+                    resp.status,
+                    response_headers,
+                    body,
+                    sniff_encoding(body, content_type),
+                    limited='truncated' if truncated else None,
+                )
+
+    @staticmethod
+    async def _read_capped(resp, max_bytes):
+        # Streams the body in chunks and stops past max_bytes, so a 20 MB page
+        # never takes more than the cap (plus a chunk) in memory
+        chunks, size = [], 0
+        async for chunk in resp.content.iter_chunked(READ_CHUNK):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                chunks[-1] = chunk[:len(chunk) - (size - max_bytes)]
+                resp.close()
+                return b''.join(chunks), True
+        return b''.join(chunks), False
+
+    def submit(self, url, headers=None, timeout=None):
+        # Returns a concurrent.futures.Future so callers can use as_completed/wait
+        if self._closed:
+            raise RuntimeError("Fetch engine is closed")
+        return asyncio.run_coroutine_threadsafe(self.fetch(url, headers, timeout), self._loop)
+
+    def run_coroutine(self, coro):
+        # Other network work (DNS lookups) shares the engine's event loop
+        if self._closed:
+            coro.close()
+            raise RuntimeError("Fetch engine is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def get(self, url, headers=None, timeout=None):
+        return self.submit(url, headers, timeout).result()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing fetch engine session: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # Imported here because http_cache and replay build FetchResponse objects
+                from http_cache import get_cache, source_for_url
+                from replay import get_interceptor
+                _engine = FetchEngine(cache=get_cache(), rate_limiter=get_rate_limiter(), replay=get_interceptor(),
+                                      source_for=source_for_url)
+                atexit.register(_engine.close)
+    return _engine
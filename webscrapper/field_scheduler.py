@@ -0,0 +1,78 @@
+import threading
+import time
+
+import metrics
+from records import provenance_for
+
+# Overall time a company lookup may take before it returns what it has
+LATENCY_BUDGET = 12.0
+
+# What each source can contribute; a source still running once all of its
+# fields are good enough (see SATISFIED_CONFIDENCE) is no longer waited for
+SOURCE_FIELDS = {
+    'google': ('website', 'description', 'founded', 'headquarters', 'revenue', 'industry', 'company_size'),
+    'crunchbase': ('industry', 'company_size'),
+    'bloomberg': ('revenue', 'industry'),
+    'social_media': ('social_data.facebook', 'social_data.twitter', 'social_data.instagram'),
+    'linkedin': ('social_data.linkedin',),
+    'website': ('contacts', 'technologies'),
+    'domain': ('domain_info',),
+}
+
+# A lookup needs each field filled, not filled by the best possible source: a
+# value at least this trusted (Google's snippets and up, see
+# records.SOURCE_CONFIDENCE) satisfies it. A more trusted source that does
+# finish in time still replaces it when merged.
+SATISFIED_CONFIDENCE = 0.6
+
+# Fields that make up the completeness score
+SCORED_FIELDS = (
+    'website', 'description', 'industry', 'company_size', 'revenue', 'headquarters', 'founded',
+    'contacts', 'social_profiles', 'technologies',
+)
+
+SOURCE_OUTCOMES = metrics.REGISTRY.register(metrics.Counter(
+    'scraper_source_outcomes_total', 'How each source ended: done, skipped, timed_out or error.',
+    ('source', 'outcome')))
+COMPLETENESS = metrics.REGISTRY.register(metrics.Histogram(
+    'scraper_completeness_ratio', 'Share of scored fields filled per company.', (),
+    (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)))
+
+
+def completeness(record):
+    filled = sum(1 for field in SCORED_FIELDS if record.get(field))
+    return round(filled / len(SCORED_FIELDS), 2)
+
+
+class FieldScheduler:
+    """Merges per-source partial Company records into one and decides which sources are still worth waiting for."""
+
+    def __init__(self, record, budget=None):
+        self.record = record
+        self.deadline = time.monotonic() + (LATENCY_BUDGET if budget is None else budget)
+        self.status = {}
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def needed(self, source):
+        # Still worth waiting for while any of its fields is empty, or was
+        # filled by a source trusted less than both this one and the bar
+        confidence = min(provenance_for(source)[1], SATISFIED_CONFIDENCE)
+        return self.record.wants(SOURCE_FIELDS.get(source, ()), confidence)
+
+    def merge(self, source, partial):
+        for field in self.record.merge(partial, source):
+            metrics.record_field(field, stage=source)
+        self.finish(source, 'done')
+
+    def finish(self, source, outcome):
+        with self._lock:
+            if source in self.status:
+                return
+            self.status[source] = outcome
+        SOURCE_OUTCOMES.inc(source=source, outcome=outcome)
+        trace = metrics.current_trace()
+        if trace is not None and outcome != 'done':
+            trace.note(f'{source} {outcome}')
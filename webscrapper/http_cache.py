@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fetch_engine import FetchResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'HTTP_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'http_cache.sqlite3'),
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Seconds a stored response is served without revalidation, per source
+SOURCE_TTLS = {
+    'google': 6 * 3600,
+    'crunchbase': 7 * 86400,
+    'bloomberg': 7 * 86400,
+    'linkedin': 3 * 86400,
+    'website': 86400,
+}
+
+# Only these request headers change the response we get back; the rotating
+# User-Agent is deliberately left out so it doesn't fragment the cache
+VARY_HEADERS = ('accept', 'accept-language')
+
+# Response headers worth keeping alongside the body
+STORED_HEADERS = ('content-type', 'etag', 'last-modified', 'server', 'set-cookie', 'x-powered-by')
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def source_for_url(url):
+    host = (urlsplit(url).hostname or '').lower()
+    for source in ('google', 'crunchbase', 'bloomberg', 'linkedin'):
+        if host == f"{source}.com" or host.endswith(f".{source}.com"):
+            return source
+    return 'website'
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def cache_key(url, headers=None):
+    lowered = {k.lower(): v for k, v in (headers or {}).items()}
+    vary = '\n'.join(f"{name}:{lowered.get(name, '')}" for name in VARY_HEADERS)
+    return hashlib.sha256(f"{normalize_url(url)}\n{vary}".encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    __slots__ = ('response', 'fresh', 'etag', 'last_modified')
+
+    def __init__(self, response, fresh, etag, last_modified):
+        self.response = response
+        self.fresh = fresh
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(SOURCE_TTLS, **(ttls or {}))
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0,
+                      'incomplete': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def key_for(self, url, headers=None):
+        return cache_key(url, headers)
+
+    def ttl_for(self, url):
+        return self.ttls.get(source_for_url(url), 0)
+
+    def lookup(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, status, headers, body, encoding, etag, last_modified, expires_at '
+                'FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+
+        url, status, headers, body, encoding, etag, last_modified, expires_at = row
+        fresh = expires_at > now
+        self.stats['hits' if fresh else 'stale'] += 1
+        response = FetchResponse(url, status, json.loads(headers), body, encoding)
+        return CacheEntry(response, fresh, etag, last_modified)
+
+    def store(self, key, response):
+        ttl = self.ttl_for(response.url)
+        if response.status_code != 200 or ttl <= 0:
+            return
+        if response.limited:
+            # A body cut at the size cap, or skipped for its Content-Type, would
+            # be served back later as if it were the whole page
+            self.stats['incomplete'] += 1
+            return
+
+        now = time.time()
+        headers = {k: v for k, v in response.headers.items() if k in STORED_HEADERS}
+        size = len(response.content)
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, url, status, headers, body, encoding, etag, last_modified, size, stored_at, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.url, response.status_code, json.dumps(headers), response.content,
+                 response.encoding, headers.get('etag'), headers.get('last-modified'),
+                 size, now, now + ttl, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self.stats['stores'] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def refresh(self, key, url):
+        # A 304 confirmed the stored copy, so start a new TTL window
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?',
+                (now + self.ttl_for(url), now, key),
+            )
+            self.stats['revalidated'] += 1
+
+    def _evict(self):
+        # Other processes may share the file, so recount before trimming
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+        self.stats['evictions'] += len(evicted)
+        logger.info(f"HTTP cache evicted {len(evicted)} responses")
+
+    def snapshot(self):
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return dict(self.stats, entries=entries, bytes=self._total_bytes, max_bytes=self.max_bytes)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,291 @@
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_PATH = os.environ.get(
+    'JOBS_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'jobs.sqlite3'),
+)
+DEFAULT_WORKERS = 4
+MAX_JOB_SIZE = 50000
+# A claimed item belongs to its runner while the runner keeps renewing the
+# lease; after that any process sharing the database may take it over
+LEASE_SECONDS = 120
+
+# Column headers recognised in an uploaded CSV, in order of preference
+NAME_COLUMNS = ('company_name', 'company', 'name')
+
+
+def parse_company_names(names=None, csv_text=None):
+    """Company names from a JSON list or CSV text, deduplicated in first-seen order."""
+    if csv_text is not None:
+        rows = list(csv.reader(io.StringIO(csv_text)))
+        column = 0
+        if rows:
+            header = [cell.strip().lower() for cell in rows[0]]
+            for candidate in NAME_COLUMNS:
+                if candidate in header:
+                    column = header.index(candidate)
+                    rows = rows[1:]
+                    break
+        names = [row[column] for row in rows if len(row) > column]
+
+    seen = set()
+    cleaned = []
+    for name in names or []:
+        name = ' '.join(str(name).split())
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            cleaned.append(name)
+    return cleaned
+
+
+class JobStore:
+    """Jobs and their per-company items, kept in SQLite so they survive a restart."""
+
+    def __init__(self, path=DEFAULT_JOBS_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY, total INTEGER NOT NULL, created_at REAL NOT NULL, finished_at REAL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            ' job_id TEXT NOT NULL, position INTEGER NOT NULL, company_name TEXT NOT NULL,'
+            " status TEXT NOT NULL DEFAULT 'pending', result TEXT, error TEXT, updated_at REAL,"
+            ' owner TEXT, lease_until REAL, PRIMARY KEY (job_id, position))'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(items)')}
+        for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE items ADD COLUMN {column} {kind}')
+        # Claims read these instead of sorting the queue: open jobs in order,
+        # the first pending item of a job, and the leases that ran out
+        self._conn.execute('CREATE INDEX IF NOT EXISTS items_status ON items (status, job_id, position)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS items_lease ON items (status, lease_until)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_open ON jobs (finished_at, created_at)')
+
+    def create_job(self, company_names):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute(
+                    'INSERT INTO jobs (id, total, created_at) VALUES (?, ?, ?)', (job_id, len(company_names), now)
+                )
+                self._conn.executemany(
+                    'INSERT INTO items (job_id, position, company_name, updated_at) VALUES (?, ?, ?, ?)',
+                    [(job_id, position, name, now) for position, name in enumerate(company_names)],
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return job_id
+
+    def requeue_expired(self):
+        # Items whose runner stopped renewing its lease (it died, or the server
+        # was restarted) go back in the queue; ones a live process holds stay.
+        # Items claimed before leases existed have none and are requeued too.
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE items SET status = 'pending', owner = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (now, now),
+            )
+        return cursor.rowcount
+
+    def renew(self, owner, lease=LEASE_SECONDS):
+        # Heartbeat: extend the lease on every item owner is still working on
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE items SET lease_until = ? WHERE owner = ? AND status = 'running'", (time.time() + lease, owner)
+            )
+        return cursor.rowcount
+
+    def claim_next(self, owner, lease=LEASE_SECONDS):
+        # Oldest job first, so one huge job doesn't starve the ones queued after it forever.
+        # Items whose lease ran out go back in the queue first.
+        self.requeue_expired()
+        with self._lock:
+            jobs = [row[0] for row in self._conn.execute(
+                'SELECT id FROM jobs WHERE finished_at IS NULL ORDER BY created_at'
+            )]
+            for job_id in jobs:
+                while True:
+                    row = self._conn.execute(
+                        "SELECT job_id, position, company_name FROM items"
+                        " WHERE status = 'pending' AND job_id = ? ORDER BY position LIMIT 1",
+                        (job_id,),
+                    ).fetchone()
+                    if row is None:
+                        break
+                    # Another process sharing the file may have claimed it in between
+                    now = time.time()
+                    cursor = self._conn.execute(
+                        "UPDATE items SET status = 'running', owner = ?, lease_until = ?, updated_at = ?"
+                        " WHERE job_id = ? AND position = ? AND status = 'pending'",
+                        (owner, now + lease, now, row[0], row[1]),
+                    )
+                    if cursor.rowcount == 1:
+                        return row
+        return None
+
+    def complete(self, job_id, position, result=None, error=None):
+        status = 'failed' if error else 'done'
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE items SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ? AND position = ?',
+                (status, json.dumps(result) if result is not None else None, error, now, job_id, position),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET finished_at = ? WHERE id = ? AND finished_at IS NULL AND NOT EXISTS"
+                " (SELECT 1 FROM items WHERE job_id = ? AND status IN ('pending', 'running'))",
+                (now, job_id, job_id),
+            )
+
+    def progress(self, job_id):
+        with self._lock:
+            job = self._conn.execute(
+                'SELECT total, created_at, finished_at FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                'SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status', (job_id,)
+            ).fetchall())
+
+        total, created_at, finished_at = job
+        finished = counts.get('done', 0) + counts.get('failed', 0)
+        if finished_at is not None:
+            status = 'completed'
+        elif finished or counts.get('running'):
+            status = 'running'
+        else:
+            status = 'queued'
+        return {
+            'id': job_id,
+            'status': status,
+            'total': total,
+            'pending': counts.get('pending', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'progress': round(finished / total, 4) if total else 1.0,
+            'created_at': created_at,
+            'finished_at': finished_at,
+        }
+
+    def results(self, job_id, offset=0, limit=100):
+        # Finished items in input order
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT company_name, status, result, error FROM items"
+                " WHERE job_id = ? AND status IN ('done', 'failed') ORDER BY position LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM items WHERE job_id = ? AND status IN ('done', 'failed')", (job_id,)
+            ).fetchone()[0]
+
+        items = []
+        for company_name, status, result, error in rows:
+            item = {'company_name': company_name, 'status': status}
+            if result is not None:
+                item['result'] = json.loads(result)
+            if error:
+                item['error'] = error
+            items.append(item)
+        return items, total
+
+
+class JobRunner:
+    """A fixed pool of worker threads draining the job store."""
+
+    def __init__(self, store, enrich, workers=DEFAULT_WORKERS, idle_wait=1.0, lease=LEASE_SECONDS):
+        self.store = store
+        self.enrich = enrich
+        self.workers = workers
+        self.idle_wait = idle_wait
+        self.lease = lease
+        # Identifies this runner's claims to other processes sharing the store
+        self.owner = uuid.uuid4().hex
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        with self._start_lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # A forked child (a worker of a preloading WSGI server) has none
+                # of the parent's threads and mustn't use its SQLite connection
+                self.store = JobStore(self.store.path)
+                self.owner = uuid.uuid4().hex
+                self._threads = []
+            self._pid = os.getpid()
+            requeued = self.store.requeue_expired()
+            if requeued:
+                logger.info(f"Resuming {requeued} job items interrupted by a restart")
+            heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, company_names):
+        job_id = self.store.create_job(company_names)
+        self.start()
+        self._wake.set()
+        return job_id
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.store.renew(self.owner, self.lease)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew job leases: {str(e)}")
+
+    def _work(self):
+        while not self._stop.is_set():
+            item = self.store.claim_next(self.owner, self.lease)
+            if item is None:
+                self._wake.wait(self.idle_wait)
+                self._wake.clear()
+                continue
+
+            job_id, position, company_name = item
+            try:
+                result = self.enrich(company_name)
+            except Exception as e:
+                logger.warning(f"Job {job_id}: error enriching {company_name}: {str(e)}")
+                self.store.complete(job_id, position, error=str(e))
+                continue
+            if result:
+                self.store.complete(job_id, position, result=result)
+            else:
+                self.store.complete(job_id, position, error='Company not found')
@@ -1,129 +1,39 @@
 from flask import Flask, render_template, request, jsonify
-import requests
-import time
-import random
+import os
+from company_store import get_company_store
+from search_index import CompanyIndex
 
 app = Flask(__name__)
 
-# Sample company database
-COMPANIES_DB = {
-    "technology": [
-        {
-            "name": "Google",
-            "description": "Search engine and technology company",
-            "industry": "Technology",
-            "website": "google.com",
-            "location": "Mountain View, California"
-        },
-        {
-            "name": "Microsoft",
-            "description": "Software and cloud computing company",
-            "industry": "Technology",
-            "website": "microsoft.com",
-            "location": "Redmond, Washington"
-        },
-        {
-            "name": "Apple",
-            "description": "Consumer electronics and software company",
-            "industry": "Technology",
-            "website": "apple.com",
-            "location": "Cupertino, California"
-        }
-    ],
-    "automotive": [
-        {
-            "name": "Tesla",
-            "description": "Electric vehicle and clean energy company",
-            "industry": "Automotive",
-            "website": "tesla.com",
-            "location": "Austin, Texas"
-        },
-        {
-            "name": "Ford",
-            "description": "Automobile manufacturer",
-            "industry": "Automotive",
-            "website": "ford.com",
-            "location": "Dearborn, Michigan"
-        }
-    ],
-    "retail": [
-        {
-            "name": "Amazon",
-            "description": "E-commerce and technology company",
-            "industry": "Retail",
-            "website": "amazon.com",
-            "location": "Seattle, Washington"
-        },
-        {
-            "name": "Walmart",
-            "description": "Retail corporation",
-            "industry": "Retail",
-            "website": "walmart.com",
-            "location": "Bentonville, Arkansas"
-        }
-    ],
-    "finance": [
-        {
-            "name": "JPMorgan Chase",
-            "description": "Banking and financial services",
-            "industry": "Finance",
-            "website": "jpmorganchase.com",
-            "location": "New York City, New York"
-        },
-        {
-            "name": "Goldman Sachs",
-            "description": "Investment banking and securities",
-            "industry": "Finance",
-            "website": "goldmansachs.com",
-            "location": "New York City, New York"
-        }
-    ],
-    "healthcare": [
-        {
-            "name": "Johnson & Johnson",
-            "description": "Healthcare and pharmaceutical company",
-            "industry": "Healthcare",
-            "website": "jnj.com",
-            "location": "New Brunswick, New Jersey"
-        },
-        {
-            "name": "UnitedHealth Group",
-            "description": "Healthcare and insurance company",
-            "industry": "Healthcare",
-            "website": "unitedhealthgroup.com",
-            "location": "Minnetonka, Minnesota"
-        }
-    ]
-}
+# Loaded into an empty company store: the sample companies and whatever
+# scraped records are on disk
+SEED_FILES = ['sample_companies.json', 'companies.json', 'leads.json']
 
-def search_companies(query):
-    query = query.lower()
-    results = []
-    
-    # Search through all categories
-    for category, companies in COMPANIES_DB.items():
-        if query in category.lower():
-            # If query matches category, add all companies in that category
-            results.extend(companies)
-        else:
-            # Search individual companies
-            for company in companies:
-                if (query in company['name'].lower() or 
-                    query in company['description'].lower() or
-                    query in company['industry'].lower() or
-                    query in company['location'].lower()):
-                    results.append(company)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_results = []
-    for company in results:
-        company_key = company['name']
-        if company_key not in seen:
-            seen.add(company_key)
-            unique_results.append(company)
-    
-    return unique_results[:10]  # Limit to 10 results
+# 'store' searches the company store's full-text index, so companies the
+# scraper enriches show up right away. It returns only companies matching every
+# word of the query. 'memory' builds the BM25 index in search_index.py from the
+# store at startup: faster, ranks companies matching any of the words and
+# matches words inside other words, but doesn't see later writes. It was the
+# default until the company store; set COMPANY_SEARCH=memory to keep it.
+SEARCH_BACKEND = os.environ.get('COMPANY_SEARCH', 'store')
+
+def seed_store(store):
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SEED_FILES:
+        path = os.path.join(here, name)
+        if os.path.exists(path):
+            store.bulk_import(path)
+
+STORE = get_company_store()
+if not len(STORE):
+    seed_store(STORE)
+
+SEARCH_INDEX = CompanyIndex(STORE.iter_records()) if SEARCH_BACKEND == 'memory' else None
+
+def search_companies(query, page=1, per_page=10):
+    if SEARCH_INDEX is not None:
+        return SEARCH_INDEX.search(query, page, per_page)
+    return STORE.search(query, page, per_page)
 
 @app.route('/')
 def home():
@@ -131,15 +41,30 @@ def home():
 
 @app.route('/search')
 def search():
-    query = request.args.get('query', '').strip()
-    if not query:
+    # Left unstripped: a trailing space tells the backends the last word is finished
+    query = request.args.get('query', '')
+    if not query.strip():
         return jsonify([])
     
-    # Add a small delay to simulate API call
-    time.sleep(random.uniform(0.1, 0.5))
-    
-    companies = search_companies(query)
-    return jsonify(companies)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    return jsonify(search_companies(query, page, per_page))
+
+@app.route('/companies')
+def companies():
+    # Indexed lookups: one company by domain, or a page of an industry or location
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    if request.args.get('domain'):
+        company = STORE.get(request.args['domain'])
+        if company is None:
+            return jsonify({'error': 'Company not found'}), 404
+        return jsonify(company)
+    if request.args.get('industry'):
+        return jsonify(STORE.by_industry(request.args['industry'], limit, offset))
+    if request.args.get('location'):
+        return jsonify(STORE.by_location(request.args['location'], limit, offset))
+    return jsonify({'error': 'Pass a domain, industry or location'}), 400
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
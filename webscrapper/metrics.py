@@ -0,0 +1,291 @@
+"""Process-wide counters and histograms, rendered in the Prometheus text format.
+
+Stage and fetch timings also go to the current request's trace, when one is
+active (see `tracing`). The trace and the current stage live in context
+variables, so work handed to an executor must be submitted through
+`submit_in_context` to keep reporting to the right request.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_stage = contextvars.ContextVar('current_stage', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labels), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        label_names = self.labels + ('le',)
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    lines.append(
+                        f'{self.name}_bucket{_format_labels(label_names, key + (_format_value(bound),))} {cumulative}'
+                    )
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Sampled:
+    """Read at render time from a callback returning {label values tuple: value}.
+
+    For state owned elsewhere (rate limiter buckets, cache counters); `kind` is
+    the Prometheus type to declare, 'gauge' or 'counter'.
+    """
+
+    def __init__(self, name, help, labels, collect, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'scraper_stage_duration_seconds', 'Wall time of each enrichment stage.', ('stage',)))
+STAGE_RUNS = REGISTRY.register(Counter(
+    'scraper_stage_runs_total', 'Enrichment stages run.', ('stage',)))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    'scraper_stage_errors_total', 'Errors in enrichment stages, raised or caught by the stage.', ('stage',)))
+FIELD_FILLS = REGISTRY.register(Counter(
+    'scraper_field_fills_total', 'Fields filled, by the stage that filled them; divide by stage runs for the fill rate.',
+    ('stage', 'field')))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    'scraper_http_responses_total', 'HTTP responses received, by source and status code.', ('source', 'status')))
+FETCH_BYTES = REGISTRY.register(Counter(
+    'scraper_fetch_bytes_total', 'Response body bytes received, by source.', ('source',)))
+BODIES_LIMITED = REGISTRY.register(Counter(
+    'scraper_fetch_bodies_limited_total', 'Response bodies cut at the size cap or not downloaded for their type.',
+    ('source', 'reason')))
+FETCH_DURATION = REGISTRY.register(Histogram(
+    'scraper_fetch_duration_seconds', 'Time from submitting a request to having its response.', ('source',)))
+PARSE_DURATION = REGISTRY.register(Histogram(
+    'scraper_parse_duration_seconds', 'Time spent parsing fetched pages.', ('source',), PARSE_BUCKETS))
+
+
+class Trace:
+    """Timings for one request, returned in the response when debugging."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.fetches = []
+        self.parse_ms = {}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds, error=None):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'ms': 0.0, 'fields': []})
+            entry['ms'] = round(entry['ms'] + seconds * 1000, 2)
+            if error:
+                entry['error'] = error
+
+    def add_field(self, stage, field):
+        with self._lock:
+            self.stages.setdefault(stage, {'ms': 0.0, 'fields': []})['fields'].append(field)
+
+    def add_fetch(self, url, status, size, seconds, stage):
+        with self._lock:
+            self.fetches.append({'url': url, 'status': status, 'bytes': size, 'ms': round(seconds * 1000, 2),
+                                 'stage': stage})
+
+    def add_parse(self, source, seconds):
+        with self._lock:
+            self.parse_ms[source] = round(self.parse_ms.get(source, 0.0) + seconds * 1000, 3)
+
+    def note(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+                'stages': dict(self.stages),
+                'fetches': list(self.fetches),
+                'parse_ms': dict(self.parse_ms),
+                'events': list(self.events),
+            }
+
+
+@contextmanager
+def tracing(enabled=True):
+    if not enabled:
+        yield None
+        return
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_stage():
+    return _current_stage.get()
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    # Each task gets its own copy: one Context can't be entered by two threads at once
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+@contextmanager
+def stage(name):
+    token = _current_stage.set(name)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_stage.reset(token)
+        STAGE_RUNS.inc(stage=name)
+        STAGE_DURATION.observe(elapsed, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_stage(name, elapsed, error)
+
+
+def record_error(error, stage=None):
+    # Sources catch their own errors and return what they found; they report
+    # them here so the stage's error count still sees them
+    name = stage or _current_stage.get()
+    if name is None:
+        return
+    STAGE_ERRORS.inc(stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, 0.0, str(error))
+
+
+def record_field(field, stage=None):
+    name = stage or _current_stage.get() or 'pipeline'
+    FIELD_FILLS.inc(stage=name, field=field)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_field(name, field)
+
+
+def record_fetch(url, source, status, size, seconds, limited=None):
+    HTTP_RESPONSES.inc(source=source, status=status)
+    if limited:
+        BODIES_LIMITED.inc(source=source, reason=limited)
+    FETCH_BYTES.inc(size, source=source)
+    FETCH_DURATION.observe(seconds, source=source)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_fetch(url, status, size, seconds, _current_stage.get())
+
+
+@contextmanager
+def timed_parse(source):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PARSE_DURATION.observe(elapsed, source=source)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_parse(source, elapsed)
@@ -0,0 +1,98 @@
+"""Runs HTML parsing in worker processes so it isn't bound to one core.
+
+The fetch engine and the source threads only move bytes around; parsing and
+extraction are CPU work, and under the GIL every thread in the process shares
+one core for them. With PARSE_PROCESSES set, parse tasks go to a process pool
+instead: the raw response body is handed over as bytes, never decoded to str
+first, and only the extracted fields come back.
+
+Tasks must be module-level functions taking (content, *args, encoding=None) so
+they pickle by reference; the ones below bundle a parse with the extraction
+that follows it, so a page crosses the process boundary once.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from extractors import GOOGLE_DETAILS, extract_contacts
+from parsers import page_text
+from tech_fingerprint import FINGERPRINTER
+
+logger = logging.getLogger(__name__)
+
+
+def configured_processes():
+    # PARSE_PROCESSES: unset or 0 parses in the calling thread, 'auto' uses
+    # one worker per core
+    value = os.environ.get('PARSE_PROCESSES', '0').strip().lower()
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return max(int(value or 0), 0)
+
+
+def google_details(content, encoding=None):
+    # Size, industry and revenue from a Google results page
+    return GOOGLE_DETAILS.extract(page_text(content, encoding=encoding))
+
+
+def page_contacts(content, encoding=None):
+    return extract_contacts(page_text(content, encoding=encoding))
+
+
+def homepage(content, headers, encoding=None):
+    # (technologies, contacts); the fingerprint reads the raw bytes and headers
+    return FINGERPRINTER.fingerprint(content, headers), page_contacts(content, encoding=encoding)
+
+
+def _start_method():
+    # The parent runs the fetch engine's event loop and holds locks in other
+    # threads, which a plain fork would copy in whatever state they're in
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+class ParsePool:
+    """Parse tasks on a pool of worker processes, or inline with no workers."""
+
+    def __init__(self, processes=0):
+        self.processes = processes
+        self._executor = None
+        if processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context(_start_method()),
+            )
+
+    def submit(self, task, content, *args, encoding=None):
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(task(content, *args, encoding=encoding))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._executor.submit(task, content, *args, encoding=encoding)
+
+    def run(self, task, content, *args, encoding=None):
+        return self.submit(task, content, *args, encoding=encoding).result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ParsePool(configured_processes())
+                if _parse_pool.processes:
+                    logger.info(f"Parsing on {_parse_pool.processes} worker processes")
+    return _parse_pool
@@ -0,0 +1,205 @@
+"""Targeted HTML extraction over raw response bytes.
+
+Each function feeds the page to lxml's pull parser in chunks and stops as soon
+as the nodes it needs are complete, instead of building a BeautifulSoup tree
+of the whole page. Finished subtrees that can no longer matter are cleared as
+the parse goes, so memory stays proportional to the part still being read.
+The functions are pure (bytes in, plain data out) so they can run anywhere,
+including worker processes.
+"""
+from lxml import etree
+
+CHUNK_SIZE = 16 * 1024
+
+# Text under these never shows up in BeautifulSoup's get_text()
+_NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+_PRESERVE_WHITESPACE_TAGS = frozenset(('pre', 'textarea'))
+
+
+def _events(content, encoding=None, chunk_size=CHUNK_SIZE):
+    # Yields (event, element) pairs while feeding the page a chunk at a time;
+    # the caller stops the parse simply by not asking for more
+    if not content:
+        # Nothing to parse (a bodiless response, or one skipped for its type)
+        return
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding or 'utf-8')
+    for offset in range(0, len(content), chunk_size):
+        parser.feed(content[offset:offset + chunk_size])
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _has_class(element, name):
+    classes = element.get('class')
+    return bool(classes) and name in classes.split()
+
+
+def _discard(element):
+    # Drop a finished subtree along with the already processed siblings before it
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _text(element):
+    return ''.join(element.itertext())
+
+
+def _find_class(element, name):
+    for child in element.iter():
+        if child is not element and _has_class(child, name):
+            return child
+    return None
+
+
+def _string(element):
+    # BeautifulSoup's .string: the text of an element whose only child is a
+    # string, or a single element that itself has a .string
+    children = list(element)
+    if not children:
+        return element.text
+    if len(children) == 1 and not element.text and not children[0].tail:
+        return _string(children[0])
+    return None
+
+
+def serp_results(content, limit, encoding=None):
+    """The first `limit` organic results (`.g`) of a Google results page.
+
+    Each result is {'href', 'title', 'snippet'}: the href of its first link
+    ('' when the link has none, None without a link), the text of its first
+    <h3> and of its `.VwiC3b` description.
+    """
+    # Like select('.g'), nested results count too and order follows the start tags
+    started = []
+    results = {}
+    open_results = 0
+    for event, element in _events(content, encoding):
+        if event == 'start':
+            if len(started) < limit and _has_class(element, 'g'):
+                started.append(element)
+                open_results += 1
+            continue
+
+        if open_results and element in started:
+            open_results -= 1
+            link = next(element.iter('a'), None)
+            title = next(element.iter('h3'), None)
+            snippet = _find_class(element, 'VwiC3b')
+            results[started.index(element)] = {
+                'href': link.get('href', '') if link is not None else None,
+                'title': _text(title) if title is not None else None,
+                'snippet': _text(snippet) if snippet is not None else None,
+            }
+            if len(results) == limit:
+                break
+        if not open_results:
+            _discard(element)
+    return [results[index] for index in sorted(results)]
+
+
+def knowledge_panel(content, encoding=None):
+    """Description and fact rows (`.rVusze`) of the first Google knowledge panel, or None."""
+    depth = 0
+    for event, element in _events(content, encoding):
+        if event == 'start':
+            if _has_class(element, 'kp-header'):
+                depth += 1
+            continue
+
+        if _has_class(element, 'kp-header'):
+            depth -= 1
+            if depth == 0:
+                description = _find_class(element, 'kno-rdesc')
+                description = next(description.iter('span'), None) if description is not None else None
+                return {
+                    'description': _text(description).strip() if description is not None else None,
+                    'facts': [_text(row) for row in element.iter() if _has_class(row, 'rVusze')],
+                }
+        if depth == 0:
+            _discard(element)
+    return None
+
+
+def labelled_values(content, tag, labels, encoding=None):
+    """Values shown as <tag>Label</tag><tag>Value</tag> on profile pages.
+
+    For each label, the first `tag` element whose string contains it is found
+    and the text of the next `tag` element after it is returned (or None if
+    nothing follows). Parsing stops once every label is resolved.
+    """
+    values = {}
+    waiting = []          # labels seen whose value element hasn't started yet
+    collecting = {}       # value element -> labels it answers
+    open_tags = 0
+
+    for event, element in _events(content, encoding):
+        if event == 'start':
+            if element.tag == tag:
+                open_tags += 1
+                if waiting:
+                    collecting[element] = waiting
+                    waiting = []
+            continue
+
+        if element.tag == tag:
+            open_tags -= 1
+            if element in collecting:
+                value = _text(element).strip()
+                for label in collecting.pop(element):
+                    values[label] = value
+            string = _string(element)
+            if string:
+                for label in labels:
+                    if label not in values and label not in waiting and label in string and not any(
+                        label in pending for pending in collecting.values()
+                    ):
+                        waiting.append(label)
+            if len(values) == len(labels):
+                break
+
+        if open_tags == 0 and not collecting:
+            _discard(element)
+
+    for label in labels:
+        values.setdefault(label, None)
+    return values
+
+
+def page_text(content, encoding=None):
+    """All visible text of a page, as BeautifulSoup's get_text() would return it.
+
+    This needs the whole page, so there is no early stop; it still skips
+    building the BeautifulSoup tree.
+    """
+    if not content:
+        return ''
+    parser = etree.HTMLParser(encoding=encoding or 'utf-8')
+    root = etree.fromstring(content, parser)
+    if root is None:
+        return ''
+    parts = []
+    _collect_text(root, parts, False)
+    return ''.join(parts)
+
+
+def _visible(string, preserve):
+    # BeautifulSoup collapses whitespace-only strings outside <pre>/<textarea>
+    if preserve or not string.isspace():
+        return string
+    return '\n' if '\n' in string else ' '
+
+
+def _collect_text(element, parts, preserve):
+    # Comments and processing instructions have a non-string tag; only their tail is text
+    if isinstance(element.tag, str) and element.tag not in _NON_TEXT_TAGS:
+        inner = preserve or element.tag in _PRESERVE_WHITESPACE_TAGS
+        if element.text:
+            parts.append(_visible(element.text, inner))
+        for child in element:
+            _collect_text(child, parts, inner)
+    if element.tail:
+        parts.append(_visible(element.tail, preserve))
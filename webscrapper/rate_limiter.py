@@ -0,0 +1,214 @@
+import email.utils
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Starting request rate (requests per second) per site; anything else is a
+# company website and gets DEFAULT_RATE
+HOST_RATES = {
+    'google.com': 0.5,
+    'crunchbase.com': 1.0,
+    'bloomberg.com': 0.5,
+    'linkedin.com': 0.5,
+    'twitter.com': 1.0,
+    'facebook.com': 1.0,
+    'instagram.com': 1.0,
+}
+DEFAULT_RATE = 2.0
+
+# Requests a host's bucket lets through at once before pacing starts; by
+# default a second's worth (at least one). One company lookup sends 7 Google
+# searches (3 for the company, 3 for its social profiles, 1 for LinkedIn).
+# Paced at 0.5/s those alone take 12-14s, more than the whole latency budget
+# (field_scheduler.LATENCY_BUDGET), so Google's bucket holds one lookup's
+# worth. It refills in 16s; lookups closer together than that (filter
+# searches, bulk jobs) still queue behind each other and get cut by the budget.
+HOST_BURSTS = {
+    'google.com': 8,
+}
+
+# AIMD: on success the rate creeps back up by a fraction of its starting value,
+# on 429/503 it is halved. It never leaves [MIN_RATE, base * MAX_RATE_FACTOR].
+INCREASE_FRACTION = 0.1
+DECREASE_FACTOR = 0.5
+MIN_RATE = 0.05
+MAX_RATE_FACTOR = 4
+# Concurrent requests that were already queued all fail together; count that as one signal
+BACKOFF_COOLDOWN = 2.0
+MAX_RETRY_AFTER = 300
+# Longest a request may be told to wait for its slot. Past that it fails at
+# once instead of going into debt: a lookup has long given up by then
+# (field_scheduler.LATENCY_BUDGET), and every queued request would push the
+# ones behind it back further.
+MAX_WAIT = 30.0
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def host_key(url):
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def base_rate_for(host, host_rates=HOST_RATES, default_rate=DEFAULT_RATE):
+    for domain, rate in host_rates.items():
+        if host == domain or host.endswith('.' + domain):
+            return rate
+    return default_rate
+
+
+def burst_for(host, host_bursts=HOST_BURSTS):
+    for domain, burst in host_bursts.items():
+        if host == domain or host.endswith('.' + domain):
+            return burst
+    return None
+
+
+class RateLimited(Exception):
+    """The host's next free slot is further off than the caller is willing to wait."""
+
+    def __init__(self, host, wait):
+        super().__init__(f"Rate limited on {host}: next slot in {wait:.1f}s")
+        self.host = host
+        self.wait = wait
+
+
+def parse_retry_after(value):
+    # Either delta-seconds or an HTTP date
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return min(max(when - time.time(), 0.0), MAX_RETRY_AFTER)
+
+
+class HostBucket:
+    def __init__(self, base_rate, burst=None):
+        self.base_rate = base_rate
+        self.rate = base_rate
+        self.burst = float(burst) if burst else max(1.0, base_rate)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_backoff = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def next_wait(self, now):
+        # How long a request reserved now would wait
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def reserve(self, now):
+        # Take a token now, possibly going into debt; the debt is the wait
+        wait = self.next_wait(now)
+        self.tokens -= 1
+        self.requests += 1
+        return wait
+
+    def release(self):
+        # A reserved request that was never sent hands its token back
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def success(self):
+        self.rate = min(self.base_rate * MAX_RATE_FACTOR, self.rate + self.base_rate * INCREASE_FRACTION)
+
+    def backoff(self, now, retry_after):
+        self.throttled += 1
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if now - self.last_backoff >= BACKOFF_COOLDOWN:
+            self.last_backoff = now
+            self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """Per-host token buckets whose rate adapts to how each host responds."""
+
+    def __init__(self, host_rates=HOST_RATES, default_rate=DEFAULT_RATE, host_bursts=HOST_BURSTS, max_wait=MAX_WAIT):
+        self.host_rates = host_rates
+        self.default_rate = default_rate
+        self.host_bursts = host_bursts
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = HostBucket(base_rate_for(host, self.host_rates, self.default_rate),
+                                                      burst_for(host, self.host_bursts))
+        return bucket
+
+    def reserve(self, url, max_wait=None):
+        """Claim a request slot for url and return how many seconds to wait before sending it.
+
+        Raises RateLimited, without claiming the slot, when that would be more
+        than max_wait (the limiter's max_wait by default; math.inf always waits).
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        host = host_key(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            wait = bucket.next_wait(now)
+            if wait > max_wait:
+                bucket.rejected += 1
+                raise RateLimited(host, wait)
+            return bucket.reserve(now)
+
+    def release(self, url):
+        """Give back a slot from reserve() whose request was abandoned before it was sent."""
+        with self._lock:
+            self._bucket(host_key(url)).release()
+
+    def wait(self, url, max_wait=None):
+        delay = self.reserve(url, max_wait)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, url, status_code, retry_after=None):
+        with self._lock:
+            bucket = self._bucket(host_key(url))
+            if status_code in THROTTLE_STATUSES:
+                bucket.backoff(time.monotonic(), parse_retry_after(retry_after))
+            elif status_code < 500:
+                bucket.success()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(bucket.rate, 4),
+                    'base_rate': bucket.base_rate,
+                    'burst': bucket.burst,
+                    'blocked_for': round(max(bucket.blocked_until - now, 0.0), 2),
+                    'requests': bucket.requests,
+                    'throttled': bucket.throttled,
+                    'rejected': bucket.rejected,
+                }
+                for host, bucket in self._buckets.items()
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,289 @@
+"""Typed company records.
+
+Each source of a lookup fills its own partial Company, and the field scheduler
+merges them into one. Every filled field remembers which source it came from
+and how far that source is trusted, so a more reliable source arriving later
+can still replace it. The classes use __slots__, so a finished record is a
+handful of attributes rather than a tree of dicts. That adds up once a memo or
+a batch holds many thousands of them.
+"""
+import json
+import threading
+
+from contact_store import Contact, ContactStore
+
+# How far each source's values are trusted. A filled field is only replaced by
+# a source trusted more; the profile sites beat what's scraped off search
+# snippets.
+SOURCE_CONFIDENCE = {
+    'website': 0.5,
+    # DNS and WHOIS facts, and a website guessed from the name when no
+    # source found one
+    'domain': 0.55,
+    'google': 0.6,
+    'social_media': 0.7,
+    'linkedin': 0.75,
+    'crunchbase': 0.85,
+    'bloomberg': 0.9,
+}
+DEFAULT_CONFIDENCE = 0.5
+
+SCALAR_FIELDS = ('website', 'description', 'industry', 'company_size', 'revenue', 'headquarters', 'founded')
+SOCIAL_PLATFORMS = ('linkedin', 'twitter', 'facebook', 'instagram')
+
+# Records are merged rarely and briefly, so they share a few locks instead of
+# each carrying its own
+_LOCKS = tuple(threading.Lock() for _ in range(64))
+
+# (source, confidence) pairs are shared by every field a source fills
+_PROVENANCE = {source: (source, confidence) for source, confidence in SOURCE_CONFIDENCE.items()}
+
+
+def _lock_for(record):
+    return _LOCKS[(id(record) >> 4) % len(_LOCKS)]
+
+
+def provenance_for(source, confidence=None):
+    entry = _PROVENANCE.get(source)
+    if entry is not None and confidence in (None, entry[1]):
+        return entry
+    return (source, SOURCE_CONFIDENCE.get(source, DEFAULT_CONFIDENCE) if confidence is None else confidence)
+
+
+def dumps(value):
+    """Compact JSON for a Company or an already plain record; one line, so it also suits NDJSON."""
+    if isinstance(value, Company):
+        value = value.to_dict()
+    return json.dumps(value, separators=(',', ':'))
+
+
+class SocialProfile:
+    """A company's page on one social platform and what its listing said."""
+
+    __slots__ = ('platform', 'url', 'followers', 'description', 'employees', 'location', 'company_type',
+                 'specialties', 'source', 'confidence')
+
+    DATA_FIELDS = ('followers', 'description', 'employees', 'location', 'company_type', 'specialties')
+
+    def __init__(self, platform, url=None, source=None, confidence=None, **data):
+        self.platform = platform
+        self.url = url
+        self.source = source
+        self.confidence = confidence
+        for field in self.DATA_FIELDS:
+            setattr(self, field, data.get(field))
+
+    def __repr__(self):
+        return f"SocialProfile(platform={self.platform!r}, url={self.url!r})"
+
+    @property
+    def has_data(self):
+        return any(getattr(self, field) is not None for field in self.DATA_FIELDS)
+
+    def fill(self, url=None, **data):
+        # Only empty fields are filled; the first value found for each stays
+        if url and not self.url:
+            self.url = url
+        for field in self.DATA_FIELDS:
+            value = data.get(field)
+            if value is not None and getattr(self, field) is None:
+                setattr(self, field, value)
+
+    def data(self):
+        values = {'url': self.url}
+        for field in self.DATA_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                values[field] = list(value) if field == 'specialties' else value
+        return values
+
+
+class Company:
+    """One company's enriched data, with the source and confidence of each filled field."""
+
+    __slots__ = ('name', 'website', 'description', 'industry', 'company_size', 'revenue', 'headquarters', 'founded',
+                 'contacts', 'profiles', 'technologies', 'domain_info', 'provenance', 'completeness', 'sources')
+
+    def __init__(self, name, website=None):
+        self.name = name
+        self.website = website
+        self.description = None
+        self.industry = None
+        self.company_size = None
+        self.revenue = None
+        self.headquarters = None
+        self.founded = None
+        # A ContactStore while contacts come in, a tuple of Contacts once finished
+        self.contacts = ContactStore()
+        self.profiles = {}
+        # {category: [technology]}
+        self.technologies = None
+        # DNS and WHOIS facts: {'domain', 'a', 'mx', 'ns', 'registered', 'verified'}
+        self.domain_info = None
+        # {field: (source, confidence)} for the scalar fields, technologies and domain_info
+        self.provenance = {}
+        self.completeness = None
+        self.sources = None
+
+    def __repr__(self):
+        return f"Company(name={self.name!r}, website={self.website!r}, completeness={self.completeness!r})"
+
+    def add_profile(self, platform, url=None, **data):
+        # Google results name profiles by domain (www.linkedin.com); file those under the platform
+        platform = next((name for name in SOCIAL_PLATFORMS if name in platform), platform)
+        profile = self.profiles.get(platform)
+        if profile is None:
+            profile = self.profiles[platform] = SocialProfile(platform)
+        profile.fill(url, **data)
+        return profile
+
+    def get(self, field):
+        # Values by their key in the serialized record; 'social_data.<platform>'
+        # is one platform's listing data
+        if field.startswith('social_data.'):
+            profile = self.profiles.get(field[len('social_data.'):])
+            return profile.data() if profile is not None and profile.has_data else None
+        if field == 'social_profiles':
+            return {platform: profile.url for platform, profile in self.profiles.items() if profile.url}
+        return getattr(self, field)
+
+    def _confidence(self, field):
+        # None when nothing records who filled the field
+        if field.startswith('social_data.'):
+            profile = self.profiles.get(field[len('social_data.'):])
+            return profile.confidence if profile is not None else None
+        entry = self.provenance.get(field)
+        return entry[1] if entry is not None else None
+
+    def wants(self, fields, confidence):
+        """Whether any of fields is still empty, or was filled by a source trusted less than confidence."""
+        with _lock_for(self):
+            for field in fields:
+                if not self.get(field):
+                    return True
+                filled_with = self._confidence(field)
+                if filled_with is not None and filled_with < confidence:
+                    return True
+            return False
+
+    def merge(self, partial, source):
+        """Fold a source's partial record into this one and return the fields it filled.
+
+        Empty fields take the first value found; a filled one is only replaced
+        by a source trusted more than the one that filled it.
+        """
+        provenance = provenance_for(source)
+        confidence = provenance[1]
+        filled = []
+        with _lock_for(self):
+            for field in SCALAR_FIELDS:
+                value = getattr(partial, field)
+                if not value:
+                    continue
+                if not getattr(self, field):
+                    filled.append(field)
+                else:
+                    entry = self.provenance.get(field)
+                    if entry is None or entry[1] >= confidence:
+                        continue
+                setattr(self, field, value)
+                self.provenance[field] = provenance
+
+            for platform, theirs in partial.profiles.items():
+                mine = self.profiles.get(platform)
+                if mine is None:
+                    mine = self.profiles[platform] = SocialProfile(platform)
+                had_url, had_data = mine.url, mine.has_data
+                mine.fill(theirs.url, **{field: getattr(theirs, field) for field in SocialProfile.DATA_FIELDS})
+                if mine.url and not had_url:
+                    filled.append(f'social_profiles.{platform}')
+                # A profile is credited to the source of its listing data, or
+                # of its URL while it has none
+                if mine.has_data and not had_data:
+                    mine.source, mine.confidence = provenance
+                    filled.append(f'social_data.{platform}')
+                elif mine.source is None:
+                    mine.source, mine.confidence = provenance
+
+            if partial.technologies and not self.technologies:
+                self.technologies = partial.technologies
+                self.provenance['technologies'] = provenance
+                filled.append('technologies')
+
+            if partial.domain_info and not self.domain_info:
+                self.domain_info = partial.domain_info
+                self.provenance['domain_info'] = provenance
+                filled.append('domain_info')
+
+            added = 0
+            for contact in partial.contacts:
+                self.contacts.add(contact.name, contact.title, contact.email, contact.phone, source, confidence)
+                added += 1
+            if added:
+                filled.append('contacts')
+        return filled
+
+    def finish(self, sources):
+        # The contact store's indexes are only needed while contacts come in
+        with _lock_for(self):
+            if isinstance(self.contacts, ContactStore):
+                self.contacts = tuple(self.contacts)
+            self.sources = dict(sources)
+
+    def to_dict(self):
+        record = {'name': self.name}
+        for field in SCALAR_FIELDS:
+            record[field] = getattr(self, field)
+        record['contacts'] = [contact.to_dict() for contact in self.contacts]
+        record['social_profiles'] = self.get('social_profiles')
+        social_data = {platform: {} for platform in SOCIAL_PLATFORMS}
+        provenance = {field: {'source': source, 'confidence': confidence}
+                      for field, (source, confidence) in self.provenance.items()}
+        for platform, profile in self.profiles.items():
+            if profile.has_data:
+                social_data[platform] = profile.data()
+                provenance[f'social_data.{platform}'] = {'source': profile.source, 'confidence': profile.confidence}
+        record['social_data'] = social_data
+        record['technologies'] = {category: list(names) for category, names in (self.technologies or {}).items()}
+        record['domain_info'] = self.domain_info
+        if self.completeness is not None:
+            record['completeness'] = self.completeness
+        if self.sources is not None:
+            record['sources'] = dict(self.sources)
+        record['provenance'] = provenance
+        return record
+
+    @classmethod
+    def from_dict(cls, data):
+        company = cls(data.get('name') or data.get('company_name'), data.get('website'))
+        for field in SCALAR_FIELDS[1:]:
+            setattr(company, field, data.get(field))
+        company.contacts = tuple(Contact.from_dict(contact) for contact in data.get('contacts') or ())
+        provenance = data.get('provenance') or {}
+        for platform, url in (data.get('social_profiles') or {}).items():
+            company.add_profile(platform, url)
+        for platform, values in (data.get('social_data') or {}).items():
+            if not values:
+                continue
+            profile = company.add_profile(
+                platform, **{k: v for k, v in values.items() if k == 'url' or k in SocialProfile.DATA_FIELDS}
+            )
+            entry = provenance.get(f'social_data.{platform}')
+            if entry:
+                profile.source, profile.confidence = entry.get('source'), entry.get('confidence')
+        company.technologies = data.get('technologies') or None
+        company.domain_info = data.get('domain_info')
+        company.provenance = {
+            field: provenance_for(entry.get('source'), entry.get('confidence'))
+            for field, entry in provenance.items() if not field.startswith('social_data.')
+        }
+        company.completeness = data.get('completeness')
+        company.sources = data.get('sources')
+        return company
+
+    def to_json(self):
+        return dumps(self)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
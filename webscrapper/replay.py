@@ -0,0 +1,179 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from fetch_engine import FetchResponse
+from http_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# HTTP_REPLAY_MODE=record captures every response into the archive,
+# HTTP_REPLAY_MODE=replay serves them back without touching the network
+REPLAY_MODE = os.environ.get('HTTP_REPLAY_MODE', '').lower()
+DEFAULT_ARCHIVE_PATH = os.environ.get(
+    'HTTP_REPLAY_ARCHIVE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'replay.sqlite3'),
+)
+# Simulated network time for replayed responses, in seconds
+DEFAULT_LATENCY = float(os.environ.get('HTTP_REPLAY_LATENCY', '0'))
+DEFAULT_JITTER = float(os.environ.get('HTTP_REPLAY_JITTER', '0'))
+
+
+class Archive:
+    """Recorded HTTP exchanges keyed by normalized URL."""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS exchanges ('
+            ' key TEXT PRIMARY KEY, url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,'
+            ' body BLOB NOT NULL, encoding TEXT, recorded_at REAL NOT NULL)'
+        )
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, status, headers, body, encoding FROM exchanges WHERE key = ?', (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return FetchResponse(row[0], row[1], json.loads(row[2]), bytes(row[3]), row[4])
+
+    def put(self, url, response):
+        # A later response for the same URL (e.g. the cloudscraper retry after a
+        # challenge) replaces the earlier one
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO exchanges (key, url, status, headers, body, encoding, recorded_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (normalize_url(url), response.url, response.status_code, json.dumps(response.headers),
+                 response.content, response.encoding, time.time()),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM exchanges').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ReplayInterceptor:
+    """Records responses into an archive, or serves them back with simulated latency."""
+
+    def __init__(self, archive, mode, latency=DEFAULT_LATENCY, jitter=DEFAULT_JITTER, seed=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.archive = archive
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.stats = {'recorded': 0, 'replayed': 0, 'missing': 0}
+        self._random = random.Random(seed)
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def delay(self):
+        return max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+
+    def lookup(self, url):
+        response = self.archive.get(url)
+        if response is None:
+            # Unrecorded URLs look like a page that doesn't exist
+            self.stats['missing'] += 1
+            logger.info(f"No recorded response for {url}")
+            return FetchResponse(url, 404, {}, b'')
+        self.stats['replayed'] += 1
+        return response
+
+    async def replay_async(self, url):
+        await asyncio.sleep(self.delay())
+        return await asyncio.get_running_loop().run_in_executor(None, self.lookup, url)
+
+    def replay(self, url):
+        time.sleep(self.delay())
+        return self.lookup(url)
+
+    def record(self, url, response):
+        if self.mode == 'record':
+            self.archive.put(url, response)
+            self.stats['recorded'] += 1
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that puts a requests.Session (or cloudscraper) behind an interceptor."""
+
+    def __init__(self, interceptor, wrapped=None):
+        super().__init__()
+        self.interceptor = interceptor
+        self.wrapped = wrapped or HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        if self.interceptor.replaying:
+            return self._build(request, self.interceptor.replay(request.url))
+        response = self.wrapped.send(request, **kwargs)
+        if self.interceptor.mode == 'record':
+            # The caller gets the whole body; the recording is capped like a
+            # live fetch. Reading it here leaves it on the response.
+            response.content
+            self.interceptor.record(request.url, FetchResponse.from_requests(response))
+        return response
+
+    @staticmethod
+    def _build(request, recorded):
+        response = requests.Response()
+        response.status_code = recorded.status_code
+        response.headers = CaseInsensitiveDict(recorded.headers)
+        # Already read, like a non-streamed response; raw still serves the body
+        # to callers that stream it
+        response._content = recorded.content
+        response._content_consumed = True
+        response.raw = io.BytesIO(recorded.content)
+        response.encoding = recorded.encoding
+        response.url = recorded.url
+        response.request = request
+        return response
+
+    def close(self):
+        self.wrapped.close()
+
+
+def install(session, interceptor=None):
+    """Route a requests.Session through the configured interceptor, if any."""
+    interceptor = interceptor or get_interceptor()
+    if interceptor is not None:
+        adapter = ReplayAdapter(interceptor)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+_interceptor = None
+_interceptor_lock = threading.Lock()
+
+
+def get_interceptor():
+    global _interceptor
+    if _interceptor is None and REPLAY_MODE:
+        with _interceptor_lock:
+            if _interceptor is None:
+                _interceptor = ReplayInterceptor(Archive(), REPLAY_MODE)
+                logger.info(f"HTTP {REPLAY_MODE} mode using {_interceptor.archive.path}")
+    return _interceptor
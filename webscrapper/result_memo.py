@@ -0,0 +1,188 @@
+import copy
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+RESULT_TTL = 6 * 3600
+LEASE_TIMEOUT = 180
+POLL_INTERVAL = 0.25
+
+_LEGAL_SUFFIX = re.compile(r'\b(?:inc|llc|ltd|limited|corp|corporation|co|company|gmbh|plc)\.?$')
+_NON_WORD = re.compile(r'[^\w&]+')
+
+
+def normalize_company_name(name):
+    key = _NON_WORD.sub(' ', name.lower()).strip()
+    # Drop trailing legal suffixes ("Acme Inc", "Acme, LLC") so variants share one entry
+    while True:
+        stripped = _LEGAL_SUFFIX.sub('', key).strip()
+        if stripped == key or not stripped:
+            break
+        key = stripped
+    return ' '.join(key.split())
+
+
+class MemoryStore:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(value), time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Within one process the in-flight table already coalesces callers
+    def acquire_lease(self, key, owner, timeout):
+        return True
+
+    def release_lease(self, key, owner):
+        pass
+
+
+class SQLiteStore:
+    # Shared between Flask worker processes on the same host; values are
+    # stored as the text encode returns
+    def __init__(self, path, encode=json.dumps, decode=json.loads):
+        self.encode = encode
+        self.decode = decode
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM results WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return self.decode(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, self.encode(value), now + ttl),
+            )
+            self._conn.execute('DELETE FROM results WHERE expires_at <= ?', (now,))
+
+    def acquire_lease(self, key, owner, timeout):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('DELETE FROM leases WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)',
+                (key, owner, now + timeout),
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, key, owner):
+        with self._lock:
+            self._conn.execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+
+
+class ResultMemo:
+    def __init__(self, store=None, ttl=RESULT_TTL, lease_timeout=LEASE_TIMEOUT):
+        self.store = store or MemoryStore()
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+        self._owner = uuid.uuid4().hex
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, name, compute, ttl=None):
+        # ttl may be a function of the computed value, for results that should expire sooner
+        key = normalize_company_name(name)
+        value = self.store.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        # Single flight: the first caller for a key computes, the rest wait on its future
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            self.stats['coalesced'] += 1
+            return copy.deepcopy(future.result())
+
+        try:
+            value = self._compute_once(key, compute, ttl)
+            future.set_result(value)
+            return copy.deepcopy(value)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _compute_once(self, key, compute, ttl=None):
+        # Coordinate with other processes sharing the store: whoever holds the
+        # lease computes, everyone else polls until the result shows up
+        deadline = time.time() + self.lease_timeout
+        while not self.store.acquire_lease(key, self._owner, self.lease_timeout):
+            value = self.store.get(key)
+            if value is not None:
+                self.stats['coalesced'] += 1
+                return value
+            if time.time() > deadline:
+                logger.warning(f"Timed out waiting on another worker for '{key}', computing locally")
+                break
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            value = self.store.get(key)
+            if value is not None:
+                return value
+            self.stats['misses'] += 1
+            value = compute()
+            if value is not None:
+                if callable(ttl):
+                    ttl = ttl(value)
+                self.store.set(key, value, self.ttl if ttl is None else ttl)
+            return value
+        finally:
+            self.store.release_lease(key, self._owner)
+
+
+def create_memo(encode=json.dumps, decode=json.loads):
+    # encode/decode turn values into the text a shared SQLite store keeps
+    path = os.environ.get('RESULT_MEMO_PATH')
+    return ResultMemo(SQLiteStore(path, encode, decode) if path else MemoryStore())
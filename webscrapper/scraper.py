@@ -1,15 +1,28 @@
-import requests
-from bs4 import BeautifulSoup
+import contextvars
+import threading
 import time
-import json
-import os
 import logging
 import re
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from urllib.parse import quote, urlparse
-from fake_useragent import UserAgent
-import cloudscraper
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, as_completed, wait,
+                                TimeoutError as FuturesTimeoutError)
+from functools import partial
+from fetch_engine import FetchResponse, get_engine
+from http_cache import get_cache, source_for_url
+from result_memo import create_memo
+from parsers import knowledge_panel, labelled_values, serp_results
+from extractors import LINKEDIN_DETAILS, SOCIAL_DETAILS
+from parse_pool import get_parse_pool, google_details, homepage, page_contacts
+from company_store import get_company_store, shared_host
+from domain_lookup import GUESS_TLDS, get_domain_lookup, website_domain
+from records import Company, dumps
+from field_scheduler import COMPLETENESS, FieldScheduler, completeness
+from rate_limiter import get_rate_limiter
+from session_pool import get_session_pool, random_headers
+from slug_cache import get_slug_cache, slug_candidates
+from jobs import JobRunner, JobStore, MAX_JOB_SIZE, parse_company_names
+import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,69 +30,239 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Shared pool for the per-source lookups; the actual HTTP work is multiplexed
+# on the fetch engine's event loop, so these threads mostly wait on futures
+SOURCE_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix='source')
+
+# Enriches the candidates of a filter search concurrently
+COMPANY_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='company')
+
+# Per-host request budgets, shared with the fetch engine and scrap.py
+RATE_LIMITER = get_rate_limiter()
+
+# Finished company records, shared by every scraper instance in the process
+RESULT_MEMO = create_memo(encode=dumps, decode=Company.from_json)
+
+# Records cut short by the latency budget are only reused briefly, so a
+# retry soon after gets a chance at the sources that didn't make it
+PARTIAL_RESULT_TTL = 300
+
+# Name slugs that can be used as a domain label
+HOSTNAME_LABEL = re.compile(r'[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?')
+
+# The run of the source executing in the current context, if any
+_source_run = contextvars.ContextVar('source_run', default=None)
+
+
+class SourceRun:
+    """The engine requests of one source's run, so they can be dropped together."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def track(self, future):
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._futures.add(future)
+                future.add_done_callback(self._discard)
+                return future
+        future.cancel()
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel(self):
+        # Cancelling an engine future cancels its task on the event loop, which
+        # gives back the request's connection and rate-limit slot
+        with self._lock:
+            self.cancelled.set()
+            futures, self._futures = self._futures, set()
+        for future in futures:
+            future.cancel()
+
 class CompanyDataScraper:
+    # Seconds allowed for fetching a company's homepage and contact pages
+    CONTACT_CRAWL_DEADLINE = 10
+    # Seconds allowed for a domain's DNS and WHOIS lookups, and for checking
+    # that the contacts' email domains accept mail
+    DOMAIN_LOOKUP_DEADLINE = 4
+    EMAIL_CHECK_DEADLINE = 2
+
     def __init__(self):
-        self.ua = UserAgent()
-        self.scraper = cloudscraper.create_scraper(
-            browser={'custom': self.ua.random},
-            delay=2
-        )
-        self.headers = {
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+        # Cheap to build: the UA database, the cloudscraper sessions and the
+        # connection pool are all process-wide and reused across requests
+        self.headers = random_headers()
+        self.sessions = get_session_pool()
+        self.engine = get_engine()
+        self.slugs = get_slug_cache()
+        self.companies = get_company_store()
+        self.domains = get_domain_lookup()
+
+    def submit(self, url):
+        future = self.engine.submit(url, headers=self.headers)
+        run = _source_run.get()
+        return run.track(future) if run is not None else future
+
+    def fetch(self, url):
+        return self._resolve(url, self.submit(url))
+
+    def fetch_many(self, urls):
+        # Fire all requests at once and collect them in order; failed fetches come back as None
+        futures = [self.submit(url) for url in urls]
+        responses = []
+        for url, future in zip(urls, futures):
+            try:
+                responses.append(self._resolve(url, future))
+            except CancelledError:
+                # The source was abandoned; don't count it as a failed fetch
+                responses.append(None)
+            except Exception as e:
+                logger.warning(f"Error fetching {url}: {str(e)}")
+                metrics.record_error(e)
+                responses.append(None)
+        return responses
+
+    def _resolve(self, url, future):
+        response = future.result()
+        if self._is_cloudflare_challenge(response):
+            run = _source_run.get()
+            if run is not None and run.cancelled.is_set():
+                raise CancelledError()
+            # Fall back to cloudscraper, which can solve the JS challenge
+            logger.info(f"Cloudflare challenge on {url}, retrying with cloudscraper")
+            with self.sessions.lease() as session:
+                RATE_LIMITER.wait(url)
+                # The session sends its own User-Agent, the one its clearance cookie is bound to
+                response = FetchResponse.from_requests(session.get(url, stream=True), self.engine.max_bytes_for(url))
+                RATE_LIMITER.record(url, response.status_code, response.headers.get('retry-after'))
+                if self._is_cloudflare_challenge(response):
+                    session.mark_failed()
+        metrics.record_fetch(url, source_for_url(url), response.status_code, len(response.content),
+                             response.elapsed or 0.0, response.limited)
+        return response
+
+    @staticmethod
+    def _parse(response, parser, *args):
+        # Parsers take the raw body, in a worker process when PARSE_PROCESSES
+        # is set; time them per source
+        with metrics.timed_parse(source_for_url(response.url)):
+            return get_parse_pool().run(parser, response.content, *args, encoding=response.encoding)
+
+    @staticmethod
+    def _is_cloudflare_challenge(response):
+        if response.status_code not in (403, 503):
+            return False
+        return 'cloudflare' in response.headers.get('server', '').lower() or 'cf-mitigated' in response.headers
 
     def search_company(self, company_name):
+        # Identical lookups (same normalized name) share one pipeline run
+        computed = []
+        
+        def compute():
+            computed.append(True)
+            result = self._search_company(company_name)
+            # Enriched companies become searchable through the lead scraper's /search
+            try:
+                self.companies.upsert(result.to_dict())
+            except Exception as e:
+                logger.warning(f"Error storing {company_name}: {str(e)}")
+            return result
+        
+        result = RESULT_MEMO.get_or_compute(company_name, compute, ttl=self._result_ttl)
+        trace = metrics.current_trace()
+        if trace is not None and not computed:
+            trace.note('served from the result memo')
+        return result
+
+    @staticmethod
+    def _result_ttl(company_data):
+        if 'timed_out' in (company_data.sources or {}).values():
+            return PARTIAL_RESULT_TTL
+        return None
+
+    def _search_company(self, company_name):
         try:
             logger.info(f"Starting search for company: {company_name}")
             
-            # Initialize company data
-            company_data = {
-                "name": company_name,
-                "website": None,
-                "description": None,
-                "industry": None,
-                "company_size": None,
-                "revenue": None,
-                "headquarters": None,
-                "founded": None,
-                "contacts": [],
-                "social_profiles": {},
-                "social_data": {
-                    "linkedin": {},
-                    "twitter": {},
-                    "facebook": {},
-                    "instagram": {}
-                },
-                "technologies": []
-            }
-            
-            # Use multiple threads to gather data from different sources
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                futures = [
-                    executor.submit(self._search_google, company_name, company_data),
-                    executor.submit(self._search_crunchbase, company_name, company_data),
-                    executor.submit(self._search_bloomberg, company_name, company_data),
-                    executor.submit(self._search_social_media, company_name, company_data),
-                    executor.submit(self._search_linkedin_data, company_name, company_data)
-                ]
-                
-                for future in as_completed(futures):
+            # Sources each fill their own partial record; the scheduler merges
+            # them as they finish, so a source still running when the budget
+            # runs out can't touch the returned record
+            company_data = Company(company_name)
+            scheduler = FieldScheduler(company_data)
+            
+            stages = [
+                ('google', self._search_google),
+                ('crunchbase', partial(self._search_crunchbase, scheduler=scheduler)),
+                ('bloomberg', partial(self._search_bloomberg, scheduler=scheduler)),
+                ('social_media', self._search_social_media),
+                ('linkedin', self._search_linkedin_data),
+            ]
+            futures = {}
+            runs = {}
+            
+            def start(name, search, record, *args):
+                # Each source gets a run, so abandoning it also drops its requests
+                run = SourceRun()
+                future = metrics.submit_in_context(SOURCE_EXECUTOR, self._run_source, name, search, record, *args, run=run)
+                futures[future] = name
+                runs[future] = run
+                return future
+            
+            pending = {start(name, search, Company(company_name), company_name) for name, search in stages}
+            
+            while pending:
+                done, pending = wait(pending, timeout=scheduler.remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    name = futures[future]
                     try:
-                        future.result()
+                        scheduler.merge(name, future.result())
                     except Exception as e:
                         logger.error(f"Error in data collection: {str(e)}")
-            
-            # If we found the website, get more info
-            if company_data["website"]:
-                self._get_website_info(company_data)
-            
-            # Clean and validate the data
-            self._clean_company_data(company_data)
+                        scheduler.finish(name, 'error')
+                
+                # Crawl the website as soon as one source has found it, alongside the rest
+                if company_data.website and 'website' not in futures.values():
+                    pending.add(start(
+                        'website', partial(self._get_website_info, deadline=scheduler.remaining()),
+                        Company(company_name, website=company_data.website),
+                    ))
+                
+                # DNS and WHOIS only need the domain; when Google didn't find
+                # the website either, they try the obvious domains for the name
+                if 'domain' not in futures.values() and (company_data.website or 'google' in scheduler.status):
+                    pending.add(start(
+                        'domain', partial(self._lookup_domain, deadline=scheduler.remaining()),
+                        Company(company_name, website=company_data.website),
+                    ))
+                
+                # Stop waiting on sources that have nothing left to add
+                for future in list(pending):
+                    name = futures[future]
+                    if not scheduler.needed(name):
+                        future.cancel()
+                        runs[future].cancel()
+                        pending.discard(future)
+                        scheduler.finish(name, 'skipped')
+            
+            if pending:
+                logger.info(f"Latency budget spent for {company_name} with {len(pending)} sources pending")
+                for future in pending:
+                    # A running source can't be interrupted, but cancelling its
+                    # requests makes it return as soon as it next waits on one
+                    future.cancel()
+                    runs[future].cancel()
+                    scheduler.finish(futures[future], 'timed_out')
+            
+            self._verify_emails(company_data, min(scheduler.remaining(), self.EMAIL_CHECK_DEADLINE))
+            company_data.finish(scheduler.status)
+            company_data.completeness = completeness(company_data)
+            COMPLETENESS.observe(company_data.completeness)
             
             logger.info(f"Extracted data: {company_data}")
             return company_data
@@ -88,319 +271,284 @@ class CompanyDataScraper:
             logger.error(f"Error scraping {company_name}: {str(e)}")
             raise
 
+    @staticmethod
+    def _run_source(name, search, record, *args, run=None):
+        # The source's engine requests are tracked by its run, if it has one
+        token = _source_run.set(run)
+        try:
+            with metrics.stage(name):
+                search(*args, record)
+        finally:
+            _source_run.reset(token)
+        return record
+
     def _search_google(self, company_name, company_data):
         try:
-            # First try Wikipedia for well-known companies
-            search_url = f"https://www.google.com/search?q={quote(company_name)}+company+wikipedia"
-            response = self.scraper.get(search_url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Try to get data from Google's knowledge panel
-            knowledge_panel = soup.select_one('.kp-header')
-            if knowledge_panel:
+            # The three SERPs are independent, so request them together
+            wiki_response, website_response, details_response = self.fetch_many([
+                f"https://www.google.com/search?q={quote(company_name)}+company+wikipedia",
+                f"https://www.google.com/search?q={quote(company_name)}+company+official+website",
+                f"https://www.google.com/search?q={quote(company_name)}+company+employees+revenue+industry",
+            ])
+            
+            # First try Wikipedia for well-known companies; Google's knowledge
+            # panel is all we read, so parsing stops once it's closed
+            panel = self._parse(wiki_response, knowledge_panel) if wiki_response else None
+            if panel:
                 # Try to get description
-                desc = knowledge_panel.select_one('.kno-rdesc span')
-                if desc:
-                    company_data["description"] = desc.text.strip()
+                if panel['description'] is not None:
+                    company_data.description = panel['description']
                 
                 # Try to get other info
-                for div in knowledge_panel.select('.rVusze'):
-                    text = div.get_text().lower()
+                for fact in panel['facts']:
+                    text = fact.lower()
                     if 'founded:' in text:
-                        company_data["founded"] = text.split('founded:')[1].strip()
+                        company_data.founded = text.split('founded:')[1].strip()
                     elif 'headquarters:' in text:
-                        company_data["headquarters"] = text.split('headquarters:')[1].strip()
+                        company_data.headquarters = text.split('headquarters:')[1].strip()
                     elif 'revenue:' in text:
-                        company_data["revenue"] = text.split('revenue:')[1].strip()
+                        company_data.revenue = text.split('revenue:')[1].strip()
                     elif 'industry:' in text:
-                        company_data["industry"] = text.split('industry:')[1].strip()
+                        company_data.industry = text.split('industry:')[1].strip()
             
             # Search for company website and basic info
-            search_url = f"https://www.google.com/search?q={quote(company_name)}+company+official+website"
-            response = self.scraper.get(search_url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'lxml')
+            results = self._parse(website_response, serp_results, 3) if website_response else []
             
             # Get website from search results
-            for result in soup.select('.g')[:3]:
-                link = result.select_one('a')
-                if not link:
+            for result in results:
+                if result['href'] is None:
                     continue
                     
-                url = link.get('href', '')
+                url = result['href']
                 if not url.startswith('http'):
                     continue
                 
                 domain = urlparse(url).netloc.lower()
                 if any(s in domain for s in ['linkedin.com', 'facebook.com', 'twitter.com']):
-                    company_data["social_profiles"][domain] = url
+                    company_data.add_profile(domain, url)
                     continue
                 
-                if not company_data["website"]:
-                    company_data["website"] = url
+                if not company_data.website:
+                    company_data.website = url
             
             # Search for employees and size
-            search_url = f"https://www.google.com/search?q={quote(company_name)}+company+employees+revenue+industry"
-            response = self.scraper.get(search_url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            text_content = soup.get_text().lower()
-            
-            # Look for employee count
-            size_patterns = [
-                r'(\d{1,3}(?:,\d{3})*(?:\+)?\s*employees)',
-                r'((?:about|approximately|over|more than)\s+\d{1,3}(?:,\d{3})*\s+employees)',
-                r'(team of \d{1,3}(?:,\d{3})*(?:\+)?)',
-            ]
-            
-            for pattern in size_patterns:
-                match = re.search(pattern, text_content, re.IGNORECASE)
-                if match:
-                    company_data["company_size"] = match.group(1)
-                    break
-            
-            # Look for industry
-            industry_patterns = [
-                r'industry:\s*([^\.]+)',
-                r'(?:is\s+)?(?:a|an)\s+([^,\.]+(?:company|corporation|manufacturer|producer|provider|retailer|supplier))',
-                r'operates\s+in\s+the\s+([^,\.]+)\s+(?:industry|sector|market)',
-                r'leading\s+([^,\.]+(?:company|manufacturer|producer|provider|retailer|supplier))',
-            ]
+            if not details_response:
+                return
+            # Size, industry and revenue come out of one scan of the page text
+            details = self._parse(details_response, google_details)
             
-            for pattern in industry_patterns:
-                match = re.search(pattern, text_content, re.IGNORECASE)
-                if match:
-                    industry = match.group(1).strip()
-                    if len(industry) > 5:  # Avoid very short matches
-                        company_data["industry"] = industry
-                        break
+            if 'company_size' in details:
+                company_data.company_size = details['company_size']
             
-            # Look for revenue
-            revenue_patterns = [
-                r'revenue[:\s]+(?:US)?\$?\s*([\d\.]+\s*(?:billion|million|trillion))',
-                r'(?:US)?\$?\s*([\d\.]+\s*(?:billion|million|trillion))\s+in\s+revenue',
-            ]
+            if 'industry' in details:
+                company_data.industry = details['industry']
             
-            for pattern in revenue_patterns:
-                match = re.search(pattern, text_content, re.IGNORECASE)
-                if match:
-                    company_data["revenue"] = f"${match.group(1)}"
-                    break
+            if 'revenue' in details:
+                company_data.revenue = f"${details['revenue']}"
                     
         except Exception as e:
             logger.warning(f"Error in Google search: {str(e)}")
+            metrics.record_error(e)
 
-    def _search_crunchbase(self, company_name, company_data):
+    def _find_profile(self, source, profile_url, company_name):
+        """The first profile page to answer 200 for one of the company's slugs, or None."""
+        known = self.slugs.found(source, company_name)
+        if known is not None:
+            try:
+                response = self.fetch(profile_url.format(slug=known))
+            except CancelledError:
+                return None
+            if response.status_code == 200:
+                return response
+            self.slugs.forget(source, company_name)
+            if response.status_code == 404:
+                self.slugs.mark_missing(source, known)
+        
+        # Probe every slug that hasn't 404ed lately at once and keep the first hit
+        candidates = self.slugs.unknown(source, [slug for slug in slug_candidates(company_name) if slug != known])
+        futures = {self.submit(profile_url.format(slug=slug)): slug for slug in candidates}
+        for future in as_completed(futures):
+            slug = futures[future]
+            url = profile_url.format(slug=slug)
+            try:
+                response = self._resolve(url, future)
+            except CancelledError:
+                # The source was abandoned and its probes with it
+                return None
+            except Exception as e:
+                logger.warning(f"Error fetching {url}: {str(e)}")
+                metrics.record_error(e)
+                continue
+            if response.status_code == 200:
+                self.slugs.remember(source, company_name, slug)
+                for other, other_slug in futures.items():
+                    # Probes that already came back still tell us which slugs don't exist
+                    if other is not future and other.done() and not other.cancelled() and other.exception() is None:
+                        if other.result().status_code == 404:
+                            self.slugs.mark_missing(source, other_slug)
+                    other.cancel()
+                return response
+            if response.status_code == 404:
+                self.slugs.mark_missing(source, slug)
+        return None
+
+    def _search_crunchbase(self, company_name, company_data, scheduler=None):
         try:
-            # Try different URL formats
-            company_slugs = [
-                company_name.lower().replace(' ', '-'),
-                company_name.lower().replace(' ', ''),
-                company_name.lower().replace(' ', '_'),
-            ]
+            # Another source may already have filled everything this one would
+            if scheduler is not None and not scheduler.needed('crunchbase'):
+                return
             
-            for slug in company_slugs:
-                try:
-                    search_url = f"https://www.crunchbase.com/organization/{slug}"
-                    response = self.scraper.get(search_url, headers=self.headers)
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'lxml')
-                        
-                        # Try to get industry
-                        industry_elem = soup.find('span', string=re.compile('Industries'))
-                        if industry_elem and industry_elem.find_next('span'):
-                            company_data["industry"] = industry_elem.find_next('span').text.strip()
-                        
-                        # Try to get company size
-                        size_elem = soup.find('span', string=re.compile('Employee Count'))
-                        if size_elem and size_elem.find_next('span'):
-                            company_data["company_size"] = size_elem.find_next('span').text.strip()
-                        
-                        break
-                except:
-                    continue
+            response = self._find_profile('crunchbase', "https://www.crunchbase.com/organization/{slug}", company_name)
+            if response is None:
+                return
+            
+            # Industry and company size sit in the span after their label
+            values = self._parse(response, labelled_values, 'span', ['Industries', 'Employee Count'])
+            
+            if values['Industries'] is not None:
+                company_data.industry = values['Industries']
+            
+            if values['Employee Count'] is not None:
+                company_data.company_size = values['Employee Count']
                     
         except Exception as e:
             logger.warning(f"Error in Crunchbase search: {str(e)}")
+            metrics.record_error(e)
 
-    def _search_bloomberg(self, company_name, company_data):
+    def _search_bloomberg(self, company_name, company_data, scheduler=None):
         try:
-            # Try different URL formats
-            company_slugs = [
-                company_name.lower().replace(' ', '-'),
-                company_name.lower().replace(' ', ''),
-                company_name.lower().replace(' ', '_'),
-            ]
+            # Another source may already have filled everything this one would
+            if scheduler is not None and not scheduler.needed('bloomberg'):
+                return
             
-            for slug in company_slugs:
-                try:
-                    search_url = f"https://www.bloomberg.com/profile/{slug}"
-                    response = self.scraper.get(search_url, headers=self.headers)
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'lxml')
-                        
-                        # Try to get revenue
-                        revenue_elem = soup.find('div', string=re.compile('Revenue'))
-                        if revenue_elem and revenue_elem.find_next('div'):
-                            company_data["revenue"] = revenue_elem.find_next('div').text.strip()
-                        
-                        # Try to get industry
-                        industry_elem = soup.find('div', string=re.compile('Industry'))
-                        if industry_elem and industry_elem.find_next('div'):
-                            company_data["industry"] = industry_elem.find_next('div').text.strip()
-                        
-                        break
-                except:
-                    continue
+            response = self._find_profile('bloomberg', "https://www.bloomberg.com/profile/{slug}", company_name)
+            if response is None:
+                return
+            
+            # Revenue and industry sit in the div after their label
+            values = self._parse(response, labelled_values, 'div', ['Revenue', 'Industry'])
+            
+            if values['Revenue'] is not None:
+                company_data.revenue = values['Revenue']
+            
+            if values['Industry'] is not None:
+                company_data.industry = values['Industry']
                     
         except Exception as e:
             logger.warning(f"Error in Bloomberg search: {str(e)}")
+            metrics.record_error(e)
 
-    def _get_website_info(self, company_data):
+    def _get_website_info(self, company_data, deadline=None):
         try:
-            response = self.scraper.get(company_data["website"], headers=self.headers)
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Extract technologies used
-            self._extract_technologies(soup, company_data)
+            website = company_data.website
+            base_url = website.rstrip('/')
             
-            # Look for contact information on various pages
+            # Request the homepage and the contact pages together; each page is
+            # processed as soon as it arrives
             contact_pages = ['contact', 'about', 'team', 'leadership']
-            base_url = company_data["website"].rstrip('/')
-            
+            futures = {self.submit(website): (website, None)}
             for page in contact_pages:
-                try:
-                    page_url = f"{base_url}/{page}"
-                    response = self.scraper.get(page_url, headers=self.headers)
-                    if response.status_code == 200:
-                        page_soup = BeautifulSoup(response.text, 'lxml')
-                        self._extract_contacts(page_soup, company_data)
-                except:
-                    continue
-            
-            # Extract from main page as well
-            self._extract_contacts(soup, company_data)
+                page_url = f"{base_url}/{page}"
+                futures[self.submit(page_url)] = (page_url, page)
+            
+            # The crawl also has to fit in what's left of the lookup's latency budget
+            if deadline is None or deadline > self.CONTACT_CRAWL_DEADLINE:
+                deadline = self.CONTACT_CRAWL_DEADLINE
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    page_url, page = futures[future]
+                    try:
+                        response = self._resolve(page_url, future)
+                    except CancelledError:
+                        # The lookup gave up on the crawl; keep what arrived
+                        return
+                    except Exception as e:
+                        logger.warning(f"Error fetching {page_url}: {str(e)}")
+                        metrics.record_error(e)
+                        continue
+                    
+                    if page is None:
+                        # Homepage: technologies and contacts
+                        technologies, contacts = self._parse(response, homepage, response.headers)
+                        company_data.technologies = technologies
+                        self._add_contacts(contacts, company_data)
+                    elif response.status_code == 200:
+                        self._add_contacts(self._parse(response, page_contacts), company_data)
+            except FuturesTimeoutError:
+                # Keep whatever arrived before the deadline and drop the rest
+                pending = [f for f in futures if not f.done()]
+                logger.info(f"Website crawl for {website} hit the deadline with {len(pending)} pages pending")
+                for future in pending:
+                    future.cancel()
             
         except Exception as e:
             logger.warning(f"Error getting website info: {str(e)}")
+            metrics.record_error(e)
 
-    def _extract_contacts(self, soup, company_data):
-        # Find email addresses
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        phone_pattern = r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        
-        text_content = soup.get_text()
-        
-        # Find emails
-        emails = re.findall(email_pattern, text_content)
-        emails = [email for email in emails if not any(c.get('email') == email for c in company_data['contacts'])]
-        
-        # Find phone numbers
-        phones = re.findall(phone_pattern, text_content)
-        phones = [phone for phone in phones if not any(c.get('phone') == phone for c in company_data['contacts'])]
-        
-        # Look for contact names and titles
-        name_patterns = [
-            r'([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)\s*[-–]\s*((?:CEO|CTO|CFO|Founder|Director|Manager|Head\s+of\s+[A-Za-z]+|VP\s+of\s+[A-Za-z]+))',
-            r'((?:CEO|CTO|CFO|Founder|Director|Manager|Head\s+of\s+[A-Za-z]+|VP\s+of\s+[A-Za-z]+))\s*[-:]\s*([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)',
-        ]
-        
-        for pattern in name_patterns:
-            matches = re.finditer(pattern, text_content)
-            for match in matches:
-                name, title = match.groups() if pattern.startswith('([A-Z]') else match.groups()[::-1]
-                if not any(c.get('name') == name for c in company_data['contacts']):
-                    company_data['contacts'].append({
-                        'name': name.strip(),
-                        'title': title.strip(),
-                        'email': None,
-                        'phone': None
-                    })
-        
-        # Add standalone emails and phones
-        for email in emails:
-            company_data['contacts'].append({
-                'name': None,
-                'title': None,
-                'email': email,
-                'phone': None
-            })
-        
-        for phone in phones:
-            company_data['contacts'].append({
-                'name': None,
-                'title': None,
-                'email': None,
-                'phone': phone
-            })
-
-    def _extract_technologies(self, soup, company_data):
-        tech_patterns = {
-            'Frontend': [
-                'React', 'Angular', 'Vue.js', 'Next.js', 'Nuxt.js',
-                'jQuery', 'Bootstrap', 'Tailwind'
-            ],
-            'Backend': [
-                'Node.js', 'Python', 'Java', 'PHP', 'Ruby', 'Go',
-                'Django', 'Flask', 'Spring', 'Laravel'
-            ],
-            'Database': [
-                'MySQL', 'PostgreSQL', 'MongoDB', 'Redis', 'Elasticsearch',
-                'Oracle', 'SQL Server'
-            ],
-            'Cloud': [
-                'AWS', 'Azure', 'Google Cloud', 'Heroku', 'DigitalOcean',
-                'Cloudflare'
-            ],
-            'Analytics': [
-                'Google Analytics', 'Mixpanel', 'Amplitude', 'Segment',
-                'Hotjar'
-            ]
-        }
-        
-        found_tech = {category: [] for category in tech_patterns}
-        page_source = str(soup).lower()
-        
-        for category, technologies in tech_patterns.items():
-            for tech in technologies:
-                if tech.lower() in page_source:
-                    found_tech[category].append(tech)
-        
-        company_data['technologies'] = {k: v for k, v in found_tech.items() if v}
+    def _offline(self):
+        # Replays mustn't reach the network, and DNS doesn't go through the archive
+        return self.engine.replay is not None and self.engine.replay.replaying
 
-    def _clean_company_data(self, data):
-        # Remove duplicate contacts
-        if data['contacts']:
-            unique_contacts = []
-            seen = set()
-            
-            for contact in data['contacts']:
-                key = json.dumps({k: v for k, v in contact.items() if v is not None}, sort_keys=True)
-                if key not in seen:
-                    seen.add(key)
-                    unique_contacts.append(contact)
+    def _lookup_domain(self, company_data, deadline=None):
+        try:
+            if self._offline():
+                return
+            if deadline is None or deadline > self.DOMAIN_LOOKUP_DEADLINE:
+                deadline = self.DOMAIN_LOOKUP_DEADLINE
+            end = time.monotonic() + deadline
+            
+            domain = website_domain(company_data.website)
+            verified = domain is not None
+            if verified and shared_host(domain):
+                # A profile page on a shared site; its domain isn't the company's
+                return
+            if domain is None:
+                # A guessed domain has to have both an address and a mail server
+                labels = [slug for slug in slug_candidates(company_data.name) if HOSTNAME_LABEL.fullmatch(slug)]
+                domain = self.domains.first_live([f"{label}.{tld}" for tld in GUESS_TLDS for label in labels], deadline)
+                if domain is None:
+                    return
+                company_data.website = f"https://{domain}"
+            
+            # The WHOIS date is only worth having for a website a source found,
+            # and even then dates the domain, not the company, so it stays out of founded
+            facts = self.domains.facts(domain, max(end - time.monotonic(), 0), whois=verified)
+            facts['verified'] = verified
+            company_data.domain_info = facts
             
-            data['contacts'] = unique_contacts
+        except Exception as e:
+            logger.warning(f"Error looking up domain: {str(e)}")
+            metrics.record_error(e)
+
+    def _verify_emails(self, company_data, deadline):
+        # Marks each contact email by whether its domain accepts mail; the
+        # company's own domain is usually cached from the domain stage
+        try:
+            contacts = [contact for contact in company_data.contacts if contact.email]
+            if not contacts or deadline <= 0 or self._offline():
+                return
+            domains = {contact.email.rsplit('@', 1)[-1] for contact in contacts}
+            accepts = self.domains.accepts_mail(domains, deadline)
+            for contact in contacts:
+                contact.email_verified = accepts.get(contact.email.rsplit('@', 1)[-1])
+        except Exception as e:
+            logger.warning(f"Error verifying email domains: {str(e)}")
+            metrics.record_error(e)
+
+    def _add_contacts(self, extracted, company_data):
+        # Emails, phones and name/title pairs from one scan of a page; the
+        # contact store dedupes them and pairs names with matching emails
+        emails, phones, people = extracted
+        contacts = company_data.contacts
         
-        # Clean up social profiles
-        if data['social_profiles']:
-            cleaned_profiles = {}
-            for domain, url in data['social_profiles'].items():
-                platform = next((name for name in ['linkedin', 'facebook', 'twitter'] if name in domain), domain)
-                cleaned_profiles[platform] = url
-            data['social_profiles'] = cleaned_profiles
+        for name, title in people:
+            contacts.add(name=name, title=title.strip())
         
-        # Ensure all fields have at least None value
-        required_fields = [
-            'name', 'website', 'description', 'industry', 'company_size',
-            'revenue', 'headquarters', 'founded', 'contacts', 'social_profiles',
-            'social_data', 'technologies'
-        ]
+        for email in emails:
+            contacts.add(email=email)
         
-        for field in required_fields:
-            if field not in data:
-                data[field] = [] if field in ['contacts', 'technologies'] else None
+        for phone in phones:
+            contacts.add(phone=phone)
 
     def _search_social_media(self, company_name, company_data):
         try:
@@ -411,137 +559,211 @@ class CompanyDataScraper:
                 'instagram': 'instagram.com',
             }
             
-            for platform, domain in platforms.items():
+            # Query all platforms at once rather than one after another
+            responses = self.fetch_many([
+                f"https://www.google.com/search?q=site:{domain}+{quote(company_name)}+official"
+                for domain in platforms.values()
+            ])
+            
+            for platform, response in zip(platforms, responses):
                 try:
-                    search_url = f"https://www.google.com/search?q=site:{domain}+{quote(company_name)}+official"
-                    response = self.scraper.get(search_url, headers=self.headers)
-                    soup = BeautifulSoup(response.text, 'lxml')
-                    
-                    for result in soup.select('.g')[:2]:  # Look at top 2 results
-                        link = result.select_one('a')
-                        if not link:
+                    if response is None:
+                        continue
+                    for result in self._parse(response, serp_results, 2):  # Look at top 2 results
+                        if result['href'] is None:
                             continue
                             
-                        url = link.get('href', '')
+                        url = result['href']
                         if not url.startswith('http'):
                             continue
                             
                         # Get social media stats if available
-                        desc = result.select_one('.VwiC3b')
-                        if desc:
-                            text = desc.text.lower()
-                            followers = None
-                            
-                            # Try to extract follower count
-                            follower_patterns = [
-                                r'([\d,.]+\s*(?:k|m|b)?)\s*(?:followers|fans|likes)',
-                                r'(?:followed by|following)\s*([\d,.]+\s*(?:k|m|b)?)',
-                            ]
+                        if result['snippet'] is not None:
+                            text = result['snippet'].lower()
+                            followers = SOCIAL_DETAILS.extract(text).get('followers')
                             
-                            for pattern in follower_patterns:
-                                match = re.search(pattern, text, re.IGNORECASE)
-                                if match:
-                                    followers = match.group(1)
-                                    break
-                            
-                            company_data["social_data"][platform] = {
-                                "url": url,
-                                "followers": followers,
-                                "description": text
-                            }
-                            
-                            company_data["social_profiles"][platform] = url
+                            company_data.add_profile(platform, url, followers=followers, description=text)
                         break
                         
                 except Exception as e:
                     logger.warning(f"Error searching {platform}: {str(e)}")
+                    metrics.record_error(e)
                     
         except Exception as e:
             logger.warning(f"Error in social media search: {str(e)}")
+            metrics.record_error(e)
 
     def _search_linkedin_data(self, company_name, company_data):
         try:
             # Search for LinkedIn company page
             search_url = f"https://www.google.com/search?q=site:linkedin.com/company/+{quote(company_name)}+about"
-            response = self.scraper.get(search_url, headers=self.headers)
-            soup = BeautifulSoup(response.text, 'lxml')
+            try:
+                response = self.fetch(search_url)
+            except CancelledError:
+                return
             
             linkedin_data = {}
             
-            for result in soup.select('.g')[:2]:
-                link = result.select_one('a')
-                desc = result.select_one('.VwiC3b')
-                
-                if not link or not desc:
+            for result in self._parse(response, serp_results, 2):
+                if result['href'] is None or result['snippet'] is None:
                     continue
                     
-                url = link.get('href', '')
+                url = result['href']
                 if not url.startswith('http') or 'linkedin.com/company/' not in url:
                     continue
                 
-                text = desc.text.lower()
+                text = result['snippet'].lower()
                 
-                # Try to extract employee count
-                employee_patterns = [
-                    r'([\d,]+(?:\+)?)\s*employees',
-                    r'([\d,.]+k?\+?)\s*employees',
-                ]
-                
-                for pattern in employee_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        linkedin_data["employees"] = match.group(1)
-                        break
+                # Employees, location, specialties and company type in one scan
+                details = LINKEDIN_DETAILS.extract(text)
                 
-                # Try to extract location
-                location_patterns = [
-                    r'(?:headquarters|located in|based in)\s*([^\.]+)',
-                    r'(?:from|in)\s*((?:[A-Z][a-z]+(?:\s*,\s*)?)+)',
-                ]
+                for field in ('employees', 'location', 'company_type'):
+                    if field in details:
+                        linkedin_data[field] = details[field]
                 
-                for pattern in location_patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        linkedin_data["location"] = match.group(1).strip()
-                        break
-                
-                # Try to extract specialties
-                specialty_patterns = [
-                    r'specialties?:?\s*([^\.]+)',
-                    r'specializing in\s*([^\.]+)',
-                ]
-                
-                for pattern in specialty_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        linkedin_data["specialties"] = [
-                            s.strip() for s in match.group(1).split(',')
-                        ]
-                        break
+                if 'specialties' in details:
+                    linkedin_data["specialties"] = [
+                        s.strip() for s in details['specialties'].split(',')
+                    ]
                 
-                # Try to get company type
-                type_patterns = [
-                    r'(?:is\s+)?(?:a|an)\s+([^,\.]+(?:company|corporation|manufacturer|producer|provider))',
-                    r'type:?\s*([^\.]+)',
-                ]
-                
-                for pattern in type_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        linkedin_data["company_type"] = match.group(1).strip()
-                        break
-                
-                company_data["social_data"]["linkedin"] = linkedin_data
-                company_data["social_profiles"]["linkedin"] = url
+                company_data.add_profile('linkedin', url, **linkedin_data)
                 break
                 
         except Exception as e:
             logger.warning(f"Error in LinkedIn data search: {str(e)}")
+            metrics.record_error(e)
+
+# Bulk enrichment jobs, persisted so they resume after a restart. The workers
+# start with the app, however it's served, so interrupted jobs carry on
+# without waiting for a /jobs request.
+JOB_RUNNER = JobRunner(JobStore(), lambda name: CompanyDataScraper().search_company(name).to_dict())
+JOB_RUNNER.start()
+
+
+@app.before_request
+def start_job_runner():
+    # A no-op once running; starts a worker process's own runner when a
+    # preloading server forked it from the process that imported the app
+    JOB_RUNNER.start()
+
+# State owned by other modules, sampled whenever /metrics is scraped
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_rate_limit_rps', 'Current request rate allowed per host.', ('host',),
+    lambda: {(host,): bucket['rate'] for host, bucket in RATE_LIMITER.snapshot().items()}))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_rate_limit_throttled_total', 'Throttling responses (429/503) per host.', ('host',),
+    lambda: {(host,): bucket['throttled'] for host, bucket in RATE_LIMITER.snapshot().items()}, kind='counter'))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_http_cache_events_total', 'Response cache lookups and writes by outcome.', ('event',),
+    lambda: {(event,): value for event, value in get_cache().stats.items()}, kind='counter'))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_result_memo_events_total', 'Company result memo lookups by outcome.', ('event',),
+    lambda: {(event,): value for event, value in RESULT_MEMO.stats.items()}, kind='counter'))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_session_pool_events_total', 'Cloudscraper session pool activity.', ('event',),
+    lambda: {(event,): value for event, value in get_session_pool().stats.items()}, kind='counter'))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_slug_cache_events_total', 'Profile slug cache lookups by outcome.', ('event',),
+    lambda: {(event,): value for event, value in get_slug_cache().stats.items()}, kind='counter'))
+metrics.REGISTRY.register(metrics.Sampled(
+    'scraper_dns_cache_events_total', 'DNS resolver cache lookups, queries sent and failures.', ('event',),
+    lambda: {(event,): value for event, value in get_domain_lookup().resolver.stats.items()}, kind='counter'))
+
+def _debug_enabled(data):
+    return str(request.args.get('debug', data.get('debug', ''))).lower() in ('1', 'true')
+
+def _enrich(scraper, company_name, debug=False):
+    # With debug on, the record carries a trace of its stages, fetches and parse time
+    with metrics.tracing(debug) as trace:
+        result = scraper.search_company(company_name).to_dict()
+        if trace is not None:
+            result['_trace'] = trace.to_dict()
+        return result
+
+def _stream_format(data):
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'text/event-stream'
+    if 'application/x-ndjson' in accept or str(request.args.get('stream', data.get('stream', ''))).lower() in ('1', 'true'):
+        return 'application/x-ndjson'
+    return None
+
+def _stream_companies(scraper, company_names, stream_format, debug=False):
+    futures = {COMPANY_EXECUTOR.submit(_enrich, scraper, name, debug): name for name in company_names}
+    
+    for future in as_completed(futures):
+        try:
+            record = future.result()
+            if not record:
+                continue
+        except Exception as e:
+            logger.warning(f"Error enriching {futures[future]}: {str(e)}")
+            record = {'company_name': futures[future], 'error': str(e)}
+        
+        payload = dumps(record)
+        yield f"data: {payload}\n\n" if stream_format == 'text/event-stream' else f"{payload}\n"
+    
+    if stream_format == 'text/event-stream':
+        yield "event: done\ndata: {}\n\n"
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(get_cache().snapshot())
+
+@app.route('/rate-limits')
+def rate_limits():
+    return jsonify(RATE_LIMITER.snapshot())
+
+@app.route('/sessions/stats')
+def session_stats():
+    return jsonify(get_session_pool().snapshot())
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    upload = request.files.get('file')
+    if upload:
+        company_names = parse_company_names(csv_text=upload.read().decode('utf-8-sig', errors='replace'))
+    else:
+        data = request.get_json(silent=True) or {}
+        company_names = parse_company_names(data.get('company_names', []))
+    
+    if not company_names:
+        return jsonify({'error': 'Provide company_names as a JSON list or upload a CSV file'}), 400
+    if len(company_names) > MAX_JOB_SIZE:
+        return jsonify({'error': f'A job can hold at most {MAX_JOB_SIZE} companies'}), 400
+    
+    job_id = JOB_RUNNER.submit(company_names)
+    return jsonify(JOB_RUNNER.store.progress(job_id)), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    progress = JOB_RUNNER.store.progress(job_id)
+    if progress is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Preview of the finished records so pollers see partial results; the
+    # full set is paged through /jobs/<id>/results
+    progress['results'], _ = JOB_RUNNER.store.results(job_id, limit=10)
+    return jsonify(progress)
+
+@app.route('/jobs/<job_id>/results')
+def job_results(job_id):
+    if JOB_RUNNER.store.progress(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 100, type=int), 1), 1000)
+    items, total = JOB_RUNNER.store.results(job_id, offset=(page - 1) * per_page, limit=per_page)
+    return jsonify({'page': page, 'per_page': per_page, 'total': total, 'results': items})
+
 @app.route('/scrape', methods=['POST'])
 def scrape():
     try:
@@ -549,10 +771,11 @@ def scrape():
         company_name = data.get('company_name')
         filters = data.get('filters', {})
         scraper = CompanyDataScraper()
+        debug = _debug_enabled(data)
         
         # If company name is provided, search directly
         if company_name:
-            result = scraper.search_company(company_name)
+            result = _enrich(scraper, company_name, debug)
             if result:
                 return jsonify(result)
             return jsonify({"error": "Company not found"}), 404
@@ -586,19 +809,17 @@ def scrape():
             return jsonify({'error': 'Please enter a company name or set search filters'}), 400
         
         # Search for companies
-        companies = []
+        company_names = []
         search_query = ' '.join(search_terms)
         search_url = f"https://www.google.com/search?q={quote(search_query)}+companies"
-        response = scraper.scraper.get(search_url, headers=scraper.headers)
-        soup = BeautifulSoup(response.text, 'lxml')
+        response = scraper.fetch(search_url)
         
         # Extract company names from search results
-        for result in soup.select('.g')[:5]:  # Get top 5 results
-            title = result.select_one('h3')
-            if not title:
+        for result in scraper._parse(response, serp_results, 5):  # Get top 5 results
+            if result['title'] is None:
                 continue
                 
-            company_name = title.text.strip()
+            company_name = result['title'].strip()
             # Skip if it's not a company name
             if any(x in company_name.lower() for x in ['list of', 'top 10', 'best']):
                 continue
@@ -609,11 +830,19 @@ def scrape():
             company_name = re.sub(r'(?i)\s*inc\.?$', '', company_name)  # Remove Inc
             company_name = re.sub(r'(?i)\s*llc\.?$', '', company_name)  # Remove LLC
             company_name = company_name.strip()
-            
-            # Get company data
-            company_data = scraper.search_company(company_name)
-            if company_data:
-                companies.append(company_data)
+            company_names.append(company_name)
+        
+        # Stream each company as soon as it's enriched if the client asked for it
+        stream_format = _stream_format(data)
+        if stream_format:
+            return Response(
+                _stream_companies(scraper, company_names, stream_format, debug),
+                mimetype=stream_format,
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+            )
+        
+        # Get company data for all candidates concurrently, keeping result order
+        companies = [c for c in COMPANY_EXECUTOR.map(lambda name: _enrich(scraper, name, debug), company_names) if c]
         
         if not companies:
             return jsonify([])  # Return empty list if no matches
@@ -624,4 +853,5 @@ def scrape():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == "__main__":
+    get_session_pool().warm()
     app.run(debug=True, port=5000)
@@ -0,0 +1,242 @@
+import heapq
+import math
+import re
+import threading
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left
+
+# Field weights: a query word in the name counts three times one in the description
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'industry': 2.0,
+    'location': 1.5,
+    'description': 1.0,
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# The word being typed (the last one, unless the query ends in a space)
+# matches up to this many vocabulary words that start with it, the most common
+# ones, scored lower than an exact match. Words that only contain it are tried
+# when nothing starts with it.
+MAX_EXPANSIONS = 24
+PREFIX_FACTOR = 0.7
+INFIX_FACTOR = 0.4
+# Prefixes this short have their expansions precomputed
+SHORT_PREFIX = 3
+
+# Deepest result a query can page to
+MAX_RESULTS = 1000
+# Ranked results kept for repeated queries and page turns; the index never
+# changes, so they don't go stale
+CACHED_QUERIES = 4096
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class CompanyIndex:
+    """In-memory inverted index over company records, ranked with BM25.
+
+    Built once and read-only afterwards. Every posting stores its precomputed
+    BM25 contribution, and postings are kept in descending score order, so a
+    query reads only the top of each list it touches (Fagin's threshold
+    algorithm) rather than every matching company.
+    """
+
+    def __init__(self, companies, field_weights=FIELD_WEIGHTS):
+        self.companies = list(companies)
+        self.field_weights = field_weights
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._build()
+
+    def __len__(self):
+        return len(self.companies)
+
+    def _build(self):
+        vocab = {}
+        doc_tfs = []
+        lengths = []
+        for company in self.companies:
+            tfs = {}
+            length = 0.0
+            for field, weight in self.field_weights.items():
+                for token in tokenize(company.get(field)):
+                    tid = vocab.setdefault(token, len(vocab))
+                    tfs[tid] = tfs.get(tid, 0.0) + weight
+                    length += weight
+            doc_tfs.append(tfs)
+            lengths.append(length)
+
+        count = len(self.companies)
+        avg_length = (sum(lengths) / count) if count else 1.0
+        df = [0] * len(vocab)
+        for tfs in doc_tfs:
+            for tid in tfs:
+                df[tid] += 1
+        idf = [math.log(1 + (count - n + 0.5) / (n + 0.5)) for n in df]
+
+        postings = [[] for _ in vocab]
+        self._doc_terms = []
+        self._doc_impacts = []
+        for doc, (tfs, length) in enumerate(zip(doc_tfs, lengths)):
+            norm = K1 * (1 - B + B * length / avg_length)
+            tids = sorted(tfs)
+            impacts = array('f', (idf[tid] * tfs[tid] * (K1 + 1) / (tfs[tid] + norm) for tid in tids))
+            for tid, impact in zip(tids, impacts):
+                postings[tid].append((impact, doc))
+            self._doc_terms.append(array('I', tids))
+            self._doc_impacts.append(impacts)
+
+        self._posting_docs = []
+        self._posting_impacts = []
+        for entries in postings:
+            entries.sort(key=lambda entry: (-entry[0], entry[1]))
+            self._posting_docs.append(array('I', (doc for _, doc in entries)))
+            self._posting_impacts.append(array('f', (impact for impact, _ in entries)))
+
+        self._vocab = vocab
+        self._terms = [None] * len(vocab)
+        for term, tid in vocab.items():
+            self._terms[tid] = term
+        self._df = df
+        self._sorted_terms = sorted(vocab)
+        self._short_prefixes = {}
+        self._trigram_terms = {}
+        for term, tid in vocab.items():
+            for size in range(1, min(len(term), SHORT_PREFIX) + 1):
+                self._short_prefixes.setdefault(term[:size], []).append(tid)
+            for gram in _trigrams(term):
+                self._trigram_terms.setdefault(gram, []).append(tid)
+        for prefix, tids in self._short_prefixes.items():
+            self._short_prefixes[prefix] = heapq.nlargest(MAX_EXPANSIONS, tids, key=df.__getitem__)
+        for gram, tids in self._trigram_terms.items():
+            self._trigram_terms[gram] = frozenset(tids)
+
+    def _expand(self, token, typing=False):
+        # [(term id, factor)] the query word matches; finished words only fall
+        # back to prefix and infix matches when they aren't a word in the index
+        exact = self._vocab.get(token)
+        if exact is not None and not typing:
+            return [(exact, 1.0)]
+        if len(token) <= SHORT_PREFIX:
+            prefixed = self._short_prefixes.get(token, [])
+        else:
+            start = bisect_left(self._sorted_terms, token)
+            end = bisect_left(self._sorted_terms, token + '\uffff', start)
+            prefixed = heapq.nlargest(
+                MAX_EXPANSIONS, (self._vocab[term] for term in self._sorted_terms[start:end]), key=self._df.__getitem__
+            )
+        terms = [(tid, 1.0 if tid == exact else PREFIX_FACTOR) for tid in prefixed]
+        if exact is not None and exact not in prefixed:
+            terms.append((exact, 1.0))
+        if terms or len(token) < 3:
+            return terms
+
+        grams = sorted((self._trigram_terms.get(gram, frozenset()) for gram in _trigrams(token)), key=len)
+        candidates = set.intersection(set(grams[0]), *grams[1:]) if grams else set()
+        matches = [tid for tid in candidates if token in self._terms[tid]]
+        return [(tid, INFIX_FACTOR) for tid in heapq.nlargest(MAX_EXPANSIONS, matches, key=self._df.__getitem__)]
+
+    def _impact(self, doc, tid):
+        terms = self._doc_terms[doc]
+        i = bisect_left(terms, tid)
+        if i < len(terms) and terms[i] == tid:
+            return self._doc_impacts[doc][i]
+        return 0.0
+
+    def _score(self, doc, groups):
+        # Each query word contributes its best matching term
+        total = 0.0
+        for terms in groups:
+            best = 0.0
+            for tid, factor in terms:
+                impact = self._impact(doc, tid) * factor
+                if impact > best:
+                    best = impact
+            total += best
+        return total
+
+    def search(self, query, page=1, per_page=10):
+        """The companies on the given page of results for query, best match first."""
+        k = min(page * per_page, MAX_RESULTS)
+        offset = (page - 1) * per_page
+        if offset >= k:
+            return []
+        tokens = tuple(dict.fromkeys(tokenize(query)))
+        typing = bool(tokens) and not query[-1:].isspace()
+        key = (tokens, typing)
+        with self._cache_lock:
+            ranked = self._cache.get(key)
+            if ranked is not None:
+                self._cache.move_to_end(key)
+        if ranked is None or (len(ranked) < k and not ranked.complete):
+            ranked = self._rank(tokens, typing, k)
+            with self._cache_lock:
+                self._cache[key] = ranked
+                while len(self._cache) > CACHED_QUERIES:
+                    self._cache.popitem(last=False)
+        return [self.companies[doc] for doc in ranked[offset:k]]
+
+    def _rank(self, tokens, typing, k):
+        # The top k document ids for the query, best first
+        groups = []
+        for i, token in enumerate(tokens):
+            terms = self._expand(token, typing and i == len(tokens) - 1)
+            if terms:
+                groups.append(terms)
+        if not groups:
+            return _Ranked([], True)
+
+        # Walk every matching posting list one rank at a time; once the best
+        # score an unseen company could still reach can't beat the k-th
+        # result, nothing further down can make it in
+        lists = [(group, tid, factor) for group, terms in enumerate(groups) for tid, factor in terms]
+        top = []
+        seen = set()
+        depth = 0
+        while True:
+            bounds = [0.0] * len(groups)
+            active = False
+            for group, tid, factor in lists:
+                docs = self._posting_docs[tid]
+                if depth >= len(docs):
+                    continue
+                active = True
+                impact = self._posting_impacts[tid][depth] * factor
+                if impact > bounds[group]:
+                    bounds[group] = impact
+                doc = docs[depth]
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                entry = (self._score(doc, groups), -doc)
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            if not active or (len(top) >= k and top[0][0] >= sum(bounds)):
+                break
+            depth += 1
+
+        # Fewer than k matches means there's nothing more to find on later pages
+        return _Ranked([-doc for _, doc in sorted(top, reverse=True)], len(top) < k)
+
+
+class _Ranked(list):
+    """Ranked document ids; complete when they are every match, not just the top k."""
+
+    def __init__(self, docs, complete):
+        super().__init__(docs)
+        self.complete = complete
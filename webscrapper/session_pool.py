@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import cloudscraper
+from fake_useragent import UserAgent
+
+from replay import install
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 8
+# A session is retired after this many requests or this many seconds, so
+# cookies and fingerprints don't go stale, and after any Cloudflare failure
+MAX_REQUESTS_PER_SESSION = 200
+MAX_SESSION_AGE = 30 * 60
+
+BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+_user_agents = None
+_user_agents_lock = threading.Lock()
+
+
+def user_agents():
+    # Loading the UA database is the slow part of UserAgent(), do it once per process
+    global _user_agents
+    if _user_agents is None:
+        with _user_agents_lock:
+            if _user_agents is None:
+                _user_agents = UserAgent()
+    return _user_agents
+
+
+def random_headers():
+    return {'User-Agent': user_agents().random, **BASE_HEADERS}
+
+
+class ScraperSession:
+    """A cloudscraper session pinned to one User-Agent, so its Cloudflare clearance stays valid."""
+
+    def __init__(self):
+        self.headers = random_headers()
+        self.session = cloudscraper.create_scraper(browser={'custom': self.headers['User-Agent']}, delay=2)
+        self.session.headers.update(self.headers)
+        install(self.session)
+        self.created_at = time.monotonic()
+        self.requests = 0
+        self.failed = False
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        return self.session.get(url, **kwargs)
+
+    def mark_failed(self):
+        self.failed = True
+
+    @property
+    def healthy(self):
+        return (
+            not self.failed
+            and self.requests < MAX_REQUESTS_PER_SESSION
+            and time.monotonic() - self.created_at < MAX_SESSION_AGE
+        )
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception as e:
+            logger.warning(f"Error closing scraper session: {str(e)}")
+
+
+class SessionPool:
+    """Process-wide pool of warmed cloudscraper sessions, leased one caller at a time."""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.stats = {'created': 0, 'leases': 0, 'reused': 0, 'recycled': 0}
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def warm(self, count=None):
+        count = self.size if count is None else min(count, self.size)
+        user_agents()
+        with self._lock:
+            missing = count - len(self._idle)
+        sessions = [self._create() for _ in range(max(missing, 0))]
+        with self._lock:
+            self._idle.extend(sessions)
+
+    def _create(self):
+        session = ScraperSession()
+        with self._lock:
+            self.stats['created'] += 1
+        return session
+
+    @contextmanager
+    def lease(self):
+        session = None
+        with self._lock:
+            self.stats['leases'] += 1
+            # Health check on the way out: anything past its limits is dropped here
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.healthy:
+                    session = candidate
+                    self.stats['reused'] += 1
+                    break
+                self.stats['recycled'] += 1
+                candidate.close()
+        if session is None:
+            session = self._create()
+
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def _release(self, session):
+        with self._lock:
+            if session.healthy and len(self._idle) < self.size:
+                self._idle.append(session)
+                return
+            self.stats['recycled'] += 1
+        session.close()
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, 'idle': len(self._idle), 'size': self.size}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SessionPool()
+    return _pool
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_SLUG_CACHE_PATH = os.environ.get(
+    'SLUG_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'slugs.sqlite3'),
+)
+
+# Slugs that resolved are kept for a month; 404s are retried after a day in
+# case the profile gets created
+FOUND_TTL = 30 * 86400
+MISSING_TTL = 86400
+
+
+def slug_candidates(company_name):
+    # Profile URL variants in the order they're most often right, without repeats
+    # (a one-word name gives the same slug every way)
+    name = company_name.lower()
+    candidates = []
+    for separator in ('-', '', '_'):
+        slug = name.replace(' ', separator)
+        if slug not in candidates:
+            candidates.append(slug)
+    return candidates
+
+
+def _company_key(company_name):
+    return ' '.join(company_name.lower().split())
+
+
+class SlugCache:
+    """Which profile slug worked for a company on each source, and which slugs 404ed."""
+
+    def __init__(self, path=DEFAULT_SLUG_CACHE_PATH, found_ttl=FOUND_TTL, missing_ttl=MISSING_TTL):
+        self.found_ttl = found_ttl
+        self.missing_ttl = missing_ttl
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'skipped': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS found '
+            '(source TEXT NOT NULL, company TEXT NOT NULL, slug TEXT NOT NULL, expires_at REAL NOT NULL, '
+            'PRIMARY KEY (source, company))'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS missing '
+            '(source TEXT NOT NULL, slug TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (source, slug))'
+        )
+
+    def found(self, source, company_name):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT slug FROM found WHERE source = ? AND company = ? AND expires_at > ?',
+                (source, _company_key(company_name), time.time()),
+            ).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+
+    def unknown(self, source, slugs):
+        # The slugs that haven't 404ed recently, in their original order
+        with self._lock:
+            missing = {row[0] for row in self._conn.execute(
+                f"SELECT slug FROM missing WHERE source = ? AND expires_at > ? AND slug IN ({','.join('?' * len(slugs))})",
+                (source, time.time(), *slugs),
+            )}
+            self.stats['skipped'] += len(missing)
+        return [slug for slug in slugs if slug not in missing]
+
+    def remember(self, source, company_name, slug):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO found (source, company, slug, expires_at) VALUES (?, ?, ?, ?)',
+                (source, _company_key(company_name), slug, time.time() + self.found_ttl),
+            )
+
+    def forget(self, source, company_name):
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM found WHERE source = ? AND company = ?', (source, _company_key(company_name)),
+            )
+            self.stats['stale'] += 1
+
+    def mark_missing(self, source, slug):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO missing (source, slug, expires_at) VALUES (?, ?, ?)',
+                (source, slug, now + self.missing_ttl),
+            )
+            self._conn.execute('DELETE FROM missing WHERE expires_at <= ?', (now,))
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            found = self._conn.execute('SELECT COUNT(*) FROM found WHERE expires_at > ?', (now,)).fetchone()[0]
+            missing = self._conn.execute('SELECT COUNT(*) FROM missing WHERE expires_at > ?', (now,)).fetchone()[0]
+        return dict(self.stats, found=found, missing=missing)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_slug_cache = None
+_slug_cache_lock = threading.Lock()
+
+
+def get_slug_cache():
+    global _slug_cache
+    if _slug_cache is None:
+        with _slug_cache_lock:
+            if _slug_cache is None:
+                _slug_cache = SlugCache()
+    return _slug_cache
@@ -0,0 +1,123 @@
+import json
+import os
+from collections import deque
+
+SIGNATURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tech_signatures.json')
+
+
+class Automaton:
+    """Aho-Corasick matcher over bytes; scan time doesn't grow with the number of patterns."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        goto = [{}]
+        outputs = [set()]
+
+        # Trie of all patterns
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                nxt = goto[state].get(byte)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][byte] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(index)
+
+        # Fold the failure links into a full transition table (breadth first,
+        # so a state's failure target is always finished before the state)
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            for byte, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(byte, 0)
+                outputs[child] |= outputs[fail[child]]
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = {state: frozenset(out) for state, out in enumerate(outputs) if out}
+
+    def search(self, data):
+        found = set()
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for byte in data:
+            state = delta[state].get(byte, 0)
+            if state in outputs:
+                found |= outputs[state]
+        return found
+
+
+class TechFingerprinter:
+    def __init__(self, signatures):
+        self.signatures = signatures
+        self.categories = list(dict.fromkeys(sig['category'] for sig in signatures))
+
+        body_patterns, header_values, cookie_patterns = {}, {}, {}
+        self._header_present = {}
+        for index, sig in enumerate(signatures):
+            # html and script entries are plain markers in the page; meta
+            # entries are <meta name="generator"> values
+            for marker in sig.get('html', []) + sig.get('script', []):
+                body_patterns.setdefault(marker.lower().encode(), set()).add(index)
+            for generator in sig.get('meta', []):
+                marker = f'name="generator" content="{generator}'.lower().encode()
+                body_patterns.setdefault(marker, set()).add(index)
+            # A header value matches anywhere in that header (a WordPress Link
+            # header starts with the URL, the rel comes after it); an empty
+            # value only needs the header to be there
+            for name, value in sig.get('headers', {}).items():
+                if value:
+                    header_values.setdefault(name.lower(), {}).setdefault(value.lower().encode(), set()).add(index)
+                else:
+                    self._header_present.setdefault(name.lower(), set()).add(index)
+            # Cookies are "<name>=" anywhere in the headers (Set-Cookie, Cookie)
+            for cookie in sig.get('cookies', []):
+                cookie_patterns.setdefault(f"{cookie}=".lower().encode(), set()).add(index)
+
+        self._body = Automaton(body_patterns)
+        self._body_owners = list(body_patterns.values())
+        self._header_values = {
+            name: (Automaton(patterns), list(patterns.values())) for name, patterns in header_values.items()
+        }
+        self._cookies = Automaton(cookie_patterns)
+        self._cookie_owners = list(cookie_patterns.values())
+
+    @classmethod
+    def from_file(cls, path=SIGNATURES_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def fingerprint(self, body, headers=None):
+        matched = set()
+        for pattern in self._body.search(body.lower()):
+            matched |= self._body_owners[pattern]
+
+        if headers:
+            for name, value in headers.items():
+                name = name.lower()
+                matched |= self._header_present.get(name, set())
+                if name in self._header_values:
+                    automaton, owners = self._header_values[name]
+                    for pattern in automaton.search(str(value).lower().encode()):
+                        matched |= owners[pattern]
+            blob = ''.join(f"\n{name}: {value}" for name, value in headers.items()).lower().encode()
+            for pattern in self._cookies.search(blob):
+                matched |= self._cookie_owners[pattern]
+
+        found = {category: [] for category in self.categories}
+        for index in sorted(matched):
+            sig = self.signatures[index]
+            found[sig['category']].append(sig['name'])
+        return {category: names for category, names in found.items() if names}
+
+
+FINGERPRINTER = TechFingerprinter.from_file()
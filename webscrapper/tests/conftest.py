@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# The app's modules are imported by name from the webscrapper directory, as
+# scraper.py and the benchmarks do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# python/scrap.py, the lead crawler
+sys.path.insert(0, os.path.join(os.path.dirname(ROOT), 'python'))
+
+# Keep the stores and caches the modules open at import time out of .cache/
+_CACHE = tempfile.mkdtemp(prefix='webscrapper-tests-')
+for _name, _file in (('SLUG_CACHE_PATH', 'slugs.sqlite3'), ('COMPANY_STORE_PATH', 'companies.sqlite3'),
+                     ('HTTP_CACHE_PATH', 'http_cache.sqlite3'), ('JOBS_DB_PATH', 'jobs.sqlite3')):
+    os.environ.setdefault(_name, os.path.join(_CACHE, _file))
@@ -0,0 +1,89 @@
+import csv
+import datetime
+import gzip
+import os
+
+import pytest
+
+from columnar_export import COMPANY_COLUMNS, PartitionedWriter, company_row, export_companies
+from company_store import CompanyStore
+
+COLUMNS = (('name', 'string'), ('count', 'int'), ('updated_at', 'timestamp'))
+
+
+def _rows(days, per_day):
+    for day in days:
+        for i in range(per_day):
+            yield {'name': f"company {day}-{i}", 'count': i,
+                   'updated_at': datetime.datetime(2024, 5, day, 12, tzinfo=datetime.timezone.utc)}
+
+
+def _read_csv_gz(root):
+    rows = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith('.csv.gz'):
+                with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8', newline='') as f:
+                    rows.extend((os.path.basename(directory), row) for row in csv.DictReader(f))
+    return rows
+
+
+def test_csv_gz_partitions_by_day_and_appends_members(tmp_path):
+    with PartitionedWriter(str(tmp_path), COLUMNS, 'updated_at', 'csv.gz', buffer_rows=3) as writer:
+        writer.write_many(_rows([1, 2], 4))
+
+    rows = _read_csv_gz(tmp_path)
+    assert writer.rows_written == 8
+    assert sorted({partition for partition, _ in rows}) == ['dt=2024-05-01', 'dt=2024-05-02']
+    # Several flushes into one part file still read back with a single header
+    assert len(rows) == 8
+    assert all(row['updated_at'].startswith('2024-05-0') for _, row in rows)
+
+
+def test_parquet_round_trips_through_hive_readers(tmp_path):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    with PartitionedWriter(str(tmp_path), COLUMNS, 'updated_at', 'parquet', buffer_rows=3) as writer:
+        writer.write_many(_rows([1, 2], 4))
+
+    table = pq.read_table(str(tmp_path))
+    assert table.num_rows == 8
+    assert table.schema.field('updated_at').type == pyarrow.timestamp('us', tz='UTC')
+    dataset = ds.dataset(str(tmp_path), format='parquet', partitioning='hive')
+    days = dataset.to_table(columns=['dt']).column('dt').to_pylist()
+    assert sorted(set(days)) == ['2024-05-01', '2024-05-02']
+
+
+def test_export_companies_writes_only_changes(tmp_path):
+    store = CompanyStore(':memory:')
+    root = str(tmp_path / 'companies')
+    try:
+        store.upsert({'name': 'Acme', 'website': 'https://acme.com', 'industry': 'Software'})
+        store.upsert({'name': 'Globex', 'website': 'https://globex.com'})
+        assert export_companies(store, root, 'csv.gz') == 2
+        assert export_companies(store, root, 'csv.gz') == 0
+
+        store.upsert({'name': 'Acme', 'website': 'https://acme.com', 'revenue': '$5M'})
+        assert export_companies(store, root, 'csv.gz') == 1
+    finally:
+        store.close()
+
+    rows = [row for _, row in _read_csv_gz(root)]
+    assert [row['domain'] for row in rows].count('acme.com') == 2
+    assert set(rows[0]) == {name for name, _ in COMPANY_COLUMNS}
+
+
+def test_company_row_flattens_scraper_records():
+    row = company_row({
+        'name': 'Acme', 'website': 'https://www.acme.com',
+        'contacts': [{'email': 'jane@acme.com'}, {'phone': '+15125550100'}],
+        'social_profiles': {'linkedin': 'https://linkedin.com/company/acme'},
+        'technologies': {'Frontend': ['React'], 'Analytics': ['Google Analytics']},
+    }, updated_at=0)
+    assert row['domain'] == 'acme.com'
+    assert row['emails'] == 'jane@acme.com'
+    assert row['contact_count'] == 2
+    assert row['technologies'] == 'React; Google Analytics'
+    assert row['updated_at'] is None
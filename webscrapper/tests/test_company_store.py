@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from company_store import CompanyStore, company_key, shared_host
+
+SAMPLE_COMPANIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_companies.json')
+
+
+@pytest.fixture
+def store():
+    store = CompanyStore(':memory:')
+    store.upsert_many([
+        {'name': 'Acme Robotics', 'website': 'https://www.acme.com', 'industry': 'Robotics',
+         'location': 'Austin, Texas', 'description': 'Warehouse robots'},
+        {'name': 'Globex', 'website': 'globex.com', 'industry': 'Software', 'location': 'New York, New York'},
+        {'name': 'Initech', 'website': 'N/A', 'industry': 'Software', 'location': 'Austin, Texas'},
+    ])
+    yield store
+    store.close()
+
+
+def test_company_key():
+    assert company_key({'website': 'https://www.Acme.com/about'}) == 'acme.com'
+    assert company_key({'name': 'Initech  Corp', 'website': 'N/A'}) == 'name:initech corp'
+    # Pages on shared sites don't identify a company
+    assert company_key({'name': 'Acme', 'website': 'https://en.wikipedia.org/wiki/Acme'}) == 'name:acme'
+    assert company_key({'company_name': 'Globex', 'website': 'linkedin.com/company/globex'}) == 'name:globex'
+
+
+def test_companies_on_shared_hosts_stay_apart(store):
+    store.upsert({'name': 'Umbrella', 'website': 'https://en.wikipedia.org/wiki/Umbrella'})
+    store.upsert({'name': 'Hooli', 'website': 'https://en.wikipedia.org/wiki/Hooli'})
+    assert len(store) == 5
+
+
+def test_upsert_fills_without_erasing(store):
+    store.upsert({'name': 'Acme Robotics', 'website': 'acme.com', 'revenue': '$5M', 'industry': None})
+    acme = store.get('https://acme.com')
+    assert acme['revenue'] == '$5M'
+    assert acme['industry'] == 'Robotics'
+    assert len(store) == 3
+
+
+def test_search_matches_every_word_with_prefix(store):
+    assert [c['name'] for c in store.search('acme robo')] == ['Acme Robotics']
+    assert store.search('acme software') == []
+    assert {c['name'] for c in store.search('software')} == {'Globex', 'Initech'}
+
+
+def test_indexed_lookups(store):
+    assert [c['name'] for c in store.by_industry('software')] == ['Globex', 'Initech']
+    assert [c['name'] for c in store.by_location('austin')] == ['Acme Robotics', 'Initech']
+
+
+def test_changed_since_pages_past_the_watermark(store):
+    changes = list(store.changed_since(batch_size=2))
+    assert len(changes) == 3
+    latest = changes[-1][0]
+    assert list(store.changed_since(latest)) == []
+
+
+def test_google_and_apple_are_found_by_domain():
+    store = CompanyStore(':memory:')
+    with open(SAMPLE_COMPANIES, encoding='utf-8') as f:
+        store.upsert_many(json.load(f))
+    assert store.get('google.com')['name'] == 'Google'
+    assert store.get('https://www.apple.com')['name'] == 'Apple'
+    assert company_key({'name': 'Acme', 'website': 'https://sites.google.com/view/acme'}) == 'name:acme'
+    assert shared_host('apps.apple.com') and not shared_host('google.com')
+    store.close()
@@ -0,0 +1,44 @@
+from contact_store import ContactStore, normalize_phone
+
+
+def test_normalize_phone_to_e164():
+    assert normalize_phone('(415) 555-0100') == '+14155550100'
+    assert normalize_phone('1 415 555 0100') == '+14155550100'
+    assert normalize_phone('+44 20 7946 0958') == '+442079460958'
+    assert normalize_phone('555-0100') is None
+
+
+def test_duplicates_merge_by_email_and_phone():
+    store = ContactStore()
+    store.add(email='Info@Acme.example', source='website')
+    store.add(email='info@acme.example ', phone='415-555-0100')
+    store.add(phone='+1 (415) 555-0100', title='Front desk')
+    assert store.to_list() == [{
+        'name': None, 'title': 'Front desk', 'email': 'info@acme.example', 'phone': '+14155550100',
+        'source': 'website', 'confidence': None, 'email_verified': None, 'phone_normalized': True,
+    }]
+
+
+def test_names_pair_with_their_mailbox():
+    store = ContactStore()
+    store.add(name='Jane  Doe', title='CEO')
+    store.add(email='jane.doe@acme.example')
+    store.add(email='jdoe@other.example', name='John Smith')
+    contacts = store.to_list()
+    assert len(contacts) == 2
+    assert (contacts[0]['name'], contacts[0]['email']) == ('Jane Doe', 'jane.doe@acme.example')
+
+
+def test_empty_contacts_are_ignored():
+    store = ContactStore()
+    assert store.add(name='  ', email='') is None
+    assert len(store) == 0
+
+
+def test_numbers_that_arent_e164_are_kept_as_found():
+    store = ContactStore()
+    contact = store.add(phone='555-0100 ext. 12')
+    assert (contact.phone, contact.phone_normalized) == ('555-0100 ext. 12', False)
+    assert store.add(phone='555 0100 x12') is contact
+    assert len(store) == 1
+    assert store.add(email='info@acme.example').phone_normalized is None
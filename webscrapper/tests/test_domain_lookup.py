@@ -0,0 +1,48 @@
+import asyncio
+import os
+import sys
+
+from domain_lookup import DnsResolver, encode_query, parse_query, website_domain
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from stub_dns import start  # noqa: E402
+
+ZONE = {'acme.example': {'A': ['192.0.2.1'], 'MX': [[20, 'mx2.acme.example'], [10, 'mx1.acme.example']],
+                         'NS': ['ns1.acme.example'], 'ttl': 300}}
+
+
+def test_website_domain():
+    assert website_domain('https://www.Acme.example/about') == 'acme.example'
+    assert website_domain('acme.example') == 'acme.example'
+    assert website_domain('') is None
+
+
+def test_queries_round_trip():
+    qid, name, qtype, _ = parse_query(encode_query(7, 'acme.example', 'MX'))
+    assert (qid, name, qtype) == (7, 'acme.example', 'MX')
+
+
+def test_resolves_against_a_stub_server_and_caches():
+    async def run():
+        transport, server, address = await start(ZONE)
+        try:
+            resolver = DnsResolver(servers=[address], timeout=1)
+            questions = [('acme.example', 'A'), ('acme.example', 'MX'), ('missing.example', 'A')]
+            first = await resolver.resolve_many(questions)
+            queries = server.queries
+            second = await resolver.resolve_many(questions)
+            return first, second, queries, server.queries
+        finally:
+            transport.close()
+
+    first, second, queries, queries_after = asyncio.run(run())
+    assert first == {
+        ('acme.example', 'A'): ('192.0.2.1',),
+        # Exchanges in preference order
+        ('acme.example', 'MX'): ('mx1.acme.example', 'mx2.acme.example'),
+        # NXDOMAIN is an answer with no records, and is cached too
+        ('missing.example', 'A'): (),
+    }
+    assert second == first
+    assert queries == queries_after == 3
@@ -0,0 +1,78 @@
+import contextlib
+from concurrent.futures import Future
+
+import pytest
+import requests
+
+import scraper as scraper_module
+from fetch_engine import FetchResponse
+from rate_limiter import RateLimiter
+from replay import Archive, ReplayInterceptor, install
+
+from http_server import LocalServer
+
+HTML = {'Content-Type': 'text/html; charset=utf-8'}
+PAGE = b'<html><body>' + b'x' * 200000 + b'</body></html>'
+
+
+@pytest.fixture
+def server():
+    with LocalServer({
+        '/page': (200, HTML, PAGE),
+        '/small': (200, HTML, b'<html>ok</html>'),
+        '/report.pdf': (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.4' * 1000),
+    }) as server:
+        yield server
+
+
+def test_full_body_stays_readable(server):
+    response = requests.get(server.url('/small'), stream=True)
+    fetched = FetchResponse.from_requests(response)
+    assert fetched.content == b'<html>ok</html>' and fetched.limited is None
+    assert fetched.encoding == 'utf-8'
+    assert response.content == b'<html>ok</html>'
+
+
+def test_body_is_cut_at_the_cap(server):
+    fetched = FetchResponse.from_requests(requests.get(server.url('/page'), stream=True), max_bytes=1000)
+    assert len(fetched.content) == 1000
+    assert fetched.limited == 'truncated'
+
+
+def test_non_html_body_is_skipped(server):
+    fetched = FetchResponse.from_requests(requests.get(server.url('/report.pdf'), stream=True))
+    assert fetched.content == b'' and fetched.limited == 'not_html'
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_recording_session_hands_back_a_readable_response(server, tmp_path, stream):
+    archive = Archive(str(tmp_path / 'replay.sqlite3'))
+    session = install(requests.Session(), ReplayInterceptor(archive, 'record'))
+    response = session.get(server.url('/page'), stream=stream)
+    assert response.content == PAGE
+    assert archive.get(server.url('/page')).content == PAGE
+
+    replayed = install(requests.Session(), ReplayInterceptor(archive, 'replay')).get(server.url('/page'))
+    assert replayed.status_code == 200 and replayed.content == PAGE
+    archive.close()
+
+
+def test_challenge_fallback_reads_a_replayed_response(tmp_path, monkeypatch):
+    url = 'https://www.crunchbase.com/organization/acme'
+    archive = Archive(str(tmp_path / 'replay.sqlite3'))
+    archive.put(url, FetchResponse(url, 200, HTML, b'<html>acme</html>', 'utf-8'))
+    session = install(requests.Session(), ReplayInterceptor(archive, 'replay'))
+
+    class Pool:
+        @contextlib.contextmanager
+        def lease(self):
+            yield session
+
+    monkeypatch.setattr(scraper_module, 'RATE_LIMITER', RateLimiter())
+    scraper = scraper_module.CompanyDataScraper()
+    scraper.sessions = Pool()
+    challenge = Future()
+    challenge.set_result(FetchResponse(url, 403, {'server': 'cloudflare'}, b'Just a moment...'))
+    response = scraper._resolve(url, challenge)
+    assert response.status_code == 200 and response.content == b'<html>acme</html>'
+    archive.close()
@@ -0,0 +1,172 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import field_scheduler
+from field_scheduler import FieldScheduler
+from records import Company
+
+
+def _google_partial():
+    partial = Company('Acme')
+    partial.website = 'https://acme.com'
+    partial.description = 'Widgets'
+    partial.industry = 'Manufacturing'
+    partial.company_size = '51-200'
+    partial.revenue = '$10M'
+    partial.headquarters = 'Austin, Texas'
+    partial.founded = '2010'
+    return partial
+
+
+def test_profile_sources_are_satisfied_by_google():
+    scheduler = FieldScheduler(Company('Acme'))
+    assert scheduler.needed('crunchbase') and scheduler.needed('bloomberg')
+
+    scheduler.merge('google', _google_partial())
+    assert not scheduler.needed('crunchbase')
+    assert not scheduler.needed('bloomberg')
+    # Nobody else fills these
+    assert scheduler.needed('website') and scheduler.needed('linkedin')
+
+
+def test_values_below_the_bar_keep_a_source_needed():
+    scheduler = FieldScheduler(Company('Acme'))
+    partial = Company('Acme')
+    partial.industry, partial.company_size = 'Software', '11-50'
+    scheduler.merge('website', partial)
+    assert scheduler.needed('crunchbase')
+
+
+def test_a_more_trusted_source_still_replaces_merged_values():
+    record = Company('Acme')
+    scheduler = FieldScheduler(record)
+    scheduler.merge('google', _google_partial())
+    partial = Company('Acme')
+    partial.industry = 'Industrial Machinery'
+    scheduler.merge('crunchbase', partial)
+    assert record.industry == 'Industrial Machinery'
+    assert record.provenance['industry'][0] == 'crunchbase'
+
+
+@pytest.fixture
+def scraper():
+    import scraper as scraper_module
+    return scraper_module.CompanyDataScraper()
+
+
+def test_lookup_skips_sources_with_nothing_left_to_add(scraper):
+    release = threading.Event()
+
+    def google(name, data):
+        for field in ('website', 'description', 'industry', 'company_size', 'revenue', 'headquarters', 'founded'):
+            setattr(data, field, getattr(_google_partial(), field))
+
+    def slow_profile(name, data, scheduler=None):
+        release.wait(10)
+        data.industry = 'Late'
+
+    def nothing(*args, **kwargs):
+        pass
+
+    scraper._search_google = google
+    scraper._search_crunchbase = scraper._search_bloomberg = slow_profile
+    scraper._search_social_media = scraper._search_linkedin_data = nothing
+    scraper._get_website_info = scraper._lookup_domain = nothing
+    try:
+        start = time.monotonic()
+        record = scraper._search_company('Acme Skip Test')
+        elapsed = time.monotonic() - start
+    finally:
+        release.set()
+
+    assert record.sources['crunchbase'] == 'skipped'
+    assert record.sources['bloomberg'] == 'skipped'
+    assert record.industry == 'Manufacturing'
+    assert elapsed < 5
+
+
+class _HangingEngine:
+    """An engine whose requests never come back unless cancelled."""
+
+    replay = None
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, url, headers=None, timeout=None):
+        future = Future()
+        self.submitted.append(future)
+        return future
+
+
+def test_a_source_past_the_budget_stops_fetching_and_frees_its_thread(scraper, monkeypatch):
+    monkeypatch.setattr(field_scheduler, 'LATENCY_BUDGET', 0.5)
+    scraper.engine = _HangingEngine()
+    returned = threading.Event()
+    crunchbase = scraper._search_crunchbase
+
+    def search_crunchbase(*args, **kwargs):
+        try:
+            crunchbase(*args, **kwargs)
+        finally:
+            returned.set()
+
+    def nothing(*args, **kwargs):
+        pass
+
+    scraper._search_crunchbase = search_crunchbase
+    scraper._search_google = scraper._search_bloomberg = nothing
+    scraper._search_social_media = scraper._search_linkedin_data = nothing
+    scraper._get_website_info = scraper._lookup_domain = nothing
+    try:
+        record = scraper._search_company('Acme Budget Test')
+        assert record.sources['crunchbase'] == 'timed_out'
+        # The slug probes are dropped with the source, which returns instead
+        # of holding its executor thread until they answer
+        assert returned.wait(2)
+        submitted = len(scraper.engine.submitted)
+        assert submitted and all(f.cancelled() for f in scraper.engine.submitted)
+        time.sleep(0.1)
+        assert len(scraper.engine.submitted) == submitted
+    finally:
+        for future in scraper.engine.submitted:
+            future.cancel()
+
+
+class _Domains:
+    def __init__(self, live=None):
+        self.live = live
+        self.looked_up = []
+
+    def first_live(self, domains, timeout):
+        return self.live if self.live in domains else None
+
+    def facts(self, domain, timeout, whois=True):
+        self.looked_up.append((domain, whois))
+        return {'domain': domain, 'a': ['127.0.0.1'], 'mx': [], 'ns': [],
+                'registered': '1999-04-01' if whois else None}
+
+
+def test_domain_stage_keeps_the_whois_date_out_of_founded(scraper):
+    scraper.domains = _Domains()
+    record = Company('Acme', website='https://www.acme.com/about')
+    scraper._lookup_domain(record, deadline=1)
+    assert scraper.domains.looked_up == [('acme.com', True)]
+    assert record.domain_info['registered'] == '1999-04-01' and record.domain_info['verified']
+    assert record.founded is None
+
+
+def test_domain_stage_skips_shared_sites_and_whois_for_guesses(scraper):
+    scraper.domains = _Domains(live='acme.io')
+    shared = Company('Acme', website='https://en.wikipedia.org/wiki/Acme')
+    scraper._lookup_domain(shared, deadline=1)
+    assert shared.domain_info is None
+
+    guessed = Company('Acme')
+    scraper._lookup_domain(guessed, deadline=1)
+    assert guessed.website == 'https://acme.io'
+    assert scraper.domains.looked_up == [('acme.io', False)]
+    assert guessed.domain_info['verified'] is False and guessed.domain_info['registered'] is None
@@ -0,0 +1,50 @@
+from fetch_engine import FetchResponse
+from http_cache import ResponseCache, cache_key, normalize_url
+
+URL = 'https://acme.example/about'
+
+
+def page(content=b'<html>about</html>', limited=None, status=200):
+    return FetchResponse(URL, status, {'content-type': 'text/html', 'etag': '"v1"'}, content, 'utf-8',
+                         limited=limited)
+
+
+def test_stores_and_serves_complete_pages():
+    cache = ResponseCache(':memory:')
+    key = cache.key_for(URL)
+    cache.store(key, page())
+    entry = cache.lookup(key)
+    assert entry.fresh
+    assert entry.response.content == b'<html>about</html>'
+    assert entry.validators() == {'If-None-Match': '"v1"'}
+
+
+def test_truncated_and_skipped_bodies_are_not_cached():
+    cache = ResponseCache(':memory:')
+    key = cache.key_for(URL)
+    cache.store(key, page(b'<html>ab', limited='truncated'))
+    cache.store(key, page(b'', limited='not_html'))
+    assert cache.lookup(key) is None
+    assert cache.snapshot()['incomplete'] == 2
+    assert cache.snapshot()['entries'] == 0
+
+
+def test_incomplete_refetch_keeps_the_stale_copy():
+    cache = ResponseCache(':memory:', ttls={'website': 1})
+    key = cache.key_for(URL)
+    cache.store(key, page())
+    cache.store(key, page(b'<html>ab', limited='truncated'))
+    assert cache.lookup(key).response.content == b'<html>about</html>'
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache(':memory:')
+    key = cache.key_for(URL)
+    cache.store(key, page(status=503))
+    assert cache.lookup(key) is None
+
+
+def test_keys_ignore_query_order_and_user_agent():
+    assert normalize_url('HTTPS://Acme.example:443?b=2&a=1') == 'https://acme.example/?a=1&b=2'
+    assert cache_key(URL, {'User-Agent': 'a'}) == cache_key(URL, {'User-Agent': 'b'})
+    assert cache_key(URL, {'Accept-Language': 'en'}) != cache_key(URL, {'Accept-Language': 'de'})
@@ -0,0 +1,115 @@
+import sqlite3
+import time
+
+import pytest
+
+from jobs import JobRunner, JobStore, parse_company_names
+
+
+def test_parse_company_names_from_csv_and_lists():
+    assert parse_company_names(csv_text='id,Company\n1,Stripe\n2, stripe \n3,Notion\n') == ['Stripe', 'Notion']
+    assert parse_company_names(csv_text='Stripe\nNotion\n') == ['Stripe', 'Notion']
+    assert parse_company_names(['  Acme  Labs ', '', 'acme labs']) == ['Acme Labs']
+
+
+def test_claims_in_job_order_and_finishes_jobs(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    first = store.create_job(['Stripe', 'Notion'])
+    second = store.create_job(['Acme'])
+    claimed = [store.claim_next('a') for _ in range(3)]
+    assert [row[2] for row in claimed] == ['Stripe', 'Notion', 'Acme']
+    assert store.claim_next('a') is None
+
+    store.complete(first, 0, result={'name': 'Stripe'})
+    store.complete(first, 1, error='Company not found')
+    assert store.progress(first)['status'] == 'completed'
+    assert store.progress(second)['status'] == 'running'
+    items, total = store.results(first)
+    assert total == 2
+    assert items[0] == {'company_name': 'Stripe', 'status': 'done', 'result': {'name': 'Stripe'}}
+    assert items[1]['error'] == 'Company not found'
+
+
+def test_items_leased_by_a_live_process_are_left_alone(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    running, starting = JobStore(path), JobStore(path)
+    running.create_job(['Stripe', 'Notion'])
+    assert running.claim_next('running-server')[2] == 'Stripe'
+
+    # A second server starting on the same database doesn't take it over
+    assert starting.requeue_expired() == 0
+    assert starting.claim_next('starting-server')[2] == 'Notion'
+    assert starting.claim_next('starting-server') is None
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    dead, alive = JobStore(path), JobStore(path)
+    job_id = alive.create_job(['Stripe', 'Notion'])
+    dead.claim_next('dead-server', lease=0.01)
+    alive.claim_next('alive-server', lease=0.01)
+    assert alive.renew('alive-server') == 1
+    time.sleep(0.02)
+
+    assert alive.claim_next('alive-server') == (job_id, 0, 'Stripe')
+    assert alive.claim_next('alive-server') is None
+    assert alive.requeue_expired() == 0
+
+
+def test_failed_job_creation_is_rolled_back(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    with pytest.raises(sqlite3.Error):
+        store.create_job(['Stripe', object()])
+    job_id = store.create_job(['Notion'])
+    assert store.claim_next('a') == (job_id, 0, 'Notion')
+    assert store.claim_next('a') is None
+
+
+def test_runner_enriches_every_item(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    runner = JobRunner(store, lambda name: {'name': name} if name != 'Nobody' else None, workers=2, idle_wait=0.05)
+    job_id = runner.submit(['Stripe', 'Nobody'])
+    try:
+        deadline = time.time() + 5
+        while store.progress(job_id)['status'] != 'completed' and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        runner.stop()
+    progress = store.progress(job_id)
+    assert (progress['done'], progress['failed']) == (1, 1)
+
+
+def test_claims_read_indexes_instead_of_sorting_the_queue(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    plans = [
+        ('SELECT id FROM jobs WHERE finished_at IS NULL ORDER BY created_at', ()),
+        ("SELECT job_id, position, company_name FROM items"
+         " WHERE status = 'pending' AND job_id = ? ORDER BY position LIMIT 1", ('job',)),
+        ("UPDATE items SET status = 'pending' WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+         (0,)),
+    ]
+    for sql, params in plans:
+        detail = ' '.join(row[3] for row in store._conn.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+        assert 'USING INDEX' in detail and 'TEMP B-TREE' not in detail
+
+
+def test_runner_starts_again_in_a_forked_child(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    runner = JobRunner(store, lambda name: None, workers=1, idle_wait=0.05)
+    runner.start()
+    try:
+        threads, owner = list(runner._threads), runner.owner
+        runner._pid = -1
+        runner.start()
+        assert runner.store is not store and runner.store.path == store.path
+        assert runner.owner != owner
+        assert runner._threads and not set(runner._threads) & set(threads)
+    finally:
+        runner.stop()
+
+
+def test_the_app_starts_its_runner_on_import():
+    import scraper
+
+    assert scraper.JOB_RUNNER._threads
+    assert all(thread.is_alive() for thread in scraper.JOB_RUNNER._threads)
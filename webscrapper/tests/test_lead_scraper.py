@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def client():
+    import lead_scraper
+    return lead_scraper.app.test_client()
+
+
+def names(response):
+    return [company['name'] for company in response.get_json()]
+
+
+def test_search_treats_the_last_word_as_typed_until_a_space(client):
+    assert 'Google' in names(client.get('/search', query_string={'query': 'goo'}))
+    # "goo " is a finished word, and no company is called just that
+    assert 'Google' not in names(client.get('/search', query_string={'query': 'goo '}))
+    assert 'Google' in names(client.get('/search', query_string={'query': 'google '}))
+    assert client.get('/search', query_string={'query': '   '}).get_json() == []
+
+
+def test_companies_by_domain(client):
+    assert client.get('/companies', query_string={'domain': 'google.com'}).get_json()['name'] == 'Google'
+    assert client.get('/companies', query_string={'domain': 'nosuchcompany.example'}).status_code == 404
+
+
+def test_memory_backend_gets_the_trailing_space(client, monkeypatch):
+    import lead_scraper
+    from search_index import CompanyIndex
+
+    monkeypatch.setattr(lead_scraper, 'SEARCH_INDEX', CompanyIndex([{'name': 'Data Corp'}, {'name': 'Databricks'}]))
+    assert sorted(names(client.get('/search', query_string={'query': 'data'}))) == ['Data Corp', 'Databricks']
+    assert names(client.get('/search', query_string={'query': 'data '})) == ['Data Corp']
@@ -0,0 +1,24 @@
+import pytest
+
+import metrics
+from records import Company
+
+
+@pytest.fixture
+def scraper():
+    import scraper as scraper_module
+    return scraper_module.CompanyDataScraper()
+
+
+def test_errors_a_source_catches_count_against_its_stage(scraper, monkeypatch):
+    def unreachable(urls):
+        raise ConnectionError('network unreachable')
+
+    monkeypatch.setattr(scraper, 'fetch_many', unreachable)
+    before = metrics.STAGE_ERRORS.value(stage='google')
+    with metrics.tracing() as trace:
+        record = scraper._run_source('google', scraper._search_google, Company('Acme'), 'Acme')
+    assert record.website is None
+    assert metrics.STAGE_ERRORS.value(stage='google') == before + 1
+    assert trace.stages['google']['error'] == 'network unreachable'
+
@@ -0,0 +1,44 @@
+from parsers import knowledge_panel, labelled_values, page_text, serp_results
+
+SERP = b'''<html><body><div id="search">
+<div class="g"><a href="https://acme.example/"><h3>Acme | Widgets</h3></a><div class="VwiC3b">Makers of widgets.</div></div>
+<div class="g"><a><h3>No link target</h3></a></div>
+<div class="g"><h3>Third</h3></div>
+</div></body></html>'''
+
+
+def test_serp_results_in_page_order_up_to_the_limit():
+    assert serp_results(SERP, 2) == [
+        {'href': 'https://acme.example/', 'title': 'Acme | Widgets', 'snippet': 'Makers of widgets.'},
+        {'href': '', 'title': 'No link target', 'snippet': None},
+    ]
+    assert [result['title'] for result in serp_results(SERP, 10)][-1] == 'Third'
+
+
+def test_knowledge_panel():
+    page = b'''<html><body><div class="kp-header">
+    <div class="kno-rdesc"><span> Acme makes widgets. </span></div>
+    <div class="rVusze">Founded: 1999</div><div class="rVusze">CEO: Jane Doe</div>
+    </div></body></html>'''
+    assert knowledge_panel(page) == {'description': 'Acme makes widgets.',
+                                     'facts': ['Founded: 1999', 'CEO: Jane Doe']}
+    assert knowledge_panel(b'<html><body><p>nothing</p></body></html>') is None
+
+
+def test_labelled_values_take_the_next_element():
+    page = b'''<html><body><dl>
+    <dt>Industry</dt><dt> Software </dt>
+    <dt>Employees</dt><dt>51-200</dt>
+    <dt>Revenue</dt>
+    </dl></body></html>'''
+    assert labelled_values(page, 'dt', ['Industry', 'Employees', 'Revenue', 'Founded']) == {
+        'Industry': 'Software', 'Employees': '51-200', 'Revenue': None, 'Founded': None,
+    }
+
+
+def test_page_text_skips_scripts():
+    page = b'<html><head><script>var x = 1;</script></head><body><p>Hello</p><p>world</p></body></html>'
+    text = page_text(page)
+    assert 'Hello' in text and 'world' in text
+    assert 'var x' not in text
+    assert page_text(b'') == ''
@@ -0,0 +1,85 @@
+import math
+import time
+
+import pytest
+
+from fetch_engine import FetchEngine
+from rate_limiter import MAX_WAIT, RateLimited, RateLimiter, parse_retry_after
+
+from http_server import LocalServer
+
+GOOGLE = 'https://www.google.com/search?q=acme'
+
+
+def test_google_lets_one_lookup_through_at_once():
+    limiter = RateLimiter()
+    # One company lookup's Google searches don't wait
+    assert [limiter.reserve(GOOGLE) for _ in range(7)] == [0.0] * 7
+    limiter.reserve(GOOGLE)
+    assert limiter.reserve(GOOGLE) > 1.5
+
+
+def test_other_hosts_burst_a_second_of_requests():
+    limiter = RateLimiter()
+    assert limiter.reserve('https://www.bloomberg.com/profile/acme') == 0.0
+    assert limiter.reserve('https://www.bloomberg.com/profile/acme-labs') > 1.5
+
+
+def test_throttling_halves_the_rate_and_honours_retry_after():
+    limiter = RateLimiter()
+    url = 'https://acme.com/'
+    limiter.reserve(url)
+    limiter.record(url, 429, '5')
+    snapshot = limiter.snapshot()['acme.com']
+    assert snapshot['rate'] == 1.0
+    assert 4 < snapshot['blocked_for'] <= 5
+    assert limiter.reserve(url) > 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after(None) is None
+    http_date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 30))
+    assert 25 < parse_retry_after(http_date) <= 30
+
+
+def test_waits_are_capped_and_refused_requests_take_no_slot():
+    limiter = RateLimiter()
+    waits = []
+    with pytest.raises(RateLimited) as refused:
+        while True:
+            waits.append(limiter.reserve(GOOGLE))
+    # The burst, then 15 more paced 2s apart up to the 30s cap
+    assert len(waits) == 23 and max(waits) <= MAX_WAIT
+    assert refused.value.host == 'google.com' and refused.value.wait > MAX_WAIT
+    with pytest.raises(RateLimited):
+        limiter.reserve(GOOGLE)
+    assert limiter.snapshot()['google.com']['rejected'] == 2
+    # Callers with no deadline can still queue
+    assert limiter.reserve(GOOGLE, max_wait=math.inf) > MAX_WAIT
+
+
+def test_released_slots_go_to_the_next_request():
+    limiter = RateLimiter()
+    for _ in range(10):
+        limiter.reserve(GOOGLE)
+    queued = limiter.reserve(GOOGLE)
+    limiter.release(GOOGLE)
+    limiter.release(GOOGLE)
+    assert limiter.reserve(GOOGLE) < queued
+
+
+def test_cancelled_fetch_gives_back_its_slot():
+    limiter = RateLimiter(default_rate=0.1)
+    engine = FetchEngine(rate_limiter=limiter)
+    try:
+        with LocalServer({'/': (200, {'Content-Type': 'text/html'}, b'<html></html>')}) as server:
+            assert engine.get(server.url('/')).status_code == 200
+            waiting = engine.submit(server.url('/'))
+            time.sleep(0.2)
+            waiting.cancel()
+            time.sleep(0.2)
+            # Only the request that went out still holds a slot
+            assert limiter.reserve(server.url('/')) < 11
+    finally:
+        engine.close()
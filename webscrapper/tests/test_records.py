@@ -0,0 +1,46 @@
+from records import Company, dumps
+
+
+def _record():
+    company = Company('Acme', website='https://acme.example')
+    partial = Company('Acme')
+    partial.industry = 'Software'
+    partial.founded = '1999'
+    partial.add_profile('www.linkedin.com', 'https://www.linkedin.com/company/acme', followers=1200)
+    partial.contacts.add(name='Jane Doe', email='jane.doe@acme.example')
+    partial.domain_info = {'domain': 'acme.example', 'a': ['192.0.2.1'], 'mx': [], 'ns': [],
+                           'registered': '1999-04-01', 'verified': True}
+    company.merge(partial, 'google')
+    return company
+
+
+def test_merge_fills_empty_fields_and_prefers_trusted_sources():
+    company = _record()
+    assert company.provenance['industry'] == ('google', 0.6)
+    assert company.profiles['linkedin'].followers == 1200
+
+    website = Company('Acme')
+    website.industry = 'Tech'
+    assert 'industry' not in company.merge(website, 'website')
+    crunchbase = Company('Acme')
+    crunchbase.industry = 'Enterprise Software'
+    company.merge(crunchbase, 'crunchbase')
+    assert company.industry == 'Enterprise Software'
+
+
+def test_dict_round_trip():
+    company = _record()
+    company.finish({'google': 'done'})
+    company.completeness = 0.5
+    record = company.to_dict()
+    assert Company.from_dict(record).to_dict() == record
+    assert Company.from_json(dumps(company)).to_dict() == record
+    assert record['social_data']['linkedin'] == {'url': 'https://www.linkedin.com/company/acme', 'followers': 1200}
+    assert record['provenance']['social_data.linkedin'] == {'source': 'google', 'confidence': 0.6}
+
+
+def test_wants_fields_that_are_empty_or_weakly_filled():
+    company = _record()
+    assert company.wants(['revenue'], 0.6)
+    assert not company.wants(['industry', 'founded'], 0.6)
+    assert company.wants(['industry'], 0.9)
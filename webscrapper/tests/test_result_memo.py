@@ -0,0 +1,51 @@
+import threading
+
+from result_memo import MemoryStore, ResultMemo, SQLiteStore, normalize_company_name
+
+
+def test_name_variants_share_a_key():
+    assert normalize_company_name('Acme, Inc.') == normalize_company_name('acme') == 'acme'
+    assert normalize_company_name('Acme Widgets Co. Ltd') == 'acme widgets'
+    assert normalize_company_name('Co') == 'co'
+
+
+def test_concurrent_callers_compute_once():
+    memo = ResultMemo(MemoryStore())
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'name': 'Acme'}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(memo.get_or_compute('Acme', compute)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(memo.get_or_compute('ACME Inc', compute)))
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == [{'name': 'Acme'}] * 2
+    assert len(calls) == 1
+    assert memo.get_or_compute('acme', compute) == {'name': 'Acme'} and len(calls) == 1
+
+
+def test_sqlite_store_is_shared_and_leased(tmp_path):
+    path = str(tmp_path / 'memo.sqlite3')
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    assert first.acquire_lease('acme', 'a', 60)
+    assert not second.acquire_lease('acme', 'b', 60)
+    first.set('acme', {'name': 'Acme'}, 60)
+    first.release_lease('acme', 'a')
+    assert second.get('acme') == {'name': 'Acme'}
+    assert ResultMemo(second).get_or_compute('Acme', lambda: None) == {'name': 'Acme'}
+
+
+def test_none_results_are_not_kept():
+    memo = ResultMemo(MemoryStore())
+    assert memo.get_or_compute('Nobody', lambda: None) is None
+    assert memo.get_or_compute('Nobody', lambda: {'name': 'Nobody'}) == {'name': 'Nobody'}
@@ -0,0 +1,98 @@
+import pytest
+
+import scrap
+from rate_limiter import RateLimiter
+
+LEADS = [
+    {'company_name': 'Acme', 'description': 'Widgets', 'website': 'https://www.acme.com › about',
+     'source': 'Google Search', 'date_found': '2024-05-01'},
+    {'company_name': 'Globex', 'description': 'N/A', 'website': 'globex.com',
+     'source': 'Google Search', 'date_found': '2024-05-02'},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = scrap.LeadStore(str(tmp_path / 'leads.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_lead_store_dedupes_domains_across_terms(store):
+    assert store.add('widgets', LEADS) == 2
+    assert store.add('gadgets', LEADS[:1]) == 0
+    leads = {lead['domain']: lead for _, lead in store.rows()}
+    assert set(leads) == {'acme.com', 'globex.com'}
+    assert sorted(leads['acme.com']['search_terms']) == ['gadgets', 'widgets']
+
+
+def test_partitioned_lead_export_round_trips(store, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    root = str(tmp_path / 'leads.parquet')
+    store.add('widgets', LEADS)
+    assert store.export(root) == 2
+    table = pq.read_table(root)
+    assert sorted(table.column('domain').to_pylist()) == ['acme.com', 'globex.com']
+    assert sorted(table.column('date_found').to_pylist()) == ['2024-05-01', '2024-05-02']
+    # Only leads found since the last export are appended
+    assert store.export(root) == 0
+
+
+def _serp(*names):
+    results = ''.join(f'<div class="g"><h3>{name}</h3><cite>https://{name.lower()}.com</cite></div>' for name in names)
+    return f'<html><body><div id="search">{results}</div></body></html>'
+
+
+CAPTCHA = '<html><body><form id="captcha-form">Our systems have detected unusual traffic</form></body></html>'
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    served = {}
+
+    def fetch_page(url):
+        page = int(url.rsplit('start=', 1)[1]) // 10
+        served[page] = served.get(page, 0) + 1
+        return pages_by_number.get(page, _serp())
+
+    pages_by_number = {}
+    monkeypatch.setattr(scrap, 'fetch_page', fetch_page)
+    # Blocked pages back off the limiter; keep that out of the shared one
+    monkeypatch.setattr(scrap, 'RATE_LIMITER', RateLimiter())
+    return pages_by_number, served
+
+
+def test_blocked_page_is_retried_not_treated_as_the_end(pages, tmp_path):
+    pages_by_number, served = pages
+    pages_by_number.update({0: _serp('Acme', 'Globex'), 1: CAPTCHA, 2: _serp('Initech')})
+    out = str(tmp_path / 'leads.jsonl')
+    checkpoint = str(tmp_path / 'leads.checkpoint.json')
+
+    written = scrap.crawl_leads('widgets', 5, scrap.JsonLinesSink(out), workers=1, checkpoint_path=checkpoint)
+    state = scrap.Checkpoint(checkpoint, 'widgets')
+    assert written == 3
+    assert served[1] == scrap.PAGE_ATTEMPTS
+    assert not state.is_done(1)
+    # Page 3 is a real results page with nothing on it
+    assert state.exhausted_at == 3
+
+    pages_by_number[1] = _serp('Umbrella')
+    assert scrap.crawl_leads('widgets', 5, scrap.JsonLinesSink(out), workers=1, checkpoint_path=checkpoint) == 1
+    assert 4 not in served
+
+
+def test_restart_moves_the_previous_output_aside(tmp_path):
+    out = tmp_path / 'leads.csv'
+    out.write_text('company_name\nAcme\n')
+    rotated = scrap.rotate_output(str(out))
+    assert not out.exists()
+    assert rotated.endswith('.csv') and open(rotated).read() == 'company_name\nAcme\n'
+    assert scrap.rotate_output(str(out)) is None
+
+
+def test_lead_domain_keys_shared_sites_by_name():
+    assert scrap.lead_domain(LEADS[0]) == 'acme.com'
+    wiki = dict(LEADS[0], website='https://en.wikipedia.org › wiki › Acme')
+    assert scrap.lead_domain(wiki) == 'name:acme'
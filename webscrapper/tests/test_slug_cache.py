@@ -0,0 +1,30 @@
+from slug_cache import SlugCache, slug_candidates
+
+
+def test_slug_candidates():
+    assert slug_candidates('Acme Widgets') == ['acme-widgets', 'acmewidgets', 'acme_widgets']
+    assert slug_candidates('Acme') == ['acme']
+
+
+def test_found_slugs_and_missing_ones(tmp_path):
+    cache = SlugCache(str(tmp_path / 'slugs.sqlite3'))
+    assert cache.found('crunchbase', 'Acme Widgets') is None
+    cache.remember('crunchbase', 'Acme  Widgets', 'acme-widgets')
+    assert cache.found('crunchbase', 'acme widgets') == 'acme-widgets'
+    assert cache.found('linkedin', 'Acme Widgets') is None
+
+    cache.mark_missing('crunchbase', 'acmewidgets')
+    assert cache.unknown('crunchbase', slug_candidates('Acme Widgets')) == ['acme-widgets', 'acme_widgets']
+    assert cache.unknown('linkedin', ['acmewidgets']) == ['acmewidgets']
+
+    cache.forget('crunchbase', 'Acme Widgets')
+    assert cache.found('crunchbase', 'Acme Widgets') is None
+    assert cache.snapshot()['missing'] == 1
+
+
+def test_entries_expire(tmp_path):
+    cache = SlugCache(str(tmp_path / 'slugs.sqlite3'), found_ttl=-1, missing_ttl=-1)
+    cache.remember('crunchbase', 'Acme', 'acme')
+    cache.mark_missing('crunchbase', 'acme-inc')
+    assert cache.found('crunchbase', 'Acme') is None
+    assert cache.unknown('crunchbase', ['acme-inc']) == ['acme-inc']
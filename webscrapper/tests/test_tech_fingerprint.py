@@ -0,0 +1,29 @@
+from tech_fingerprint import FINGERPRINTER, Automaton, TechFingerprinter
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = Automaton([b'he', b'she', b'hers', b'his'])
+    assert automaton.search(b'ushers') == {0, 1, 2}
+    assert automaton.search(b'nothing') == set()
+
+
+def test_wordpress_link_header():
+    headers = {'Link': '<https://acme.example/wp-json/>; rel="https://api.w.org/"'}
+    assert FINGERPRINTER.fingerprint(b'<html></html>', headers) == {'CMS': ['WordPress']}
+
+
+def test_header_values_match_within_their_own_header():
+    fingerprinter = TechFingerprinter([
+        {'name': 'PHP', 'category': 'Language', 'headers': {'x-powered-by': 'php'}},
+        {'name': 'Vercel', 'category': 'Hosting', 'headers': {'x-vercel-id': ''}},
+        {'name': 'Express', 'category': 'Framework', 'cookies': ['connect.sid']},
+    ])
+    assert fingerprinter.fingerprint(b'', {'X-Powered-By': 'PHP/8.2'}) == {'Language': ['PHP']}
+    assert fingerprinter.fingerprint(b'', {'Server': 'php-proxy'}) == {}
+    assert fingerprinter.fingerprint(b'', {'X-Vercel-Id': 'fra1::abc'}) == {'Hosting': ['Vercel']}
+    assert fingerprinter.fingerprint(b'', {'Set-Cookie': 'connect.sid=s%3A1; Path=/'}) == {'Framework': ['Express']}
+
+
+def test_body_markers_and_generator_meta():
+    body = b'<meta name="generator" content="WordPress 6.4"><script src="/wp-includes/js/x.js"></script>'
+    assert FINGERPRINTER.fingerprint(body) == {'CMS': ['WordPress']}